@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Benchmark: full dump of a canister's history, serial vs. backfill
+
+The canister is this library running in process behind a transport that
+adds a fixed round-trip latency to every query, about that of a query to
+the IC. The serial dump follows one page after the other; the backfill
+fetches chunks of the ID range concurrently. The canister's own work also
+runs in this process here, which caps the speedup below what separate
+replicas allow.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_backfill.py
+"""
+
+import time
+
+from kybra_simple_logging import _handler, cli, get_log_head, get_logs_blob
+
+N = 50_000
+LATENCY = 0.1
+PAGE_BYTES = 100_000
+
+
+class LatencyTransport:
+    """Serve the log queries from this process after a delay"""
+
+    def __init__(self):
+        self.queries = 0
+
+    def query(self, canister_id, method, args):
+        self.queries += 1
+        time.sleep(LATENCY)
+        if method == "get_canister_log_head":
+            return get_log_head()
+        from_entry, tail, _, _, max_bytes, *_ = [value for _, value in args]
+        return get_logs_blob(
+            from_entry=from_entry, max_entries=tail, max_bytes=max_bytes
+        )
+
+
+def fill():
+    _handler.set_max_log_entries(N)
+    _handler.clear_logs()
+    for i in range(N):
+        _handler._store_log_entry(
+            _handler.Level.INFO,
+            f"Processed request {i} in {i % 97} ms",
+            f"component_{i % 20}",
+            fields=("account", i % 50),
+        )
+
+
+def main():
+    fill()
+    transport = LatencyTransport()
+    cli.set_transport(transport)
+    print(f"Dumping {N} entries, {LATENCY * 1e3:.0f} ms per query")
+    for parallel in (1, 4, 8, 16):
+        transport.queries = 0
+        start = time.perf_counter()
+        if parallel == 1:
+            page = {"next_from_entry": None, "has_more": True}
+            count = 0
+            while page["has_more"]:
+                page = cli._get_any_logs_page(
+                    "canister",
+                    from_entry=page["next_from_entry"],
+                    max_bytes=PAGE_BYTES,
+                )
+                count += len(page["entries"])
+        else:
+            page = cli.backfill_logs(
+                "canister", parallel=parallel, max_bytes=PAGE_BYTES
+            )
+            count = len(page["entries"])
+        elapsed = time.perf_counter() - start
+        assert count == N
+        label = "serial pages" if parallel == 1 else f"backfill, {parallel} at a time"
+        print(f"  {label:24} {elapsed:6.2f} s  ({transport.queries} queries)")
+
+
+if __name__ == "__main__":
+    main()
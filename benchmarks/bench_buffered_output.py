@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Benchmark: per-call cost of logging with and without output buffering
+
+Runs against a fake `kybra.ic` that counts system calls, so the number of
+ic.print/ic.time calls per message execution can be compared. On a real
+canister each of these calls also costs cycles outside of Python.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_buffered_output.py
+"""
+
+import sys
+import time
+import timeit
+import types
+
+LINES_PER_EXECUTION = 20
+EXECUTIONS = 5_000
+
+
+class FakeIC:
+    def __init__(self):
+        self.prints = 0
+        self.clock_reads = 0
+
+    def print(self, text):
+        self.prints += 1
+
+    def time(self):
+        self.clock_reads += 1
+        return time.time_ns()
+
+
+ic = FakeIC()
+sys.modules["kybra"] = types.SimpleNamespace(ic=ic)
+
+from kybra_simple_logging import _handler  # noqa: E402
+
+logger = _handler.get_logger("bench_buffered_output")
+
+
+def execution():
+    """One update call logging a handful of lines"""
+    for i in range(LINES_PER_EXECUTION):
+        logger.info("Processed item %d", i)
+    _handler.flush_logs()
+
+
+def measure(buffered):
+    _handler.set_output_buffering(buffered)
+    _handler.clear_logs()
+    ic.prints = ic.clock_reads = 0
+    seconds = min(timeit.repeat(execution, number=EXECUTIONS, repeat=3))
+    executions = EXECUTIONS * 3
+    return (
+        seconds / (EXECUTIONS * LINES_PER_EXECUTION) * 1e9,
+        ic.prints / executions,
+        ic.clock_reads / executions,
+    )
+
+
+def main():
+    assert _handler._in_ic_environment, "fake ic was not picked up"
+    print(f"{LINES_PER_EXECUTION} log lines per execution, fake ic")
+    baseline = None
+    for label, buffered in (("unbuffered", False), ("buffered", True)):
+        per_call, prints, clock_reads = measure(buffered)
+        if baseline is None:
+            baseline = per_call
+        print(
+            f"  {label:<10} {per_call:8.1f} ns/call  ({baseline / per_call:4.1f}x)"
+            f"  ic.print {prints:5.1f}/exec  ic.time {clock_reads:5.1f}/exec"
+        )
+    _handler.set_output_buffering(False)
+
+
+if __name__ == "__main__":
+    main()
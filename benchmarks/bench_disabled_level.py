@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: cost of a disabled `logger.debug()` call
+
+"before" reproduces the former chain, in which every call went through
+log() and is_enabled_for() before returning.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_disabled_level.py
+"""
+
+import timeit
+
+from kybra_simple_logging import Level, get_logger
+
+N = 1_000_000
+
+
+class CheckingLogger:
+    """The level check of SimpleLogger before the no-op bindings"""
+
+    def __init__(self, level):
+        self.level = level
+
+    def is_enabled_for(self, level):
+        return int(level) >= int(self.level)
+
+    def log(self, level, message, *args):
+        if not self.is_enabled_for(level):
+            return
+
+    def debug(self, message, *args):
+        self.log(Level.DEBUG, message, *args)
+
+
+checking = CheckingLogger(Level.INFO)
+logger = get_logger("bench_disabled_level")
+logger.set_level(Level.INFO)
+
+
+def before():
+    checking.debug("value=%s", 42)
+
+
+def after():
+    logger.debug("value=%s", 42)
+
+
+def main():
+    print(f"Disabled DEBUG calls, {N} iterations each")
+    baseline = None
+    for name, func in (("before", before), ("after", after)):
+        seconds = min(timeit.repeat(func, number=N, repeat=3))
+        per_call = seconds / N * 1e9
+        if baseline is None:
+            baseline = per_call
+        print(f"  {name:<8} {per_call:8.1f} ns/call  ({baseline / per_call:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
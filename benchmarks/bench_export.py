@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Benchmark: size and decode time of binary batches vs. per-entry records
+
+kslog used to backfill through get_canister_logs_page, whose reply dfx
+renders as one JSON record per entry. get_canister_logs_blob returns the
+same page as a single binary batch. The JSON size below is a lower bound
+for the record path, as Candid adds field labels and type tags on top.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_export.py
+"""
+
+import json
+import timeit
+
+from kybra_simple_logging import _handler, decode_log_batch, encode_log_batch
+
+N = 10_000
+LOGGER_NAMES = [f"component_{i}" for i in range(20)]
+MESSAGES = [
+    "Heartbeat %d",
+    "Processed proposal %d: status=ACCEPTED votes=42",
+    "Transfer %d completed from treasury to member account",
+    "Timer tick %d, next run scheduled",
+]
+
+
+def fill():
+    _handler.set_max_log_entries(N)
+    _handler.clear_logs()
+    levels = list(_handler.Level)
+    for i in range(N):
+        _handler._store_log_entry(
+            levels[i % len(levels)],
+            MESSAGES[i % len(MESSAGES)] % i,
+            LOGGER_NAMES[i % len(LOGGER_NAMES)],
+            fields=("account", i % 50),
+        )
+
+
+def main():
+    fill()
+    entries = list(_handler._LOG_STORAGE)
+    records = json.dumps([log.to_dict() for log in entries])
+    print(f"Exporting {N} entries")
+    print(f"  JSON records        {len(records):>9} bytes")
+
+    for compress in (False, True):
+        data = encode_log_batch(entries, compress=compress)
+        number = 5
+        encode_s = min(
+            timeit.repeat(
+                lambda: encode_log_batch(entries, compress=compress),
+                number=number,
+                repeat=3,
+            )
+        )
+        decode_s = min(
+            timeit.repeat(lambda: decode_log_batch(data), number=number, repeat=3)
+        )
+        parse_s = min(
+            timeit.repeat(lambda: json.loads(records), number=number, repeat=3)
+        )
+        label = "blob (zlib)" if compress else "blob"
+        print(
+            f"  {label:<18}  {len(data):>9} bytes"
+            f"  ({len(records) / len(data):5.1f}x smaller)"
+            f"  encode {encode_s / number * 1e3:6.1f} ms"
+            f"  decode {decode_s / number * 1e3:6.1f} ms"
+            f"  (JSON parse {parse_s / number * 1e3:5.1f} ms)"
+        )
+    _handler.set_max_log_entries(1000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Benchmark: cost of get_logs for follow-style polls and tails
+
+A `kslog --follow` poll asks for `from_entry=last_id + 1`, i.e. only the
+few newest entries. The previous implementation copied and filtered the
+whole buffer for every call; it is reproduced here as a reference.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_get_logs.py
+"""
+
+import timeit
+
+from kybra_simple_logging import _handler
+
+SIZES = (1_000, 10_000, 100_000)
+NEW_ENTRIES = 5
+
+
+def copy_and_scan(from_entry=None, max_entries=None):
+    """get_logs as implemented before the cursor lookup"""
+    logs = [
+        log
+        for log in list(_handler._LOG_STORAGE)
+        if from_entry is None or log.id >= from_entry
+    ]
+    logs = logs[-max_entries:] if max_entries is not None else logs
+    return [log.to_dict() for log in logs]
+
+
+def fill(size):
+    _handler.set_max_log_entries(size)
+    _handler.clear_logs()
+    for i in range(size):
+        _handler._store_log_entry(_handler.Level.INFO, f"message {i}", "bench")
+
+
+def main():
+    for mode in ("entries", "columnar", "segmented"):
+        _handler.set_log_storage(mode)
+        print(f"Storage: {mode}")
+        for size in SIZES:
+            fill(size)
+            cursor = _handler._LOG_SEQUENCE_COUNTER - NEW_ENTRIES + 1
+            for label, old, new in (
+                (
+                    "follow poll",
+                    lambda: copy_and_scan(from_entry=cursor),
+                    lambda: _handler.get_logs(from_entry=cursor),
+                ),
+                (
+                    "tail 10",
+                    lambda: copy_and_scan(max_entries=10),
+                    lambda: _handler.get_logs(max_entries=10),
+                ),
+            ):
+                number = max(1, 100_000 // size)
+                old_us = min(timeit.repeat(old, number=number, repeat=3)) / number
+                new_us = min(timeit.repeat(new, number=number, repeat=3)) / number
+                print(
+                    f"  {size:>7} entries  {label:<12}"
+                    f" before {old_us * 1e6:10.1f} us"
+                    f"  after {new_us * 1e6:8.1f} us"
+                    f"  ({old_us / new_us:7.1f}x)"
+                )
+    _handler.set_log_storage("entries")
+    _handler.set_max_log_entries(1000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: cost of DEBUG calls when the DEBUG level is disabled
+
+Compares eagerly formatted f-string messages with deferred %-style
+arguments and callable messages.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_lazy_args.py
+"""
+
+import timeit
+
+from kybra_simple_logging import Level, get_logger
+
+N = 200_000
+
+logger = get_logger("bench_lazy_args")
+logger.set_level(Level.INFO)
+
+payload = {f"key_{i}": list(range(10)) for i in range(20)}
+items = list(range(100))
+
+
+def eager():
+    logger.debug(f"payload={payload!r} items={items!r}")
+
+
+def lazy_args():
+    logger.debug("payload=%r items=%r", payload, items)
+
+
+def lazy_callable():
+    logger.debug(lambda: f"payload={payload!r} items={items!r}")
+
+
+def main():
+    print(f"Disabled DEBUG calls, {N} iterations each")
+    baseline = None
+    for name, func in (
+        ("f-string (eager)", eager),
+        ("%-style args", lazy_args),
+        ("callable", lazy_callable),
+    ):
+        seconds = min(timeit.repeat(func, number=N, repeat=3))
+        per_call = seconds / N * 1e9
+        if baseline is None:
+            baseline = per_call
+        print(f"  {name:<18} {per_call:8.1f} ns/call  ({baseline / per_call:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
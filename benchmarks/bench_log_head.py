@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Benchmark: canister-side cost of an idle kslog --follow poll
+
+When nothing was logged, a follower used to ask for the page after its
+cursor, with its filters, and get an empty page back. It now probes the
+log head first. Both are measured here as the library code the canister
+runs for the query, with a full buffer.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_log_head.py
+"""
+
+import timeit
+
+from kybra_simple_logging import _handler, get_log_head, get_logs_blob
+
+N = 10_000
+LOGGER_NAMES = [f"component_{i}" for i in range(20)]
+
+
+def fill():
+    _handler.set_max_log_entries(N)
+    _handler.clear_logs()
+    levels = list(_handler.Level)
+    for i in range(N):
+        _handler._store_log_entry(
+            levels[i % len(levels)],
+            f"Processed request {i}",
+            LOGGER_NAMES[i % len(LOGGER_NAMES)],
+            fields=("account", i % 50),
+        )
+
+
+def per_call(function, number=20_000):
+    return min(timeit.repeat(function, number=number, repeat=3)) / number
+
+
+def main():
+    fill()
+    cursor = get_log_head()["last_id"] + 1
+    polls = [
+        ("empty page", lambda: get_logs_blob(from_entry=cursor)),
+        (
+            "empty page, filtered",
+            lambda: get_logs_blob(
+                from_entry=cursor,
+                min_level=_handler.Level.ERROR,
+                fields={"account": "7"},
+                contains="request",
+            ),
+        ),
+        ("log head probe", get_log_head),
+    ]
+    print(f"Idle follow poll, {N} stored entries")
+    for label, poll in polls:
+        assert poll()
+        print(f"  {label:22} {per_call(poll) * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Benchmark: lines per second written by kslog
+
+The baseline is the former output path: format_log building its color
+table and formatting the timestamp for every entry, and print(..., flush=True)
+to a line-buffered stdout. Output goes to os.devnull, so the numbers
+measure formatting and system calls rather than a terminal.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_output.py
+"""
+
+import io
+import os
+import time
+from datetime import datetime
+
+from kybra_simple_logging import cli
+
+N = 100_000
+LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
+LOGS = [
+    {
+        "id": str(i + 1),
+        "timestamp": str(1_700_000_000 * 10**9 + i * 2_000_000),
+        "level": LEVELS[i % len(LEVELS)],
+        "logger_name": f"component_{i % 20}",
+        "message": f"Processed request {i} in {i % 97} ms",
+        "fields": [{"name": "account", "value": str(i % 50)}],
+    }
+    for i in range(N)
+]
+
+
+def format_log_per_line(log_entry, source=None):
+    timestamp = datetime.fromtimestamp(int(log_entry["timestamp"]) / 1e9).strftime(
+        "%Y-%m-%d %H:%M:%S"
+    )
+    level = log_entry.get("level", "UNKNOWN")
+    message = " ".join(
+        [
+            log_entry["message"],
+            *(f"{field['name']}={field['value']}" for field in log_entry["fields"]),
+        ]
+    )
+    level_colors = {
+        "DEBUG": "\033[94m",
+        "INFO": "\033[92m",
+        "WARNING": "\033[93m",
+        "ERROR": "\033[91m",
+        "CRITICAL": "\033[91m\033[1m",
+    }
+    color = level_colors.get(level, "")
+    return (
+        f"{timestamp} [{log_entry['id']}] {color}[{level}]\033[0m "
+        f"[{log_entry['logger_name']}] {message}"
+    )
+
+
+def devnull_stdout(**kwargs):
+    return io.TextIOWrapper(open(os.devnull, "wb"), **kwargs)
+
+
+def baseline():
+    stream = devnull_stdout(line_buffering=True)
+    for log in LOGS:
+        print(format_log_per_line(log), file=stream, flush=True)
+    stream.close()
+
+
+def batched(**kwargs):
+    stream = devnull_stdout()
+    writer = cli.LogWriter(stream, **kwargs)
+    for log in LOGS:
+        writer.write(log)
+    writer.flush()
+    stream.close()
+
+
+def lines_per_second(function):
+    start = time.perf_counter()
+    function()
+    return N / (time.perf_counter() - start)
+
+
+def main():
+    print(f"Writing {N} log lines to {os.devnull}")
+    for label, function in [
+        ("print + flush per line", baseline),
+        ("LogWriter, text", batched),
+        ("LogWriter, --no-color", lambda: batched(color=False)),
+        ("LogWriter, --output jsonl", lambda: batched(output="jsonl")),
+    ]:
+        print(f"  {label:28} {lines_per_second(function):>10,.0f} lines/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Benchmark: offline queries over an archive vs. parsing every line
+
+The archive holds N entries, mostly INFO with a rare ERROR, over one day.
+The baseline reads and parses every line of every segment, then filters,
+which is what reading the archive without its metadata would cost.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_query.py
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from kybra_simple_logging import cli
+from kybra_simple_logging._archive import LogArchive
+
+N = 500_000
+DAY_NS = 86_400 * 10**9
+LOGGER_NAMES = [f"component_{i}" for i in range(20)]
+
+
+def fill(path):
+    archive = LogArchive(path)
+    for start in range(0, N, 10_000):
+        archive.append(
+            [
+                {
+                    "id": i + 1,
+                    "timestamp": 1_700_000_000 * 10**9 + i * DAY_NS // N,
+                    "level": "ERROR" if i % 5_000 == 0 else "INFO",
+                    "logger_name": LOGGER_NAMES[i % len(LOGGER_NAMES)],
+                    "message": f"Processed request {i} in {i % 97} ms",
+                    "fields": [{"name": "account", "value": str(i % 50)}],
+                }
+                for i in range(start, start + 10_000)
+            ]
+        )
+    return LogArchive(path, read_only=True)
+
+
+def baseline(archive, **filters):
+    matches = cli.log_filter(**filters)
+    logs = []
+    for segment in archive.segments:
+        with open(os.path.join(archive.path, segment["file"]), "rb") as file:
+            logs.extend(log for log in map(json.loads, file) if matches(log))
+    return logs
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    path = tempfile.mkdtemp()
+    try:
+        archive = fill(path)
+        last_hour = 1_700_000_000 * 10**9 + DAY_NS - 3_600 * 10**9
+        queries = [
+            ("--level ERROR", {"level": "ERROR"}, {}),
+            ("--grep 'request 123456'", {"contains": "request 123456"}, {}),
+            ("--field account=7", {"fields": {"account": "7"}}, {}),
+            ("--since 1h", {"from_time": last_hour}, {}),
+            ("--tail 20", {}, {"tail": 20}),
+        ]
+        print(f"Queries over {N} archived entries")
+        for label, filters, options in queries:
+            base_s, expected = timed(lambda: baseline(archive, **filters))
+            tail = options.get("tail")
+            if tail:
+                expected = expected[-tail:]
+            query_s, found = timed(
+                lambda: list(cli.archived_logs(archive, **options, **filters))
+            )
+            assert found == expected
+            print(
+                f"  {label:26} parse all {base_s * 1e3:8.1f} ms"
+                f"   query {query_s * 1e3:8.1f} ms   ({len(found)} entries)"
+            )
+        count_s, counts = timed(lambda: cli.count_archived(archive, level="ERROR"))
+        assert counts[None] == N // 5_000
+        print(f"  --count --level ERROR      metadata  {count_s * 1e3:8.1f} ms")
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
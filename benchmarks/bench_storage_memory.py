@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Benchmark: heap used per buffered log entry for each storage engine
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_storage_memory.py
+"""
+
+import tracemalloc
+
+from kybra_simple_logging import _handler
+
+N = 100_000
+LOGGER_NAMES = [f"component_{i}" for i in range(20)]
+LEVELS = list(_handler.Level)
+# Repetitive canister-style messages, each rendered into a distinct string
+MESSAGES = [
+    "Heartbeat %d",
+    "Processed proposal %d: status=ACCEPTED votes=42",
+    "Transfer %d completed from treasury to member account",
+    "Timer tick %d, next run scheduled",
+]
+
+
+def measure(mode):
+    _handler.set_log_storage(mode)
+    _handler.set_max_log_entries(1)
+    _handler.clear_logs()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    _handler.set_max_log_entries(N)
+    for i in range(N):
+        _handler._LOG_SEQUENCE_COUNTER += 1
+        _handler._LOG_STORAGE.append(
+            _handler.LogEntry(
+                timestamp=1_700_000_000.0 + i,
+                level=LEVELS[i % len(LEVELS)],
+                logger_name=LOGGER_NAMES[i % len(LOGGER_NAMES)],
+                template=MESSAGES[i % len(MESSAGES)] % i,
+                id=_handler._LOG_SEQUENCE_COUNTER,
+            )
+        )
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / N
+
+
+def main():
+    print(f"Memory per buffered entry (including its message), {N} entries")
+    baseline = None
+    for mode in ("entries", "columnar", "segmented"):
+        per_entry = measure(mode)
+        if baseline is None:
+            baseline = per_entry
+        print(
+            f"  {mode:<10} {per_entry:8.1f} bytes/entry  ({baseline / per_entry:4.1f}x)"
+        )
+    _handler.set_log_storage("entries")
+
+
+if __name__ == "__main__":
+    main()
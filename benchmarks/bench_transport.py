@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Benchmark: per-poll latency of the kslog transports
+
+The agent transport is measured against a local stub replica that answers
+every query with an empty log page. dfx is not needed: the dfx transport
+is represented by the start of a bare Python process, a lower bound for a
+`dfx canister call` (which also loads the identity and the project).
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_transport.py
+"""
+
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from kybra_simple_logging import _candid, cli
+
+POLLS = 200
+CANISTER_ID = "rrkah-fqaaa-aaaaa-aaaaq-cai"
+_PAGE = (
+    "record",
+    (("data", ("vec", "nat8")), ("next_from_entry", "nat"), ("has_more", "bool")),
+)
+REPLY = _candid.cbor_encode(
+    {
+        "status": "replied",
+        "reply": {
+            "arg": _candid.encode(
+                [_PAGE], [{"data": b"", "next_from_entry": 1, "has_more": False}]
+            )
+        },
+    }
+)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(REPLY)))
+        self.end_headers()
+        self.wfile.write(REPLY)
+
+    def log_message(self, *args):
+        pass
+
+
+def per_poll(poll, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        poll()
+    return (time.perf_counter() - start) / number
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    agent = cli.AgentTransport(f"http://127.0.0.1:{server.server_address[1]}")
+    args = cli._log_query_args(1, None, None, None, None, None, None, None)
+
+    agent_s = per_poll(
+        lambda: agent.query(CANISTER_ID, "get_canister_logs_blob", args), POLLS
+    )
+    spawn_s = per_poll(
+        lambda: subprocess.run([sys.executable, "-c", "pass"], check=True), 10
+    )
+    print("Latency per follow poll")
+    print(f"  process per poll (dfx lower bound)  {spawn_s * 1e3:8.2f} ms")
+    print(f"  persistent agent connection         {agent_s * 1e3:8.2f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
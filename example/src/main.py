@@ -15,18 +15,28 @@ def heartbeat_() -> void:
 
 # ##### Import Kybra and the internal function #####
 
-from kybra import Opt, Record, Vec, nat, query  # noqa: E402
+from kybra import Opt, Record, Vec, blob, nat, query  # noqa: E402
 
+from kybra_simple_logging import get_canister_log_head as _get_head  # noqa: E402
+from kybra_simple_logging import get_canister_log_stats as _get_stats  # noqa: E402
 from kybra_simple_logging import get_canister_logs as _get_canister_logs  # noqa: E402
+from kybra_simple_logging import get_canister_logs_blob as _get_logs_blob  # noqa: E402
+from kybra_simple_logging import get_canister_logs_page as _get_logs_page  # noqa: E402
 
 
 # Define the PublicLogEntry class directly in the test canister
+class PublicLogField(Record):
+    name: str
+    value: str
+
+
 class PublicLogEntry(Record):
     timestamp: nat
     level: str
     logger_name: str
     message: str
     id: nat
+    fields: Vec[PublicLogField]
 
 
 @query
@@ -35,6 +45,10 @@ def get_canister_logs(
     max_entries: Opt[nat] = None,
     min_level: Opt[str] = None,
     logger_name: Opt[str] = None,
+    fields: Opt[Vec[PublicLogField]] = None,
+    contains: Opt[str] = None,
+    from_time: Opt[nat] = None,
+    to_time: Opt[nat] = None,
 ) -> Vec[PublicLogEntry]:
     """
     Re-export the get_canister_logs query function from the library
@@ -45,6 +59,10 @@ def get_canister_logs(
         max_entries=max_entries,
         min_level=min_level,
         logger_name=logger_name,
+        fields=fields,
+        contains=contains,
+        from_time=from_time,
+        to_time=to_time,
     )
 
     # Convert the logs to our local PublicLogEntry type
@@ -55,6 +73,160 @@ def get_canister_logs(
             logger_name=log["logger_name"],
             message=log["message"],
             id=log["id"],
+            fields=log["fields"],
         )
         for log in logs
     ]
+
+
+class PublicLogPage(Record):
+    entries: Vec[PublicLogEntry]
+    next_from_entry: nat
+    has_more: bool
+
+
+@query
+def get_canister_logs_page(
+    from_entry: Opt[nat] = None,
+    max_entries: Opt[nat] = None,
+    min_level: Opt[str] = None,
+    logger_name: Opt[str] = None,
+    max_bytes: Opt[nat] = None,
+    fields: Opt[Vec[PublicLogField]] = None,
+    contains: Opt[str] = None,
+    from_time: Opt[nat] = None,
+    to_time: Opt[nat] = None,
+) -> PublicLogPage:
+    """
+    Re-export the paged log query so that kslog can fetch large buffers
+    without exceeding the reply size limit
+    """
+    page = _get_logs_page(
+        from_entry=from_entry,
+        max_entries=max_entries,
+        min_level=min_level,
+        logger_name=logger_name,
+        max_bytes=max_bytes,
+        fields=fields,
+        contains=contains,
+        from_time=from_time,
+        to_time=to_time,
+    )
+
+    return PublicLogPage(
+        entries=[
+            PublicLogEntry(
+                timestamp=log["timestamp"],
+                level=log["level"],
+                logger_name=log["logger_name"],
+                message=log["message"],
+                id=log["id"],
+                fields=log["fields"],
+            )
+            for log in page["entries"]
+        ],
+        next_from_entry=page["next_from_entry"],
+        has_more=page["has_more"],
+    )
+
+
+class PublicLogBlob(Record):
+    data: blob
+    next_from_entry: nat
+    has_more: bool
+
+
+@query
+def get_canister_logs_blob(
+    from_entry: Opt[nat] = None,
+    max_entries: Opt[nat] = None,
+    min_level: Opt[str] = None,
+    logger_name: Opt[str] = None,
+    max_bytes: Opt[nat] = None,
+    fields: Opt[Vec[PublicLogField]] = None,
+    contains: Opt[str] = None,
+    from_time: Opt[nat] = None,
+    to_time: Opt[nat] = None,
+    compress: Opt[bool] = None,
+) -> PublicLogBlob:
+    """
+    Re-export the binary log query so that kslog can backfill large buffers
+    in compact batches
+    """
+    page = _get_logs_blob(
+        from_entry=from_entry,
+        max_entries=max_entries,
+        min_level=min_level,
+        logger_name=logger_name,
+        max_bytes=max_bytes,
+        fields=fields,
+        contains=contains,
+        from_time=from_time,
+        to_time=to_time,
+        compress=compress,
+    )
+    return PublicLogBlob(
+        data=page["data"],
+        next_from_entry=page["next_from_entry"],
+        has_more=page["has_more"],
+    )
+
+
+class PublicLogCount(Record):
+    name: str
+    count: nat
+
+
+class PublicLogBucket(Record):
+    start: nat
+    counts: Vec[PublicLogCount]
+
+
+class PublicLogStats(Record):
+    total_entries: nat
+    total_bytes: nat
+    levels: Vec[PublicLogCount]
+    loggers: Vec[PublicLogCount]
+    bucket_seconds: nat
+    buckets: Vec[PublicLogBucket]
+
+
+@query
+def get_canister_log_stats(since: Opt[nat] = None) -> PublicLogStats:
+    """
+    Re-export the log statistics query so that `kslog stats` can read the
+    counters without downloading the entries
+    """
+    stats = _get_stats(since=since)
+
+    return PublicLogStats(
+        total_entries=stats["total_entries"],
+        total_bytes=stats["total_bytes"],
+        levels=stats["levels"],
+        loggers=stats["loggers"],
+        bucket_seconds=stats["bucket_seconds"],
+        buckets=stats["buckets"],
+    )
+
+
+class PublicLogHead(Record):
+    last_id: nat
+    first_id: nat
+    entries: nat
+    evicted: nat
+
+
+@query
+def get_canister_log_head() -> PublicLogHead:
+    """
+    Re-export the log head probe so that `kslog --follow` can check for new
+    entries before fetching them
+    """
+    head = _get_head()
+
+    return PublicLogHead(
+        last_id=head["last_id"],
+        first_id=head["first_id"],
+        entries=head["entries"],
+        evicted=head["evicted"],
+    )
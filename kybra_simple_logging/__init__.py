@@ -1,28 +1,58 @@
 # Debug variable storage functions
 # New in-memory logging functions
+from ._codec import decode_log_batch  # Function to decode binary log batches
+from ._codec import encode_log_batch  # Function to encode log entries compactly
 from ._handler import Level  # Enum for log levels
 from ._handler import LogEntry  # Log entry data class
 from ._handler import SimpleLogger  # The logger class itself
+from ._handler import add_log_field_index  # Function to index a structured field
 from ._handler import clear_logs  # Function to clear all logs from memory
+from ._handler import disable_log_search_index  # Function to drop the word index
 from ._handler import disable_logging  # Function to disable all logging
 from ._handler import disable_memory_logging  # Function to disable in-memory logging
+from ._handler import enable_log_search_index  # Function to index message words
 from ._handler import enable_logging  # Function to re-enable logging
 from ._handler import enable_memory_logging  # Function to enable in-memory logging
+from ._handler import flush_logs  # Function to emit buffered output
+from ._handler import flush_logs_after  # Decorator that flushes output on return
+from ._handler import get_log_bytes  # Function to get the stored log size in bytes
+from ._handler import get_log_head  # Function to get the newest and oldest log IDs
+from ._handler import get_log_memory_stats  # Function to report message memory use
+from ._handler import get_log_stats  # Function to get rolling log counters
+from ._handler import get_log_storage  # Function to get the storage engine name
 from ._handler import get_logger  # Function to get a named logger
 from ._handler import get_logs  # Function to retrieve logs from memory
+from ._handler import get_logs_blob  # Function to retrieve a page as a binary batch
+from ._handler import get_logs_page  # Function to retrieve logs one page at a time
 from ._handler import list_vars  # Function to list all saved variables
 from ._handler import load_var  # Function to load a saved variable
 from ._handler import logger  # Default logger for backwards compatibility
+from ._handler import remove_log_field_index  # Function to drop a field index
+from ._handler import reset_log_stats  # Function to reset the log counters
 from ._handler import save_var  # Function to save a variable for debugging
 from ._handler import set_log_level  # Function to set log level for one or all loggers
+from ._handler import set_log_storage  # Function to select the storage engine
+from ._handler import set_max_log_bytes  # Function to set the log storage byte budget
 from ._handler import set_max_log_entries  # Function to set maximum log storage size
+from ._handler import set_output_buffering  # Function to batch printed lines
 from ._handler import (  # Function to check memory logging status
     is_memory_logging_enabled,
 )
 
 # New canister query function for exposing logs
 try:
+    from ._handler import PublicLogBlob  # Public binary log page type for bulk queries
+    from ._handler import PublicLogBucket  # Public time bucket type for stats queries
+    from ._handler import PublicLogCount  # Public counter type for stats queries
     from ._handler import PublicLogEntry  # Public log entry type for canister queries
+    from ._handler import PublicLogField  # Public structured field type for queries
+    from ._handler import PublicLogHead  # Public log IDs and counts for probe queries
+    from ._handler import PublicLogPage  # Public log page type for paged queries
+    from ._handler import PublicLogStats  # Public log statistics type for queries
+    from ._handler import get_canister_log_head  # Query to probe for new entries
+    from ._handler import get_canister_log_stats  # Query for the log counters
+    from ._handler import get_canister_logs_blob  # Query for binary log pages
+    from ._handler import get_canister_logs_page  # Paged query within reply limits
     from ._handler import (  # Query function to expose logs via canister query
         get_canister_logs,
     )
@@ -34,5 +64,15 @@ except ImportError:
 # This allows imports like:
 # from kybra_simple_logging import logger, get_logger, set_log_level
 # from kybra_simple_logging import save_var, load_var, list_vars
-# from kybra_simple_logging import get_logs, clear_logs, set_max_log_entries, enable_memory_logging, disable_memory_logging
-# from kybra_simple_logging import PublicLogEntry, get_canister_logs
+# from kybra_simple_logging import get_logs, get_logs_page, clear_logs, set_max_log_entries, enable_memory_logging, disable_memory_logging
+# from kybra_simple_logging import set_log_storage, get_log_storage, set_max_log_bytes, get_log_bytes
+# from kybra_simple_logging import get_log_memory_stats
+# from kybra_simple_logging import set_output_buffering, flush_logs, flush_logs_after
+# from kybra_simple_logging import add_log_field_index, remove_log_field_index
+# from kybra_simple_logging import enable_log_search_index, disable_log_search_index
+# from kybra_simple_logging import get_log_stats, reset_log_stats
+# from kybra_simple_logging import get_logs_blob, encode_log_batch, decode_log_batch
+# from kybra_simple_logging import PublicLogEntry, PublicLogField, get_canister_logs, PublicLogPage, get_canister_logs_page
+# from kybra_simple_logging import PublicLogCount, PublicLogBucket, PublicLogStats, get_canister_log_stats
+# from kybra_simple_logging import PublicLogBlob, get_canister_logs_blob
+# from kybra_simple_logging import get_log_head, PublicLogHead, get_canister_log_head
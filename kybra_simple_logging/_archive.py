@@ -0,0 +1,433 @@
+# Local on-disk archive of canister logs, written by kslog --archive
+#
+# An archive directory holds the logs of one canister:
+#
+#   index.json          segment metadata and the cursor to resume from
+#   00000001.jsonl ...  segments, one JSON log entry per line
+#
+# Segments are append-only and hold entries in ascending ID order. A
+# segment is closed when it is full, or when the canister's log IDs start
+# over (after an upgrade or reinstall), which begins a new epoch. The
+# metadata of each segment (ID, time and level ranges) lets readers find
+# entries without opening every segment. The index is replaced atomically
+# after each append, and a segment written past its recorded size by an
+# interrupted run is recovered when the archive is opened.
+#
+# Readers map the segments into memory and only parse the lines that can
+# match a query, up to the size recorded in the index, so they can read an
+# archive while kslog --archive --follow is writing to it.
+
+import json
+import mmap
+import os
+import re
+from typing import Any, Collection, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ._handler import _message_tokens
+
+_INDEX_FILE = "index.json"
+_INDEX_VERSION = 1
+_SEGMENT_MAX_ENTRIES = 50_000
+_SEGMENT_MAX_BYTES = 16 * 1024 * 1024
+# Non-ASCII characters whose lowercase form is an ASCII letter
+_FOLDS_TO_ASCII = {"i": "\u0130", "k": "\u212a"}
+# Bytes of a segment sampled to pick the most selective search pattern
+_SAMPLE_BYTES = 64 * 1024
+
+
+def _dumps(value: Any) -> str:
+    """Serialize like the segment lines, so that their bytes can be searched"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _archived_entry(log: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize a log entry from a canister query for storage"""
+    fields = log.get("fields") or []
+    if isinstance(fields, dict):
+        fields = [{"name": name, "value": value} for name, value in fields.items()]
+    return {
+        "id": int(log["id"]),
+        "timestamp": int(log["timestamp"]),
+        "level": log["level"],
+        "logger_name": log["logger_name"],
+        "message": log["message"],
+        "fields": [
+            {"name": field["name"], "value": str(field["value"])} for field in fields
+        ],
+    }
+
+
+def _word_pattern(word: str) -> "re.Pattern[bytes]":
+    """Regex of an ASCII word as it appears in a line whose lowercase has it"""
+    parts = []
+    for char in word:
+        part = re.escape(char.encode())
+        if char in _FOLDS_TO_ASCII:
+            folded = re.escape(_FOLDS_TO_ASCII[char].encode())
+            part = b"(?:" + part + b"|" + folded + b")"
+        parts.append(part)
+    return re.compile(b"".join(parts), re.IGNORECASE)
+
+
+def line_patterns(
+    levels: Optional[Collection[str]] = None,
+    name: Optional[str] = None,
+    fields: Optional[Dict[str, Any]] = None,
+    contains: Optional[str] = None,
+) -> List["re.Pattern[bytes]"]:
+    """Build regexes that the segment line of every matching entry matches
+
+    The regexes only narrow down the lines to parse: the entries still have
+    to be checked against the filters.
+
+    Args:
+        levels: Levels of the wanted entries
+        name: Logger name filter
+        fields: Field filters
+        contains: Message search text
+    """
+    patterns = []
+    if levels is not None:
+        alternatives = b"|".join(re.escape(_dumps(level).encode()) for level in levels)
+        patterns.append(re.compile(b'"level":(?:' + alternatives + b")"))
+    if name is not None:
+        line = _dumps({"logger_name": name})[1:-1]
+        patterns.append(re.compile(re.escape(line.encode())))
+    for field, value in (fields or {}).items():
+        record = _dumps({"name": field, "value": str(value)})
+        patterns.append(re.compile(re.escape(record.encode())))
+    # Every word of the search text is a word of the message, so it appears
+    # in the line as written, up to ASCII case and the two non-ASCII
+    # characters that lowercase to ASCII letters
+    for word in _message_tokens(contains or ""):
+        if word.isascii():
+            patterns.append(_word_pattern(word))
+    return patterns
+
+
+def _segment_may_match(
+    segment: Dict[str, Any],
+    min_id: Optional[int],
+    max_id: Optional[int],
+    from_time: Optional[int],
+    to_time: Optional[int],
+    levels: Optional[Collection[str]],
+) -> bool:
+    """Check whether the metadata of a segment allows matching entries"""
+    if not segment["count"]:
+        return False
+    if min_id is not None and segment["max_id"] < min_id:
+        return False
+    if max_id is not None and segment["min_id"] > max_id:
+        return False
+    if from_time is not None and segment["max_time"] < from_time:
+        return False
+    if to_time is not None and segment["min_time"] > to_time:
+        return False
+    if levels is not None and not any(level in segment["levels"] for level in levels):
+        return False
+    return True
+
+
+def _segment_within(
+    segment: Dict[str, Any],
+    min_id: Optional[int],
+    max_id: Optional[int],
+    from_time: Optional[int],
+    to_time: Optional[int],
+) -> bool:
+    """Check whether all entries of a segment are within the ranges"""
+    return (
+        (min_id is None or segment["min_id"] >= min_id)
+        and (max_id is None or segment["max_id"] <= max_id)
+        and (from_time is None or segment["min_time"] >= from_time)
+        and (to_time is None or segment["max_time"] <= to_time)
+    )
+
+
+def _line_spans(
+    data: mmap.mmap, end: int, patterns: List["re.Pattern[bytes]"]
+) -> Iterator[Tuple[int, int]]:
+    """Yield the (start, stop) offsets of the lines matching all patterns"""
+    start = 0
+    if not patterns:
+        while start < end:
+            stop = data.find(b"\n", start, end)
+            if stop < 0:
+                return
+            yield start, stop
+            start = stop + 1
+        return
+
+    # Search for the pattern that matches least in a sample of the segment,
+    # and check the others on the lines it finds
+    sample_end = min(end, _SAMPLE_BYTES)
+    search = min(patterns, key=lambda p: len(p.findall(data, 0, sample_end)))
+    others = [pattern for pattern in patterns if pattern is not search]
+    while start < end:
+        match = search.search(data, start, end)
+        if match is None:
+            return
+        start = max(start, data.rfind(b"\n", start, match.start()) + 1)
+        stop = data.find(b"\n", match.start(), end)
+        if stop < 0:
+            return
+        if all(pattern.search(data, start, stop) for pattern in others):
+            yield start, stop
+        start = stop + 1
+
+
+class LogArchive:
+    """Append-only store of the logs of one canister
+
+    Only one process should write to an archive at a time; any number may
+    open it read-only.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        segment_entries: int = _SEGMENT_MAX_ENTRIES,
+        segment_bytes: int = _SEGMENT_MAX_BYTES,
+        read_only: bool = False,
+    ):
+        """Open or create an archive
+
+        Args:
+            path: Directory of the archive
+            segment_entries: Number of entries after which a segment is closed
+            segment_bytes: Size after which a segment is closed
+            read_only: Open an existing archive for reading only, seeing the
+                entries indexed so far
+
+        Raises:
+            FileNotFoundError: If the archive does not exist and read_only is set
+        """
+        self.path = path
+        self.segment_entries = segment_entries
+        self.segment_bytes = segment_bytes
+        if not read_only:
+            os.makedirs(path, exist_ok=True)
+        try:
+            with open(os.path.join(path, _INDEX_FILE)) as file:
+                index = json.load(file)
+        except FileNotFoundError:
+            if read_only:
+                raise
+            index = {"version": _INDEX_VERSION, "epoch": 0, "segments": []}
+        if index.get("version") != _INDEX_VERSION:
+            raise ValueError(f"Unsupported archive version in {path}")
+        self.epoch: int = index["epoch"]
+        self.next_from_entry: Optional[int] = index.get("next_from_entry")
+        self.segments: List[Dict[str, Any]] = index["segments"]
+        if not read_only and self._recover():
+            self._save_index()
+
+    def _recover(self) -> bool:
+        """Take in entries written after the index was last saved
+
+        Returns:
+            Whether the metadata changed
+        """
+        indexed = {segment["file"] for segment in self.segments}
+        pending = [self.segments[-1]] if self.segments else []
+        for name in sorted(os.listdir(self.path)):
+            if name.endswith(".jsonl") and name not in indexed:
+                segment = self._new_segment_metadata(name)
+                self.segments.append(segment)
+                pending.append(segment)
+
+        changed = False
+        for segment in pending:
+            file_path = os.path.join(self.path, segment["file"])
+            if os.path.getsize(file_path) == segment["bytes"]:
+                continue
+            changed = True
+            with open(file_path, "rb+") as file:
+                data = file.read()
+                # Drop a partially written last line
+                end = data.rfind(b"\n") + 1
+                file.truncate(end)
+            epoch = segment["epoch"]
+            segment.update(self._new_segment_metadata(segment["file"]), epoch=epoch)
+            for line in data[:end].splitlines():
+                self._add_to_metadata(segment, json.loads(line), len(line) + 1)
+            if segment["count"] and segment["epoch"] == self.epoch:
+                self.next_from_entry = max(
+                    self.next_from_entry or 0, segment["max_id"] + 1
+                )
+        return changed
+
+    def _new_segment_metadata(self, name: str) -> Dict[str, Any]:
+        return {
+            "file": name,
+            "epoch": self.epoch,
+            "count": 0,
+            "bytes": 0,
+            "min_id": None,
+            "max_id": None,
+            "min_time": None,
+            "max_time": None,
+            "levels": {},
+        }
+
+    @staticmethod
+    def _add_to_metadata(segment: Dict[str, Any], entry: Dict[str, Any], size: int):
+        timestamp = entry["timestamp"]
+        if not segment["count"]:
+            segment["min_id"] = entry["id"]
+            segment["min_time"] = segment["max_time"] = timestamp
+        segment["count"] += 1
+        segment["bytes"] += size
+        segment["max_id"] = entry["id"]
+        segment["min_time"] = min(segment["min_time"], timestamp)
+        segment["max_time"] = max(segment["max_time"], timestamp)
+        levels = segment["levels"]
+        levels[entry["level"]] = levels.get(entry["level"], 0) + 1
+
+    def _writable_segment(self) -> Dict[str, Any]:
+        """Return the segment to append to, starting a new one if needed"""
+        if self.segments:
+            segment = self.segments[-1]
+            if (
+                segment["epoch"] == self.epoch
+                and segment["count"] < self.segment_entries
+                and segment["bytes"] < self.segment_bytes
+            ):
+                return segment
+        number = len(self.segments) + 1
+        segment = self._new_segment_metadata(f"{number:08d}.jsonl")
+        self.segments.append(segment)
+        return segment
+
+    @property
+    def last_id(self) -> Optional[int]:
+        """ID of the newest entry of the current epoch"""
+        for segment in reversed(self.segments):
+            if segment["epoch"] != self.epoch:
+                return None
+            if segment["count"]:
+                return segment["max_id"]
+        return None
+
+    def append(
+        self, logs: List[Dict[str, Any]], next_from_entry: Optional[int] = None
+    ) -> int:
+        """Append new log entries and save the cursor
+
+        Entries already in the archive are skipped, so that pages fetched
+        again after an interruption are not stored twice.
+
+        Args:
+            logs: Log entries from a canister query, in ID order
+            next_from_entry: Cursor to resume fetching from
+
+        Returns:
+            Number of entries appended
+        """
+        last_id = self.last_id
+        appended = 0
+        segment = None
+        file = None
+        try:
+            for log in logs:
+                entry = _archived_entry(log)
+                if last_id is not None and entry["id"] <= last_id:
+                    continue
+                data = (_dumps(entry) + "\n").encode("utf-8")
+                writable = self._writable_segment()
+                if writable is not segment:
+                    if file is not None:
+                        file.close()
+                    segment = writable
+                    file = open(os.path.join(self.path, segment["file"]), "ab")
+                file.write(data)
+                self._add_to_metadata(segment, entry, len(data))
+                last_id = entry["id"]
+                appended += 1
+        finally:
+            if file is not None:
+                file.close()
+
+        if next_from_entry is not None:
+            self.next_from_entry = next_from_entry
+        elif last_id is not None:
+            self.next_from_entry = last_id + 1
+        if appended or next_from_entry is not None:
+            self._save_index()
+        return appended
+
+    def new_epoch(self) -> None:
+        """Start over after the canister's log IDs were reset"""
+        self.epoch += 1
+        self.next_from_entry = None
+        self._save_index()
+
+    def scan(
+        self,
+        min_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        from_time: Optional[int] = None,
+        to_time: Optional[int] = None,
+        levels: Optional[Collection[str]] = None,
+        patterns: Iterable["re.Pattern[bytes]"] = (),
+        reverse: bool = False,
+        segments: Optional[Iterable[Dict[str, Any]]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield the archived entries within ranges, oldest first
+
+        Segments whose metadata rules out any match are not read. The others
+        are mapped into memory and only the lines matching the patterns
+        are parsed, so memory use does not grow with the archive.
+
+        Args:
+            min_id: Lowest entry ID, in every epoch
+            max_id: Highest entry ID, in every epoch
+            from_time: Earliest timestamp in nanoseconds
+            to_time: Latest timestamp in nanoseconds
+            levels: Levels of the entries to yield
+            patterns: Regexes the lines of the entries to yield all match,
+                such as from line_patterns()
+            reverse: Yield the newest entries first
+            segments: Segments to read, from self.segments (defaults to all)
+        """
+        patterns = list(patterns)
+        selected = [
+            segment
+            for segment in (self.segments if segments is None else segments)
+            if _segment_may_match(segment, min_id, max_id, from_time, to_time, levels)
+        ]
+        if reverse:
+            selected.reverse()
+        for segment in selected:
+            path = os.path.join(self.path, segment["file"])
+            with (
+                open(path, "rb") as file,
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data,
+            ):
+                spans = _line_spans(data, min(segment["bytes"], len(data)), patterns)
+                if reverse:
+                    spans = reversed(list(spans))
+                for start, stop in spans:
+                    entry = json.loads(data[start:stop])
+                    if (
+                        (min_id is not None and entry["id"] < min_id)
+                        or (max_id is not None and entry["id"] > max_id)
+                        or (from_time is not None and entry["timestamp"] < from_time)
+                        or (to_time is not None and entry["timestamp"] > to_time)
+                        or (levels is not None and entry["level"] not in levels)
+                    ):
+                        continue
+                    yield entry
+
+    def _save_index(self) -> None:
+        index = {
+            "version": _INDEX_VERSION,
+            "epoch": self.epoch,
+            "next_from_entry": self.next_from_entry,
+            "segments": self.segments,
+        }
+        path = os.path.join(self.path, _INDEX_FILE)
+        with open(path + ".tmp", "w") as file:
+            json.dump(index, file)
+        os.replace(path + ".tmp", path)
@@ -0,0 +1,427 @@
+# Minimal Candid and CBOR codecs for calling canister queries over HTTP
+#
+# Only what kslog needs: encoding its query arguments, decoding the replies
+# and wrapping them in the CBOR envelopes of the IC HTTP interface.
+#
+# Candid types are written as "nat", "int", "nat8", "nat64", "text",
+# "bool", "null", ("opt", T), ("vec", T) and ("record", ((name, T), ...)).
+# Records decode to dictionaries keyed by field name when the name is
+# passed to decode(), and by "_<hash>" otherwise, like dfx does.
+
+import base64
+import re
+import struct
+import zlib
+from typing import Any, Dict, Iterable, List, Tuple
+
+_MAGIC = b"DIDL"
+
+_PRIMITIVES = {
+    "null": -1,
+    "bool": -2,
+    "nat": -3,
+    "int": -4,
+    "nat8": -5,
+    "nat16": -6,
+    "nat32": -7,
+    "nat64": -8,
+    "int8": -9,
+    "int16": -10,
+    "int32": -11,
+    "int64": -12,
+    "float32": -13,
+    "float64": -14,
+    "text": -15,
+    "reserved": -16,
+    "empty": -17,
+    "principal": -24,
+}
+_OPT, _VEC, _RECORD, _VARIANT = -18, -19, -20, -21
+# Fixed-size numbers: opcode -> (struct format, size)
+_FIXED = {
+    -5: ("<B", 1),
+    -6: ("<H", 2),
+    -7: ("<I", 4),
+    -8: ("<Q", 8),
+    -9: ("<b", 1),
+    -10: ("<h", 2),
+    -11: ("<i", 4),
+    -12: ("<q", 8),
+    -13: ("<f", 4),
+    -14: ("<d", 8),
+}
+
+
+def idl_hash(name: str) -> int:
+    """Hash of a Candid field name"""
+    result = 0
+    for byte in name.encode("utf-8"):
+        result = (result * 223 + byte) & 0xFFFFFFFF
+    return result
+
+
+def _write_leb(out: bytearray, value: int) -> None:
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value == 0:
+            out.append(byte)
+            return
+        out.append(byte | 0x80)
+
+
+def _write_sleb(out: bytearray, value: int) -> None:
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if (value == 0 and not byte & 0x40) or (value == -1 and byte & 0x40):
+            out.append(byte)
+            return
+        out.append(byte | 0x80)
+
+
+def _record_fields(type_: Any) -> List[Tuple[int, str, Any]]:
+    return sorted((idl_hash(name), name, field) for name, field in type_[1])
+
+
+def encode(types: List[Any], values: List[Any]) -> bytes:
+    """Encode Candid arguments
+
+    Args:
+        types: The argument types
+        values: The argument values; None for an absent opt, a list of
+            dictionaries for a vec of records, bytes for a vec nat8
+
+    Returns:
+        The encoded arguments
+    """
+    table: List[bytes] = []
+    indexes: Dict[str, int] = {}
+
+    def type_ref(type_: Any) -> int:
+        if isinstance(type_, str):
+            return _PRIMITIVES[type_]
+        key = repr(type_)
+        if key not in indexes:
+            entry = bytearray()
+            if type_[0] == "record":
+                _write_sleb(entry, _RECORD)
+                fields = _record_fields(type_)
+                _write_leb(entry, len(fields))
+                for field_hash, _, field in fields:
+                    _write_leb(entry, field_hash)
+                    _write_sleb(entry, type_ref(field))
+            else:
+                _write_sleb(entry, _OPT if type_[0] == "opt" else _VEC)
+                _write_sleb(entry, type_ref(type_[1]))
+            indexes[key] = len(table)
+            table.append(bytes(entry))
+        return indexes[key]
+
+    def write_value(out: bytearray, type_: Any, value: Any) -> None:
+        if isinstance(type_, tuple):
+            kind = type_[0]
+            if kind == "opt":
+                if value is None:
+                    out.append(0)
+                else:
+                    out.append(1)
+                    write_value(out, type_[1], value)
+            elif kind == "vec":
+                _write_leb(out, len(value))
+                if type_[1] == "nat8":
+                    out += bytes(value)
+                else:
+                    for item in value:
+                        write_value(out, type_[1], item)
+            else:
+                for _, name, field in _record_fields(type_):
+                    write_value(out, field, value[name])
+        elif type_ in ("nat", "int"):
+            (_write_leb if type_ == "nat" else _write_sleb)(out, int(value))
+        elif type_ == "text":
+            data = value.encode("utf-8")
+            _write_leb(out, len(data))
+            out += data
+        elif type_ == "bool":
+            out.append(1 if value else 0)
+        elif type_ != "null":
+            out += struct.pack(_FIXED[_PRIMITIVES[type_]][0], value)
+
+    refs = [type_ref(type_) for type_ in types]
+    out = bytearray(_MAGIC)
+    _write_leb(out, len(table))
+    for entry in table:
+        out += entry
+    _write_leb(out, len(refs))
+    for ref in refs:
+        _write_sleb(out, ref)
+    for type_, value in zip(types, values):
+        write_value(out, type_, value)
+    return bytes(out)
+
+
+def decode(data: bytes, names: Iterable[str] = ()) -> List[Any]:
+    """Decode Candid values
+
+    Args:
+        data: The encoded values
+        names: Record field and variant names to map their hashes back to
+
+    Returns:
+        The values: None for an absent opt, bytes for a vec nat8, a
+        dictionary for a record and a one-item dictionary for a variant
+
+    Raises:
+        ValueError: If the data is not valid Candid or uses unsupported types
+    """
+    labels = {idl_hash(name): name for name in names}
+    position = 4
+
+    def read_leb() -> int:
+        nonlocal position
+        result = shift = 0
+        while True:
+            byte = data[position]
+            position += 1
+            result |= (byte & 0x7F) << shift
+            shift += 7
+            if byte < 0x80:
+                return result
+
+    def read_sleb() -> int:
+        nonlocal position
+        result = shift = 0
+        while True:
+            byte = data[position]
+            position += 1
+            result |= (byte & 0x7F) << shift
+            shift += 7
+            if byte < 0x80:
+                if byte & 0x40:
+                    result -= 1 << shift
+                return result
+
+    def read_bytes(length: int) -> bytes:
+        nonlocal position
+        if position + length > len(data):
+            raise IndexError(position + length)
+        start = position
+        position += length
+        return data[start:position]
+
+    def read_value(ref: int) -> Any:
+        if ref >= 0:
+            kind, arg = table[ref]
+            if kind == _OPT:
+                return read_value(arg) if read_bytes(1)[0] else None
+            if kind == _VEC:
+                length = read_leb()
+                if arg == _PRIMITIVES["nat8"]:
+                    return read_bytes(length)
+                return [read_value(arg) for _ in range(length)]
+            if kind == _RECORD:
+                return {
+                    labels.get(field_hash, f"_{field_hash}"): read_value(field)
+                    for field_hash, field in arg
+                }
+            field_hash, field = arg[read_leb()]
+            return {labels.get(field_hash, f"_{field_hash}"): read_value(field)}
+        if ref == -1 or ref == -16:
+            return None
+        if ref == -2:
+            return read_bytes(1)[0] == 1
+        if ref == -3:
+            return read_leb()
+        if ref == -4:
+            return read_sleb()
+        if ref == -15:
+            return read_bytes(read_leb()).decode("utf-8")
+        if ref == -24:
+            if not read_bytes(1)[0]:
+                raise ValueError("Opaque principal references are not supported")
+            return principal_to_text(read_bytes(read_leb()))
+        if ref in _FIXED:
+            fmt, size = _FIXED[ref]
+            return struct.unpack(fmt, read_bytes(size))[0]
+        raise ValueError(f"Unsupported Candid type: {ref}")
+
+    if data[:4] != _MAGIC:
+        raise ValueError("Not Candid data")
+    try:
+        table: List[Tuple[int, Any]] = []
+        for _ in range(read_leb()):
+            kind = read_sleb()
+            if kind in (_OPT, _VEC):
+                table.append((kind, read_sleb()))
+            elif kind in (_RECORD, _VARIANT):
+                table.append(
+                    (kind, [(read_leb(), read_sleb()) for _ in range(read_leb())])
+                )
+            else:
+                raise ValueError(f"Unsupported Candid type: {kind}")
+        refs = [read_sleb() for _ in range(read_leb())]
+        return [read_value(ref) for ref in refs]
+    except (IndexError, UnicodeDecodeError):
+        raise ValueError("Truncated or corrupt Candid data") from None
+
+
+def to_text(type_: Any, value: Any) -> str:
+    """Render a value in the Candid text format, as accepted by dfx"""
+    if isinstance(type_, tuple):
+        kind = type_[0]
+        if kind == "opt":
+            return "null" if value is None else f"(opt {to_text(type_[1], value)})"
+        if kind == "vec":
+            items = "; ".join(to_text(type_[1], item) for item in value)
+            return f"vec {{ {items} }}"
+        fields = "; ".join(
+            f"{name} = {to_text(field, value[name])}" for name, field in type_[1]
+        )
+        return f"record {{ {fields} }}"
+    if type_ == "text":
+        return _text_literal(value)
+    if type_ == "bool":
+        return "true" if value else "false"
+    if type_ == "null":
+        return "null"
+    return str(value)
+
+
+# Escapes of the Candid text syntax; other control characters use \u{..}
+_TEXT_ESCAPES = {'"': '\\"', "\\": "\\\\", "\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+
+def _text_literal(text: str) -> str:
+    """Quote a string as a Candid text literal, keeping non-ASCII as is"""
+    escaped = []
+    for char in text:
+        escape = _TEXT_ESCAPES.get(char)
+        if escape is None and (char < " " or char == "\x7f"):
+            escape = f"\\u{{{ord(char):x}}}"
+        escaped.append(char if escape is None else escape)
+    return '"' + "".join(escaped) + '"'
+
+
+def principal_from_text(text: str) -> bytes:
+    """Decode a textual principal such as a canister ID
+
+    Raises:
+        ValueError: If the text is not a valid principal
+    """
+    compact = text.replace("-", "").upper()
+    try:
+        data = base64.b32decode(compact + "=" * (-len(compact) % 8))
+    except ValueError:
+        raise ValueError(f"Invalid principal: {text}") from None
+    if len(data) < 4 or data[:4] != zlib.crc32(data[4:]).to_bytes(4, "big"):
+        raise ValueError(f"Invalid principal: {text}")
+    if principal_to_text(data[4:]) != text:
+        raise ValueError(f"Invalid principal: {text}")
+    return data[4:]
+
+
+def principal_to_text(data: bytes) -> str:
+    """Render a principal in its textual form"""
+    checksum = zlib.crc32(data).to_bytes(4, "big")
+    compact = base64.b32encode(checksum + data).decode("ascii").lower().rstrip("=")
+    return "-".join(re.findall(".{1,5}", compact))
+
+
+def cbor_encode(value: Any) -> bytes:
+    """Encode dictionaries, lists, text, bytes and integers as CBOR"""
+    out = bytearray()
+
+    def head(major: int, length: int) -> None:
+        if length < 24:
+            out.append(major << 5 | length)
+        else:
+            for info, size in ((24, 1), (25, 2), (26, 4), (27, 8)):
+                if length < 1 << (8 * size):
+                    out.append(major << 5 | info)
+                    out.extend(length.to_bytes(size, "big"))
+                    return
+
+    def write(item: Any) -> None:
+        if isinstance(item, bool) or item is None:
+            out.append({False: 0xF4, True: 0xF5, None: 0xF6}[item])
+        elif isinstance(item, int):
+            head(0, item) if item >= 0 else head(1, -1 - item)
+        elif isinstance(item, (bytes, bytearray)):
+            head(2, len(item))
+            out.extend(item)
+        elif isinstance(item, str):
+            data = item.encode("utf-8")
+            head(3, len(data))
+            out.extend(data)
+        elif isinstance(item, (list, tuple)):
+            head(4, len(item))
+            for element in item:
+                write(element)
+        else:
+            head(5, len(item))
+            for key, element in item.items():
+                write(key)
+                write(element)
+
+    write(value)
+    return bytes(out)
+
+
+def cbor_decode(data: bytes) -> Any:
+    """Decode CBOR, ignoring tags
+
+    Raises:
+        ValueError: If the data is not valid CBOR or uses indefinite lengths
+    """
+    position = 0
+
+    def read() -> Any:
+        nonlocal position
+        initial = data[position]
+        position += 1
+        major, info = initial >> 5, initial & 0x1F
+        if major == 7:
+            if info in (20, 21, 22, 23):
+                return (False, True, None, None)[info - 20]
+            size = {25: 2, 26: 4, 27: 8}.get(info)
+            if size is None:
+                raise ValueError(f"Unsupported CBOR simple value: {info}")
+            start = position
+            position += size
+            return struct.unpack(
+                {2: ">e", 4: ">f", 8: ">d"}[size], data[start:position]
+            )[0]
+        if info < 24:
+            length = info
+        elif info < 28:
+            start = position
+            position += 1 << (info - 24)
+            length = int.from_bytes(data[start:position], "big")
+        else:
+            raise ValueError("Indefinite-length CBOR is not supported")
+        if major == 0:
+            return length
+        if major == 1:
+            return -1 - length
+        if major in (2, 3):
+            if position + length > len(data):
+                raise IndexError(position + length)
+            start = position
+            position += length
+            chunk = data[start:position]
+            return bytes(chunk) if major == 2 else chunk.decode("utf-8")
+        if major == 4:
+            return [read() for _ in range(length)]
+        if major == 5:
+            result = {}
+            for _ in range(length):
+                key = read()
+                result[key] = read()
+            return result
+        return read()  # Tagged item
+
+    try:
+        return read()
+    except (IndexError, UnicodeDecodeError):
+        raise ValueError("Truncated or corrupt CBOR data") from None
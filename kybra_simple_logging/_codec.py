@@ -0,0 +1,187 @@
+# Compact binary encoding of log entry batches
+#
+# A batch is the header b"KSL" + version byte + flags byte, followed by the
+# body (zlib-compressed if flags & 1). The body is laid out in columns so
+# that it encodes and decodes with a handful of array operations rather
+# than per-byte Python loops:
+#
+#   entry count N, string count S, field count F      3 x u32
+#   ID deltas from the previous entry                  N x i64
+#   timestamp deltas in nanoseconds                    N x i64
+#   levels, logger names (string table indexes)        2 x N x u32
+#   message lengths, field counts                      2 x N x u32
+#   field names (string table indexes)                 F x u32
+#   field value lengths                                F x u32
+#   string table lengths                               S x u32
+#   text                                               UTF-8
+#
+# All integers are little-endian. The text is the concatenation of the
+# string table, the messages and the field values, with lengths counted in
+# characters. Level, logger and field names repeat a lot, so they are sent
+# once per batch through the string table.
+
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate, islice
+from typing import Any, Dict, Iterable, List, Union
+
+_MAGIC = b"KSL"
+_VERSION = 1
+_FLAG_ZLIB = 1
+_COUNTS = struct.Struct("<III")
+_SWAP = sys.byteorder == "big"
+
+
+def _timestamp_ns(timestamp: Union[int, float]) -> int:
+    """Timestamps from time.time() are float seconds, ic.time() int ns"""
+    if isinstance(timestamp, float):
+        return round(timestamp * 1e9)
+    return timestamp
+
+
+def _deltas(values: List[int]) -> List[int]:
+    return [b - a for a, b in zip([0, *values], values)]
+
+
+def _column_bytes(typecode: str, values: List[int]) -> bytes:
+    column = array(typecode, values)
+    if _SWAP:
+        column.byteswap()
+    return column.tobytes()
+
+
+def encode_log_batch(entries: Iterable[Any], compress: bool = True) -> bytes:
+    """Encode log entries into a compact binary batch
+
+    Args:
+        entries: LogEntry objects, in ascending ID order
+        compress: Whether to zlib-compress the body
+
+    Returns:
+        The encoded batch
+    """
+    strings: Dict[str, int] = {}
+    ids: List[int] = []
+    timestamps: List[int] = []
+    levels: List[int] = []
+    logger_names: List[int] = []
+    messages: List[str] = []
+    field_counts: List[int] = []
+    field_names: List[int] = []
+    field_values: List[str] = []
+
+    for entry in entries:
+        ids.append(entry.id)
+        timestamps.append(_timestamp_ns(entry.timestamp))
+        levels.append(strings.setdefault(str(entry.level), len(strings)))
+        logger_names.append(strings.setdefault(entry.logger_name, len(strings)))
+        messages.append(entry.get_message())
+        fields = entry.fields
+        field_counts.append(len(fields) // 2)
+        for i in range(0, len(fields), 2):
+            field_names.append(strings.setdefault(fields[i], len(strings)))
+            field_values.append(str(fields[i + 1]))
+
+    body = b"".join(
+        [
+            _COUNTS.pack(len(ids), len(strings), len(field_names)),
+            _column_bytes("q", _deltas(ids)),
+            _column_bytes("q", _deltas(timestamps)),
+            _column_bytes("I", levels),
+            _column_bytes("I", logger_names),
+            _column_bytes("I", [len(message) for message in messages]),
+            _column_bytes("I", field_counts),
+            _column_bytes("I", field_names),
+            _column_bytes("I", [len(value) for value in field_values]),
+            _column_bytes("I", [len(text) for text in strings]),
+            "".join([*strings, *messages, *field_values]).encode("utf-8"),
+        ]
+    )
+
+    flags = 0
+    if compress:
+        flags |= _FLAG_ZLIB
+        body = zlib.compress(body)
+    return _MAGIC + bytes([_VERSION, flags]) + body
+
+
+def decode_log_batch(data: bytes) -> List[Dict[str, Any]]:
+    """Decode a batch produced by encode_log_batch
+
+    Returns:
+        Log entries as dictionaries, like LogEntry.to_dict() but with
+        timestamps in nanoseconds and field values as strings
+
+    Raises:
+        ValueError: If the data is not a supported log batch
+    """
+    data = bytes(data)
+    if len(data) < 5 or data[:3] != _MAGIC:
+        raise ValueError("Not a log batch")
+    if data[3] != _VERSION:
+        raise ValueError(f"Unsupported log batch version: {data[3]}")
+    body = data[5:]
+    if data[4] & _FLAG_ZLIB:
+        try:
+            body = zlib.decompress(body)
+        except zlib.error as e:
+            raise ValueError(f"Corrupt log batch: {e}") from None
+    if len(body) < _COUNTS.size:
+        raise ValueError("Truncated log batch")
+
+    count, string_count, field_count = _COUNTS.unpack_from(body)
+    position = _COUNTS.size
+
+    def read_column(typecode: str, length: int) -> List[int]:
+        nonlocal position
+        column = array(typecode)
+        end = position + length * column.itemsize
+        if end > len(body):
+            raise ValueError("Truncated log batch")
+        column.frombytes(body[position:end])
+        if _SWAP:
+            column.byteswap()
+        position = end
+        return column.tolist()
+
+    ids = accumulate(read_column("q", count))
+    timestamps = accumulate(read_column("q", count))
+    levels = read_column("I", count)
+    logger_names = read_column("I", count)
+    message_lengths = read_column("I", count)
+    field_counts = read_column("I", count)
+    field_names = read_column("I", field_count)
+    value_lengths = read_column("I", field_count)
+    string_lengths = read_column("I", string_count)
+
+    try:
+        text = body[position:].decode("utf-8")
+    except UnicodeDecodeError as e:
+        raise ValueError(f"Corrupt log batch: {e}") from None
+    ends = list(accumulate([*string_lengths, *message_lengths, *value_lengths]))
+    if (ends[-1] if ends else 0) != len(text):
+        raise ValueError("Truncated log batch")
+    texts = [text[start:end] for start, end in zip([0, *ends], ends)]
+    strings = texts[:string_count]
+    messages = texts[string_count:]
+    values = messages[count:]
+
+    try:
+        fields = iter(zip([strings[name] for name in field_names], values))
+        return [
+            {
+                "timestamp": timestamp,
+                "level": strings[level],
+                "logger_name": strings[logger_name],
+                "message": message,
+                "id": entry_id,
+                "fields": dict(islice(fields, field_total)) if field_total else {},
+            }
+            for entry_id, timestamp, level, logger_name, message, field_total in zip(
+                ids, timestamps, levels, logger_names, messages, field_counts
+            )
+        ]
+    except IndexError:
+        raise ValueError("Corrupt log batch") from None
@@ -1,27 +1,94 @@
 # Simple custom logger that doesn't use Python's logging module
 # to avoid process ID access which is unsupported in IC environment
 
+import functools
+import heapq
 import json
 import pickle
+import random
+import re
 import sys
 import time
+import weakref
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import deque
 from dataclasses import dataclass
 from enum import IntEnum
-from typing import Any, Callable, Deque, Dict, List, Optional, Union
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from ._codec import encode_log_batch
 
 # Global settings
 _LOGGING_ENABLED = True
 _MEMORY_LOGGING_ENABLED = True  # Controls whether logs are stored in memory
 _LOGGERS: Dict[str, "SimpleLogger"] = {}
+# Every logger instance, including those not created through get_logger()
+_ALL_LOGGERS: "weakref.WeakSet[SimpleLogger]" = weakref.WeakSet()
+_ROOT_LEVEL = 20  # Level inherited by loggers without an explicit level (INFO)
 
 # Debug variable storage
 _DEBUG_VARS: Dict[str, Any] = {}
 
 # In-memory log storage
 _MAX_LOG_ENTRIES = 1000  # Maximum number of log entries to keep in memory
-_LOG_STORAGE: Deque["LogEntry"] = deque(maxlen=_MAX_LOG_ENTRIES)
+_LOG_STORAGE_MODE = "entries"  # "entries", "columnar" or "segmented"
+_LOG_STORAGE: Union[
+    Deque["LogEntry"], "_ColumnarLogStorage", "_SegmentedLogStorage"
+] = deque(maxlen=_MAX_LOG_ENTRIES)
+_LOG_SEGMENT_SIZE = 256  # Entries per compressed block in segmented mode
+
+# Interned message templates shared by all stored entries
+_MESSAGE_TEMPLATES: Dict[str, str] = {}
+_MAX_MESSAGE_TEMPLATES = 4096  # Stop interning new strings beyond this many
+_MAX_TEMPLATE_LENGTH = 256  # Longer messages are not worth interning
+# Rate limiting and sampling
+_SUPPRESSION_SUMMARY_INTERVAL = 10.0  # Seconds between "N suppressed" summaries
+# Buffered output
+_OUTPUT_BUFFERING = False  # Accumulate printed lines until flush_logs()
+_OUTPUT_BUFFER: List[str] = []
+_OUTPUT_BUFFER_BYTES = 0
+_MAX_OUTPUT_BUFFER_BYTES = 16 * 1024  # Flush early once this much text is pending
+_EXECUTION_TIMESTAMP: Optional[float] = None  # Entry timestamp cached until flush
+
+# Arguments of these types are immutable and cheap, so they can be kept
+# instead of the rendered message
+_DEFERRABLE_ARG_TYPES = (str, int, float, bool, type(None))
 _LOG_SEQUENCE_COUNTER = 0  # Global counter for generating unique log entry IDs
+_MAX_LOG_BYTES: Optional[int] = None  # Optional budget for stored message/name bytes
+_LOG_BYTES = 0  # Message and logger name bytes currently held in _LOG_STORAGE
+# _entry_bytes() of each stored entry, oldest first, so eviction need not
+# measure the entry again
+_LOG_ENTRY_SIZES: Deque[int] = deque()
+_LOG_EVICTED = 0  # Entries dropped to make room, not counting clear_logs()
+
+# Paged retrieval
+_MAX_PAGE_BYTES = 1_500_000  # Default page budget, below the 2 MiB IC reply limit
+_ENTRY_ENCODING_OVERHEAD = 48  # Approximate encoded bytes per entry besides strings
+
+# Secondary indexes over _LOG_STORAGE, kept in sync on append and eviction
+_LOGGER_INDEX: Dict[str, "_IdIndex"] = {}
+_LEVEL_INDEX: Dict["Level", "_IdIndex"] = {}
+# Optional indexes over structured fields: field name -> value text -> IDs
+_FIELD_INDEX: Dict[str, Dict[str, "_IdIndex"]] = {}
+# Optional inverted index over message words: lowercase token -> IDs
+_TOKEN_INDEX_ENABLED = False
+_TOKEN_INDEX: Dict[str, "_IdIndex"] = {}
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+# Rolling statistics, counted on store and kept after entries are evicted
+_LOG_STATS_ENTRIES = 0
+_LOG_STATS_BYTES = 0
+_LOG_STATS_LEVELS: Dict["Level", int] = {}
+_LOG_STATS_LOGGERS: Dict[str, int] = {}
+_LOG_STATS_BUCKET_SECONDS = 60  # Width of each time bucket
+_MAX_LOG_STATS_BUCKETS = 1440  # Buckets kept (one day of minutes by default)
+# (bucket start in seconds, count per level) for the most recent buckets
+_LOG_STATS_BUCKETS: Deque[Tuple[int, Dict["Level", int]]] = deque(
+    maxlen=_MAX_LOG_STATS_BUCKETS
+)
 
 
 # Define Level enum
@@ -44,8 +111,25 @@ class LogEntry:
     timestamp: float
     level: Level
     logger_name: str
-    message: str
+    template: str  # The message, or its %-style template if args are set
     id: int  # Unique identifier for the log entry
+    args: tuple = ()  # Template arguments, rendered on read
+    fields: tuple = ()  # Structured fields as a flat (name, value, ...) tuple
+
+    @property
+    def message(self) -> str:
+        """The message with its template arguments interpolated"""
+        if not self.args:
+            return self.template
+        return _render_message(self.template, self.args)
+
+    def get_message(self) -> str:
+        """Return the message with its template arguments interpolated"""
+        return self.message
+
+    def get_fields(self) -> Dict[str, Any]:
+        """Return the structured fields as a dictionary"""
+        return dict(zip(self.fields[::2], self.fields[1::2]))
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert log entry to dictionary for serialization"""
@@ -53,21 +137,743 @@ class LogEntry:
             "timestamp": self.timestamp,
             "level": str(self.level),
             "logger_name": self.logger_name,
-            "message": self.message,
+            "message": self.get_message(),
             "id": self.id,
+            "fields": self.get_fields(),
         }
 
 
+_LEVELS_BY_VALUE: Dict[int, Level] = {int(level): level for level in Level}
+
+
+class _ColumnarLogStorage:
+    """Fixed-capacity ring buffer that stores log entries column by column
+
+    Instead of one LogEntry object per line, ids, timestamps (int64
+    nanoseconds) and levels live in preallocated ``array`` columns, logger
+    names are interned into small integer ids and messages share a single
+    slot list. Entries are materialized as LogEntry objects on read, so the
+    storage can be used as a drop-in replacement for the default deque.
+    """
+
+    def __init__(self, maxlen: int):
+        self.maxlen = maxlen
+        self._ids = array("q", [0]) * maxlen
+        self._timestamps = array("q", [0]) * maxlen
+        self._levels = array("B", [0]) * maxlen
+        self._name_ids = array("I", [0]) * maxlen
+        self._messages: List[Optional[str]] = [None] * maxlen
+        self._args: List[tuple] = [()] * maxlen
+        self._fields: List[tuple] = [()] * maxlen
+        self._name_table: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._start = 0  # Slot of the oldest entry
+        self._size = 0
+        # time.time() returns float seconds while ic.time() returns int
+        # nanoseconds; remember which one we were given so reads round-trip
+        self._float_timestamps = False
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def first_id(self) -> int:
+        """ID of the oldest entry, read without materializing it"""
+        return self._ids[self._start]
+
+    @property
+    def last_id(self) -> int:
+        """ID of the newest entry, read without materializing it"""
+        return self._ids[(self._start + self._size - 1) % self.maxlen]
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self._entry_at_slot((self._start + i) % self.maxlen)
+
+    def __reversed__(self):
+        for i in range(self._size - 1, -1, -1):
+            yield self._entry_at_slot((self._start + i) % self.maxlen)
+
+    def __getitem__(self, index: int) -> LogEntry:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("log storage index out of range")
+        return self._entry_at_slot((self._start + index) % self.maxlen)
+
+    def _intern_name(self, name: str) -> int:
+        name_id = self._name_table.get(name)
+        if name_id is None:
+            name_id = len(self._names)
+            self._name_table[name] = name_id
+            self._names.append(name)
+        return name_id
+
+    def _entry_at_slot(self, slot: int) -> LogEntry:
+        timestamp: Union[int, float] = self._timestamps[slot]
+        if self._float_timestamps:
+            timestamp = timestamp / 1e9
+        return LogEntry(
+            timestamp=timestamp,
+            level=_LEVELS_BY_VALUE[self._levels[slot]],
+            logger_name=self._names[self._name_ids[slot]],
+            template=self._messages[slot],
+            id=self._ids[slot],
+            args=self._args[slot],
+            fields=self._fields[slot],
+        )
+
+    def append(self, entry: LogEntry) -> None:
+        """Append an entry, overwriting the oldest one when full"""
+        if self._size == self.maxlen:
+            slot = self._start
+            self._start = (self._start + 1) % self.maxlen
+        else:
+            slot = (self._start + self._size) % self.maxlen
+            self._size += 1
+
+        timestamp = entry.timestamp
+        if isinstance(timestamp, float):
+            self._float_timestamps = True
+            timestamp = round(timestamp * 1e9)
+
+        self._ids[slot] = entry.id
+        self._timestamps[slot] = timestamp
+        self._levels[slot] = int(entry.level)
+        self._name_ids[slot] = self._intern_name(entry.logger_name)
+        self._messages[slot] = entry.template
+        self._args[slot] = entry.args
+        self._fields[slot] = entry.fields
+
+    def popleft(self) -> LogEntry:
+        """Remove and return the oldest entry"""
+        if self._size == 0:
+            raise IndexError("pop from an empty log storage")
+        entry = self._entry_at_slot(self._start)
+        self._messages[self._start] = None
+        self._args[self._start] = ()
+        self._fields[self._start] = ()
+        self._start = (self._start + 1) % self.maxlen
+        self._size -= 1
+        return entry
+
+    def clear(self) -> None:
+        """Remove all entries (interned logger names are kept)"""
+        for i in range(self._size):
+            slot = (self._start + i) % self.maxlen
+            self._messages[slot] = None
+            self._args[slot] = ()
+            self._fields[slot] = ()
+        self._start = 0
+        self._size = 0
+
+
+class _ColdBlock:
+    """A frozen, zlib-compressed segment of consecutive log entries"""
+
+    def __init__(self, entries: List[LogEntry]):
+        self.count = len(entries)
+        self.skip = 0  # Entries already evicted from the front of the block
+        self.min_id = entries[0].id
+        self.max_id = entries[-1].id
+        self.min_timestamp = entries[0].timestamp
+        self.max_timestamp = entries[-1].timestamp
+        rows = [
+            [
+                log.timestamp,
+                int(log.level),
+                log.logger_name,
+                log.template,
+                log.id,
+                log.args,
+                log.fields,
+            ]
+            for log in entries
+        ]
+        self.data = zlib.compress(json.dumps(rows, separators=(",", ":")).encode())
+
+    def decode(self) -> List[LogEntry]:
+        """Decompress the block back into LogEntry objects"""
+        return [
+            LogEntry(
+                timestamp=timestamp,
+                level=_LEVELS_BY_VALUE[level],
+                logger_name=logger_name,
+                template=message,
+                id=entry_id,
+                args=tuple(args),
+                fields=tuple(fields),
+            )
+            for (
+                timestamp,
+                level,
+                logger_name,
+                message,
+                entry_id,
+                args,
+                fields,
+            ) in json.loads(zlib.decompress(self.data))
+        ]
+
+
+class _SegmentedLogStorage:
+    """Log storage that keeps a live tail and compresses older segments
+
+    New entries are appended to a hot list. Once it holds a full segment, the
+    segment is frozen into a zlib-compressed _ColdBlock that records its
+    min/max ID and timestamp. Reads only decompress the blocks they touch,
+    and the two most recently decompressed blocks are cached, so that
+    sequential access, and looking up both ends of a window, decompress
+    each block once.
+    """
+
+    def __init__(self, maxlen: int, segment_size: int = _LOG_SEGMENT_SIZE):
+        self.maxlen = maxlen
+        self.segment_size = max(1, segment_size)
+        self._hot: List[LogEntry] = []
+        self._blocks: List[_ColdBlock] = []
+        # Offset of each block in the sequence of all entries ever frozen
+        self._block_offsets: List[int] = []
+        self._frozen = 0  # Total number of entries ever frozen
+        self._cold_size = 0  # Live (not evicted) entries in cold blocks
+        # (block, entries) pairs of recently decompressed blocks, newest last
+        self._cache: List[Tuple[_ColdBlock, List[LogEntry]]] = []
+
+    def __len__(self) -> int:
+        return self._cold_size + len(self._hot)
+
+    @property
+    def first_id(self) -> int:
+        """ID of the oldest entry, read from block metadata when possible"""
+        if self._blocks:
+            return self._blocks[0].min_id + self._blocks[0].skip
+        return self._hot[0].id
+
+    @property
+    def last_id(self) -> int:
+        """ID of the newest entry, read from block metadata when possible"""
+        if self._hot:
+            return self._hot[-1].id
+        return self._blocks[-1].max_id
+
+    def _block_entries(self, block: _ColdBlock) -> List[LogEntry]:
+        for cached, entries in self._cache:
+            if cached is block:
+                return entries
+        entries = block.decode()
+        self._cache = [*self._cache[-1:], (block, entries)]
+        return entries
+
+    def __iter__(self):
+        for block in list(self._blocks):
+            yield from islice(block.decode(), block.skip, None)
+        yield from list(self._hot)
+
+    def __reversed__(self):
+        yield from reversed(list(self._hot))
+        for block in reversed(list(self._blocks)):
+            entries = block.decode()
+            for i in range(block.count - 1, block.skip - 1, -1):
+                yield entries[i]
+
+    def __getitem__(self, index: int) -> LogEntry:
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("log storage index out of range")
+        if index >= self._cold_size:
+            return self._hot[index - self._cold_size]
+
+        offset = self._block_offsets[0] + self._blocks[0].skip + index
+        i = bisect_right(self._block_offsets, offset) - 1
+        block = self._blocks[i]
+        return self._block_entries(block)[offset - self._block_offsets[i]]
+
+    def find_time(self, timestamp: Union[int, float], right: bool = False) -> int:
+        """Position of the first entry with a timestamp >= timestamp (> if right)
+
+        Uses the max timestamp of each block to decompress at most one block.
+        """
+        search = bisect_right if right else bisect_left
+        i = search(self._blocks, timestamp, key=lambda block: block.max_timestamp)
+        if i == len(self._blocks):
+            hot_position = search(self._hot, timestamp, key=lambda log: log.timestamp)
+            return self._cold_size + hot_position
+        block = self._blocks[i]
+        in_block = search(
+            self._block_entries(block),
+            timestamp,
+            block.skip,
+            key=lambda log: log.timestamp,
+        )
+        first_offset = self._block_offsets[0] + self._blocks[0].skip
+        return self._block_offsets[i] + in_block - first_offset
+
+    def append(self, entry: LogEntry) -> None:
+        """Append an entry, freezing the hot tail once it fills a segment"""
+        self._hot.append(entry)
+        if len(self._hot) >= self.segment_size:
+            self._freeze()
+
+    def _freeze(self) -> None:
+        block = _ColdBlock(self._hot)
+        self._blocks.append(block)
+        self._block_offsets.append(self._frozen)
+        self._frozen += block.count
+        self._cold_size += block.count
+        self._hot = []
+
+    def popleft(self) -> LogEntry:
+        """Remove and return the oldest entry"""
+        if not self._blocks:
+            if not self._hot:
+                raise IndexError("pop from an empty log storage")
+            return self._hot.pop(0)
+
+        block = self._blocks[0]
+        entry = self._block_entries(block)[block.skip]
+        block.skip += 1
+        self._cold_size -= 1
+        if block.skip == block.count:
+            # The whole block has been evicted: release its memory
+            del self._blocks[0]
+            del self._block_offsets[0]
+            self._cache = [item for item in self._cache if item[0] is not block]
+        return entry
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        self._hot = []
+        self._blocks = []
+        self._block_offsets = []
+        self._cold_size = 0
+        self._cache = []
+
+
+def _new_log_storage(
+    maxlen: int,
+) -> Union[Deque[LogEntry], _ColumnarLogStorage, _SegmentedLogStorage]:
+    """Create an empty log storage of the configured kind"""
+    if _LOG_STORAGE_MODE == "columnar":
+        return _ColumnarLogStorage(maxlen)
+    if _LOG_STORAGE_MODE == "segmented":
+        return _SegmentedLogStorage(maxlen, _LOG_SEGMENT_SIZE)
+    return deque(maxlen=maxlen)
+
+
+class _IdIndex:
+    """Ascending list of log entry IDs with O(1) append and popleft
+
+    Evicted IDs are dropped from the front by advancing a head offset; the
+    underlying array is compacted once the dead prefix dominates.
+    """
+
+    def __init__(self):
+        self._ids = array("q")
+        self._head = 0
+
+    def __len__(self) -> int:
+        return len(self._ids) - self._head
+
+    def append(self, entry_id: int) -> None:
+        self._ids.append(entry_id)
+
+    def popleft(self) -> None:
+        self._head += 1
+        if self._head >= 64 and self._head * 2 >= len(self._ids):
+            del self._ids[: self._head]
+            self._head = 0
+
+    def iter_ids(
+        self,
+        min_id: Optional[int] = None,
+        newest_first: bool = True,
+        max_id: Optional[int] = None,
+    ):
+        """Yield the indexed IDs between min_id and max_id in the requested order"""
+        ids = self._ids
+        low = self._head
+        high = len(ids)
+        if min_id is not None:
+            low = bisect_left(ids, min_id, low)
+        if max_id is not None:
+            high = bisect_right(ids, max_id, low)
+        if newest_first:
+            return (ids[i] for i in range(high - 1, low - 1, -1))
+        return (ids[i] for i in range(low, high))
+
+
+_LEVEL_INDEX.update({level: _IdIndex() for level in Level})
+_LOG_STATS_LEVELS.update({level: 0 for level in Level})
+
+
+def _text_bytes(text: str) -> int:
+    """UTF-8 encoded size of a string, without encoding ASCII text"""
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+def _entry_bytes(entry: LogEntry) -> int:
+    """Approximate UTF-8 bytes taken by the message and logger name of an entry
+
+    Computed once per stored entry (see _store_log_entry), so _text_bytes is
+    inlined for the common ASCII case.
+    """
+    message = entry.template
+    name = entry.logger_name
+    size = len(message) if message.isascii() else _text_bytes(message)
+    size += len(name) if name.isascii() else _text_bytes(name)
+    if entry.args:
+        size += _args_bytes(entry.args)
+    if entry.fields:
+        size += _args_bytes(entry.fields)
+    return size
+
+
+def _args_bytes(args: tuple) -> int:
+    """Approximate UTF-8 bytes taken by the template arguments of an entry"""
+    size = 0
+    for arg in args:
+        size += _text_bytes(arg) if isinstance(arg, str) else 8
+    return size
+
+
+def _append_log_entry(entry: LogEntry, size: Optional[int] = None) -> None:
+    """Append an entry to the storage, evicting the oldest entries if needed
+
+    Args:
+        entry: The entry to store
+        size: Its _entry_bytes(), when the caller already computed it
+    """
+    global _LOG_BYTES
+    if len(_LOG_STORAGE) >= _LOG_STORAGE.maxlen:
+        _evict_oldest_log_entry()
+    if size is None:
+        size = _entry_bytes(entry)
+    _LOG_STORAGE.append(entry)
+    _LOG_ENTRY_SIZES.append(size)
+    _LOG_BYTES += size
+
+    logger_index = _LOGGER_INDEX.get(entry.logger_name)
+    if logger_index is None:
+        logger_index = _LOGGER_INDEX[entry.logger_name] = _IdIndex()
+    logger_index.append(entry.id)
+    _LEVEL_INDEX[entry.level].append(entry.id)
+    if _FIELD_INDEX and entry.fields:
+        _index_entry_fields(entry)
+    if _TOKEN_INDEX_ENABLED:
+        _index_entry_tokens(entry)
+
+    if _MAX_LOG_BYTES is not None:
+        _enforce_log_bytes_budget()
+
+
+def _evict_oldest_log_entry() -> None:
+    """Drop the oldest stored entry and its secondary index references"""
+    global _LOG_BYTES, _LOG_EVICTED
+    evicted = _LOG_STORAGE.popleft()
+    _LOG_BYTES -= _LOG_ENTRY_SIZES.popleft()
+    _LOG_EVICTED += 1
+    _LOGGER_INDEX[evicted.logger_name].popleft()
+    _LEVEL_INDEX[evicted.level].popleft()
+    if _FIELD_INDEX and evicted.fields:
+        _unindex_entry_fields(evicted)
+    if _TOKEN_INDEX_ENABLED:
+        _unindex_entry_tokens(evicted)
+
+
+def _index_entry_fields(entry: LogEntry) -> None:
+    """Add an entry to the indexes of the fields it carries"""
+    fields = entry.fields
+    for i in range(0, len(fields), 2):
+        values = _FIELD_INDEX.get(fields[i])
+        if values is not None:
+            key = str(fields[i + 1])
+            value_index = values.get(key)
+            if value_index is None:
+                value_index = values[key] = _IdIndex()
+            value_index.append(entry.id)
+
+
+def _unindex_entry_fields(entry: LogEntry) -> None:
+    """Remove the oldest entry from the indexes of the fields it carries"""
+    fields = entry.fields
+    for i in range(0, len(fields), 2):
+        values = _FIELD_INDEX.get(fields[i])
+        if values is not None:
+            key = str(fields[i + 1])
+            value_index = values[key]
+            value_index.popleft()
+            # Drop values that are gone from the buffer, so that
+            # high-cardinality fields do not accumulate empty indexes
+            if not value_index:
+                del values[key]
+
+
+def _message_tokens(text: str) -> List[str]:
+    """Distinct lowercase words of a message, in order of appearance"""
+    return list(dict.fromkeys(_TOKEN_PATTERN.findall(text.lower())))
+
+
+def _index_entry_tokens(entry: LogEntry) -> None:
+    """Add an entry to the token index under each word of its message"""
+    for token in _message_tokens(entry.get_message()):
+        token_index = _TOKEN_INDEX.get(token)
+        if token_index is None:
+            token_index = _TOKEN_INDEX[token] = _IdIndex()
+        token_index.append(entry.id)
+
+
+def _unindex_entry_tokens(entry: LogEntry) -> None:
+    """Remove the oldest entry from the token index"""
+    for token in _message_tokens(entry.get_message()):
+        token_index = _TOKEN_INDEX[token]
+        token_index.popleft()
+        if not token_index:
+            del _TOKEN_INDEX[token]
+
+
+def _contains_match(message: str, contains: str, tokens: List[str]) -> bool:
+    """Check that a message contains a search text
+
+    The match is case-insensitive, every word of the search text must be a
+    whole word of the message, and the text must appear as written.
+    """
+    lowered = message.lower()
+    if contains.lower() not in lowered:
+        return False
+    message_tokens = set(_TOKEN_PATTERN.findall(lowered))
+    return all(token in message_tokens for token in tokens)
+
+
+def _timestamp_seconds(timestamp: Union[int, float]) -> float:
+    """Entry timestamp in seconds (ic.time() timestamps are int nanoseconds)"""
+    if isinstance(timestamp, float):
+        return timestamp
+    return timestamp / 1e9
+
+
+def _count_log_entry(entry: LogEntry, size: int) -> None:
+    """Add a newly stored entry of _entry_bytes() `size` to the statistics"""
+    global _LOG_STATS_ENTRIES, _LOG_STATS_BYTES
+    _LOG_STATS_ENTRIES += 1
+    _LOG_STATS_BYTES += size
+    _LOG_STATS_LEVELS[entry.level] += 1
+    name = entry.logger_name
+    _LOG_STATS_LOGGERS[name] = _LOG_STATS_LOGGERS.get(name, 0) + 1
+
+    seconds = int(_timestamp_seconds(entry.timestamp))
+    start = seconds - seconds % _LOG_STATS_BUCKET_SECONDS
+    if not _LOG_STATS_BUCKETS or start > _LOG_STATS_BUCKETS[-1][0]:
+        _LOG_STATS_BUCKETS.append((start, {}))
+    # Entries arriving out of order are counted in the newest bucket
+    counts = _LOG_STATS_BUCKETS[-1][1]
+    counts[entry.level] = counts.get(entry.level, 0) + 1
+
+
+def _enforce_log_bytes_budget() -> None:
+    """Evict the oldest entries until the byte budget is respected
+
+    The newest entry is always kept, even if it exceeds the budget on its own.
+    """
+    while _LOG_BYTES > _MAX_LOG_BYTES and len(_LOG_STORAGE) > 1:
+        _evict_oldest_log_entry()
+
+
+def _reset_log_indexes() -> None:
+    """Drop all secondary index contents and the byte accounting"""
+    global _LOG_BYTES
+    _LOG_BYTES = 0
+    _LOG_ENTRY_SIZES.clear()
+    _LOGGER_INDEX.clear()
+    for level in Level:
+        _LEVEL_INDEX[level] = _IdIndex()
+    for values in _FIELD_INDEX.values():
+        values.clear()
+    _TOKEN_INDEX.clear()
+
+
+def _render_message(message: Union[str, Callable[[], str]], args: tuple) -> str:
+    """Render a deferred log message once it is known that it will be emitted
+
+    Args:
+        message: The message string (optionally with %-style placeholders)
+            or a callable returning it
+        args: Arguments to interpolate into the message
+
+    Returns:
+        The final message text
+    """
+    if callable(message):
+        message = message()
+    if not isinstance(message, str):
+        message = str(message)
+    if not args:
+        return message
+    # Same convention as the standard library: a single mapping argument
+    # is used for %(name)s style placeholders
+    if len(args) == 1 and isinstance(args[0], dict) and args[0]:
+        args = args[0]
+    try:
+        return message % args
+    except (TypeError, ValueError, KeyError):
+        # Never let a bad format string break the caller
+        return f"{message} {args!r}"
+
+
+def _intern_message(message: str) -> str:
+    """Return a shared copy of a message or template string"""
+    interned = _MESSAGE_TEMPLATES.get(message)
+    if interned is not None:
+        return interned
+    if (
+        len(message) <= _MAX_TEMPLATE_LENGTH
+        and len(_MESSAGE_TEMPLATES) < _MAX_MESSAGE_TEMPLATES
+    ):
+        _MESSAGE_TEMPLATES[message] = message
+    return message
+
+
+def _storable_message(
+    message: Union[str, Callable[[], str]], args: tuple, text: str
+) -> Tuple[str, tuple]:
+    """Choose what to keep in memory for a message that was rendered to text
+
+    %-style templates whose arguments are all immutable scalars are kept as
+    an interned template plus the argument tuple and rendered again on read.
+    Anything else is kept as the rendered text, which is not interned: it is
+    mostly unique, and would fill the table with strings no entry shares.
+    """
+    if (
+        args
+        and isinstance(message, str)
+        and all(isinstance(arg, _DEFERRABLE_ARG_TYPES) for arg in args)
+    ):
+        return _intern_message(message), args
+    return text, ()
+
+
+def _storable_fields(fields: Dict[str, Any]) -> tuple:
+    """Flatten structured fields into a compact (name, value, ...) tuple
+
+    Values that are not immutable scalars are stored as their string form.
+    """
+    flat: List[Any] = []
+    for name, value in fields.items():
+        if not isinstance(value, _DEFERRABLE_ARG_TYPES):
+            value = str(value)
+        flat.append(_intern_message(name))
+        flat.append(value)
+    return tuple(flat)
+
+
+def _render_fields(text: str, fields: Dict[str, Any]) -> str:
+    """Append structured fields to a printed message as name=value pairs"""
+    return " ".join([text, *(f"{name}={value}" for name, value in fields.items())])
+
+
+def _fields_match(fields: tuple, expected: Dict[str, Any]) -> bool:
+    """Check that an entry has all the expected field values
+
+    Values are compared by their string form, so that filters sent as text
+    (from a canister query or the CLI) match numbers and booleans.
+    """
+    for name, value in expected.items():
+        for i in range(0, len(fields), 2):
+            if fields[i] == name:
+                if str(fields[i + 1]) != str(value):
+                    return False
+                break
+        else:
+            return False
+    return True
+
+
+def _now() -> float:
+    """Current time in seconds, read from the same clock as entry timestamps"""
+    return _timestamp_seconds(_read_clock())
+
+
+# Output and clock functions, replaced by ic.print and ic.time on the IC
+_write_output: Callable[[str], None] = print
+_read_clock: Callable[[], float] = time.time
+
+
+def _output_line(line: str) -> None:
+    """Print a log line, or queue it when output buffering is enabled"""
+    global _OUTPUT_BUFFER_BYTES
+    if not _OUTPUT_BUFFERING:
+        _write_output(line)
+        return
+    _OUTPUT_BUFFER.append(line)
+    _OUTPUT_BUFFER_BYTES += len(line) + 1
+    if _OUTPUT_BUFFER_BYTES >= _MAX_OUTPUT_BUFFER_BYTES:
+        _flush_output()
+
+
+def _flush_output() -> None:
+    """Emit all queued lines with a single output call
+
+    Also starts a new execution timestamp, so that entries logged after an
+    early flush on the size threshold do not keep an old time.
+    """
+    global _OUTPUT_BUFFER_BYTES, _EXECUTION_TIMESTAMP
+    _EXECUTION_TIMESTAMP = None
+    if not _OUTPUT_BUFFER:
+        return
+    text = "\n".join(_OUTPUT_BUFFER)
+    _OUTPUT_BUFFER.clear()
+    _OUTPUT_BUFFER_BYTES = 0
+    _write_output(text)
+
+
+def _entry_timestamp() -> float:
+    """Timestamp for a new entry
+
+    While output is buffered the clock is read once and reused until the
+    buffered lines are flushed, as the IC time does not change within a
+    message execution.
+    """
+    global _EXECUTION_TIMESTAMP
+    if not _OUTPUT_BUFFERING:
+        return _read_clock()
+    if _EXECUTION_TIMESTAMP is None:
+        _EXECUTION_TIMESTAMP = _read_clock()
+    return _EXECUTION_TIMESTAMP
+
+
 # Define a safe fallback first
-def _print_log(level: Level, message: str, logger_name: str) -> None:
+def _print_log(
+    level: Level,
+    message: Union[str, Callable[[], str]],
+    logger_name: str,
+    args: tuple = (),
+    fields: Optional[Dict[str, Any]] = None,
+) -> None:
     if not _LOGGING_ENABLED:
         return
-    print(f"[{level}] [{logger_name}] {message}")
+    text = _render_message(message, args)
+    line = _render_fields(text, fields) if fields else text
+    _output_line(f"[{level}] [{logger_name}] {line}")
     # Store in memory regardless of print settings
-    _store_log_entry(level, message, logger_name)
+    if _MEMORY_LOGGING_ENABLED:
+        message, args = _storable_message(message, args, text)
+        _store_log_entry(
+            level,
+            message,
+            logger_name,
+            args,
+            _storable_fields(fields) if fields else (),
+        )
 
 
-def _store_log_entry(level: Level, message: str, logger_name: str) -> None:
+def _store_log_entry(
+    level: Level,
+    message: str,
+    logger_name: str,
+    args: tuple = (),
+    fields: tuple = (),
+) -> None:
     """Store a log entry in the memory buffer if memory logging is enabled"""
     if not _MEMORY_LOGGING_ENABLED:
         return
@@ -76,13 +882,17 @@ def _store_log_entry(level: Level, message: str, logger_name: str) -> None:
     _LOG_SEQUENCE_COUNTER += 1
 
     entry = LogEntry(
-        timestamp=time.time(),
+        timestamp=_entry_timestamp(),
         level=level,
         logger_name=logger_name,
-        message=message,
+        template=message,
         id=_LOG_SEQUENCE_COUNTER,
+        args=args,
+        fields=fields,
     )
-    _LOG_STORAGE.append(entry)
+    size = _entry_bytes(entry)
+    _count_log_entry(entry, size)
+    _append_log_entry(entry, size)
 
 
 # Now try to use the IC-specific functionality if available and working
@@ -99,35 +909,9 @@ try:
         # If we get here, ic.print works!
         _in_ic_environment = True
 
-        # Override the print_log function with IC-specific version
-        def _ic_print_log(level: Level, message: str, logger_name: str) -> None:
-            if not _LOGGING_ENABLED:
-                return
-            ic.print(f"[{level}] [{logger_name}] {message}")
-            # Store in memory regardless of print settings
-            _store_log_entry(level, message, logger_name)
-
-        # Define IC-specific version of store_log_entry using ic.time()
-        def _ic_store_log_entry(level: Level, message: str, logger_name: str) -> None:
-            """Store a log entry in the memory buffer if memory logging is enabled"""
-            if not _MEMORY_LOGGING_ENABLED:
-                return
-
-            global _LOG_SEQUENCE_COUNTER
-            _LOG_SEQUENCE_COUNTER += 1
-
-            entry = LogEntry(
-                timestamp=ic.time(),
-                level=level,
-                logger_name=logger_name,
-                message=message,
-                id=_LOG_SEQUENCE_COUNTER,
-            )
-            _LOG_STORAGE.append(entry)
-
-        # Replace the regular functions with IC versions
-        _print_log = _ic_print_log
-        _store_log_entry = _ic_store_log_entry
+        # Print and timestamp through the IC; everything else is shared
+        _write_output = ic.print
+        _read_clock = ic.time
 
     except:
         # If we get an error trying to use ic.print, fall back to regular print
@@ -135,80 +919,448 @@ try:
 
 except ImportError:
     # If kybra isn't available, we're definitely not in an IC environment
-    print("Note: Kybra not available, using regular print for logging")
+    # Written to stderr, so that it does not mix with kslog's output
+    print("Note: Kybra not available, using regular print for logging", file=sys.stderr)
+
+
+class _Throttle:
+    """Token bucket rate limit and/or sampling for one level of a logger"""
+
+    def __init__(self):
+        self.rate: Optional[float] = None  # Messages per second
+        self.burst = 1.0
+        self.tokens = 1.0
+        self.updated = 0.0
+        self.every: Optional[int] = None  # Keep 1 in N messages
+        self.probability: Optional[float] = None  # Keep each with this chance
+        self.seen = 0
+        self.suppressed = 0
+        self.suppressed_since = 0.0  # Time of the oldest unreported drop
+        self.last_summary = 0.0
+
+    def is_active(self) -> bool:
+        return (
+            self.rate is not None
+            or self.every is not None
+            or self.probability is not None
+        )
+
+    def allow(self) -> bool:
+        """Decide whether the next message goes through, counting drops"""
+        if self.every is not None:
+            self.seen += 1
+            if (self.seen - 1) % self.every:
+                return self._drop()
+        if self.probability is not None and random.random() >= self.probability:
+            return self._drop()
+        if self.rate is not None:
+            now = _now()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens < 1:
+                return self._drop()
+            self.tokens -= 1
+        return True
+
+    def _drop(self) -> bool:
+        if not self.suppressed:
+            self.suppressed_since = _now()
+        self.suppressed += 1
+        return False
+
+    def take_summary(self, dropping: bool = False) -> int:
+        """Return and reset the suppressed count if a summary is due
+
+        Args:
+            dropping: Whether the current message was dropped. A summary is
+                then only due once drops have been pending for a whole
+                interval, so that a flood that lets nothing through is still
+                reported periodically.
+        """
+        if not self.suppressed:
+            return 0
+        now = _now()
+        if now - self.last_summary < _SUPPRESSION_SUMMARY_INTERVAL:
+            return 0
+        if dropping and now - self.suppressed_since < _SUPPRESSION_SUMMARY_INTERVAL:
+            return 0
+        suppressed = self.suppressed
+        self.suppressed = 0
+        self.last_summary = now
+        return suppressed
+
+
+def _noop(*args: Any, **kwargs: Any) -> None:
+    """Stand-in for the logging methods of disabled levels"""
+
+
+# Default of the logging method arguments that may also be given by keyword
+_NO_ARGUMENT: Any = object()
+
+
+def _keyword_argument(fields: Dict[str, Any], name: str) -> Any:
+    """Take an argument that was given by keyword out of the fields
+
+    The logging methods take their arguments positionally, so that any
+    keyword can be a field, but `message=` and `level=` are accepted when
+    they were not given positionally.
+    """
+    if name not in fields:
+        raise TypeError(f"missing required argument: '{name}'")
+    return fields.pop(name)
 
 
 class SimpleLogger:
-    def __init__(self, name: str = "kybra_simple_logger", level: Level = Level.INFO):
+    # Logging methods and the level they emit at
+    _LEVEL_METHODS = (
+        ("debug", Level.DEBUG),
+        ("info", Level.INFO),
+        ("warning", Level.WARNING),
+        ("warn", Level.WARNING),
+        ("error", Level.ERROR),
+        ("critical", Level.CRITICAL),
+    )
+
+    def __init__(
+        self, name: str = "kybra_simple_logger", level: Optional[Level] = Level.INFO
+    ):
         self.name = name
-        self.level = level
+        # Level set on this logger, or None to inherit it from the closest
+        # dotted ancestor ("a.b" for "a.b.c") that has one
+        self.explicit_level = level
+        # Cached effective level, recomputed by _update_level() on changes
+        self._level = Level.INFO
+        self._throttles: Dict[Level, _Throttle] = {}
+        self._update_level()
+        _ALL_LOGGERS.add(self)
+
+    @property
+    def level(self) -> Level:
+        """Effective level; assigning it is the same as set_level()"""
+        return self._level
+
+    @level.setter
+    def level(self, level: Optional[Level]) -> None:
+        self.set_level(level)
+
+    def _update_level(self) -> None:
+        """Recompute the effective level and the level method bindings"""
+        if self.explicit_level is not None:
+            self._level = self.explicit_level
+        else:
+            self._level = _inherited_level(self.name)
+        self._bind_level_methods()
+
+    def _bind_level_methods(self) -> None:
+        """Replace the methods of disabled levels with no-ops
+
+        A disabled `logger.debug(...)` then returns without going through
+        log() and is_enabled_for(). Must be called whenever the level or
+        the global enabled state changes.
+        """
+        for method, level in self._LEVEL_METHODS:
+            if _LOGGING_ENABLED and self.is_enabled_for(level):
+                self.__dict__.pop(method, None)
+            else:
+                setattr(self, method, _noop)
+
+    def set_level(self, level: Optional[Level]) -> None:
+        """Set the minimum logging level
 
-    def set_level(self, level: Level) -> None:
-        """Set the minimum logging level"""
-        self.level = level
+        Loggers below this one in the dotted hierarchy that have no level of
+        their own inherit it. Pass None to inherit from the parent again.
+        """
+        self.explicit_level = level
+        self._update_level()
+        _refresh_loggers(self.name)
+
+    def get_effective_level(self) -> Level:
+        """Level this logger filters at, set on it or inherited"""
+        return self._level
 
     def is_enabled_for(self, level: Level) -> bool:
         """Check if this level should be logged"""
-        return int(level) >= int(self.level)
-
-    def log(self, level: Level, message: str) -> None:
+        return int(level) >= int(self._level)
+
+    def log(
+        self,
+        level: Level = _NO_ARGUMENT,
+        message: Union[str, Callable[[], str]] = _NO_ARGUMENT,
+        /,
+        *args: Any,
+        **fields: Any,
+    ) -> None:
+        """Log a message at the given level
+
+        The message is only rendered if it is actually going to be emitted,
+        so both %-style arguments (``logger.debug("x=%s", x)``) and callables
+        (``logger.debug(lambda: expensive())``) cost almost nothing when the
+        level is disabled.
+
+        Keyword arguments are stored as structured fields next to the
+        message (``logger.info("transfer", amount=10)``) and can be used to
+        filter get_logs(). `level` and `message` may be given by keyword
+        too, and are then not stored as fields.
+        """
+        if level is _NO_ARGUMENT:
+            level = _keyword_argument(fields, "level")
+        if message is _NO_ARGUMENT:
+            message = _keyword_argument(fields, "message")
         if not self.is_enabled_for(level):
             return
-        _print_log(level, message, self.name)
-
-    def debug(self, message: str) -> None:
-        self.log(Level.DEBUG, message)
-
-    def info(self, message: str) -> None:
-        self.log(Level.INFO, message)
-
-    def warning(self, message: str) -> None:
-        self.log(Level.WARNING, message)
+        if self._throttles:
+            throttle = self._throttles.get(level)
+            if throttle is not None:
+                allowed = throttle.allow()
+                suppressed = throttle.take_summary(dropping=not allowed)
+                if suppressed:
+                    self._report_suppressed(level, suppressed)
+                if not allowed:
+                    return
+        _print_log(level, message, self.name, args, fields)
+
+    def _report_suppressed(self, level: Level, suppressed: int) -> None:
+        _print_log(
+            level,
+            "%d %s messages suppressed by rate limiting or sampling",
+            self.name,
+            (suppressed, level.name),
+        )
 
-    def warn(self, message: str) -> None:
-        self.warning(message)
+    def _throttle_for(self, level: Level) -> _Throttle:
+        throttle = self._throttles.get(level)
+        if throttle is None:
+            throttle = self._throttles[level] = _Throttle()
+        return throttle
+
+    def _prune_throttles(self) -> None:
+        throttles = {}
+        for level, throttle in self._throttles.items():
+            if throttle.is_active():
+                throttles[level] = throttle
+            elif throttle.suppressed:
+                # Report what was dropped before the limit was removed
+                self._report_suppressed(level, throttle.suppressed)
+        self._throttles = throttles
+
+    def set_rate_limit(
+        self,
+        per_second: Optional[float],
+        burst: Optional[int] = None,
+        level: Optional[Level] = None,
+    ) -> None:
+        """Limit how many messages per second this logger emits
+
+        Uses a token bucket: up to `burst` messages can go through at once,
+        refilled at `per_second`. Dropped messages are counted and reported
+        periodically in a "N messages suppressed" entry, and once more when
+        the limit is removed.
 
-    def error(self, message: str) -> None:
-        self.log(Level.ERROR, message)
+        Args:
+            per_second: Sustained messages per second, or None to remove
+                the limit
+            burst: Bucket size (defaults to max(1, per_second))
+            level: Only limit this level, or None for all levels
+        """
+        for lvl in Level if level is None else [level]:
+            throttle = self._throttle_for(lvl)
+            throttle.rate = per_second
+            if per_second is not None:
+                throttle.burst = float(
+                    max(1.0, per_second) if burst is None else max(1, burst)
+                )
+                throttle.tokens = throttle.burst
+                throttle.updated = _now()
+        self._prune_throttles()
+
+    def set_sampling(
+        self,
+        every: Optional[int] = None,
+        probability: Optional[float] = None,
+        level: Optional[Level] = None,
+    ) -> None:
+        """Only keep a sample of this logger's messages
 
-    def critical(self, message: str) -> None:
-        self.log(Level.CRITICAL, message)
+        Args:
+            every: Keep 1 message out of every N, or None
+            probability: Keep each message with this probability (0 to 1),
+                or None
+            level: Only sample this level, or None for all levels
+        """
+        for lvl in Level if level is None else [level]:
+            throttle = self._throttle_for(lvl)
+            throttle.every = None if every is None else max(1, every)
+            throttle.probability = probability
+            throttle.seen = 0
+        self._prune_throttles()
+
+    def debug(
+        self,
+        message: Union[str, Callable[[], str]] = _NO_ARGUMENT,
+        /,
+        *args: Any,
+        **fields: Any,
+    ) -> None:
+        self.log(Level.DEBUG, message, *args, **fields)
+
+    def info(
+        self,
+        message: Union[str, Callable[[], str]] = _NO_ARGUMENT,
+        /,
+        *args: Any,
+        **fields: Any,
+    ) -> None:
+        self.log(Level.INFO, message, *args, **fields)
+
+    def warning(
+        self,
+        message: Union[str, Callable[[], str]] = _NO_ARGUMENT,
+        /,
+        *args: Any,
+        **fields: Any,
+    ) -> None:
+        self.log(Level.WARNING, message, *args, **fields)
+
+    def warn(
+        self,
+        message: Union[str, Callable[[], str]] = _NO_ARGUMENT,
+        /,
+        *args: Any,
+        **fields: Any,
+    ) -> None:
+        self.warning(message, *args, **fields)
+
+    def error(
+        self,
+        message: Union[str, Callable[[], str]] = _NO_ARGUMENT,
+        /,
+        *args: Any,
+        **fields: Any,
+    ) -> None:
+        self.log(Level.ERROR, message, *args, **fields)
+
+    def critical(
+        self,
+        message: Union[str, Callable[[], str]] = _NO_ARGUMENT,
+        /,
+        *args: Any,
+        **fields: Any,
+    ) -> None:
+        self.log(Level.CRITICAL, message, *args, **fields)
 
 
 # Public API functions
 def get_logger(name: str = "kybra_simple_logging") -> SimpleLogger:
-    """Get or create a logger with the specified name"""
+    """Get or create a logger with the specified name
+
+    Dotted names form a hierarchy: "dao.treasury.transfers" inherits the
+    level of "dao.treasury", then "dao", unless it has a level of its own.
+    """
     if name not in _LOGGERS:
-        _LOGGERS[name] = SimpleLogger(name)
+        _LOGGERS[name] = SimpleLogger(name, level=None)
     return _LOGGERS[name]
 
 
+def _inherited_level(name: str) -> Level:
+    """Level of the closest ancestor of `name` that has one set"""
+    while "." in name:
+        name = name.rsplit(".", 1)[0]
+        parent = _LOGGERS.get(name)
+        if parent is not None and parent.explicit_level is not None:
+            return parent.explicit_level
+    return _LEVELS_BY_VALUE[_ROOT_LEVEL]
+
+
 def set_log_level(level: Level, logger_name: Optional[str] = None) -> None:
     """Set log level for all loggers or a specific one
 
     Args:
         level: The log level to set (e.g., Level.DEBUG, Level.INFO)
-        logger_name: Optional name of logger to set level for, or None for all loggers
+        logger_name: Optional name of logger to set level for, or None for all loggers.
+            The level also applies to its descendants ("dao" covers "dao.treasury").
     """
+    global _ROOT_LEVEL
     if logger_name is not None:
-        if logger_name in _LOGGERS:
-            _LOGGERS[logger_name].set_level(level)
+        get_logger(logger_name).set_level(level)
     else:
-        # Set for all loggers
+        # Set for all loggers: they all inherit the new root level
+        _ROOT_LEVEL = int(level)
         for logger in _LOGGERS.values():
-            logger.set_level(level)
+            logger.explicit_level = None
+        _refresh_loggers()
 
 
 def disable_logging() -> None:
     """Completely disable all logging"""
     global _LOGGING_ENABLED
     _LOGGING_ENABLED = False
+    _refresh_loggers()
 
 
 def enable_logging() -> None:
     """Re-enable logging"""
     global _LOGGING_ENABLED
     _LOGGING_ENABLED = True
+    _refresh_loggers()
+
+
+def _refresh_loggers(parent: Optional[str] = None) -> None:
+    """Recompute the cached levels after a change
+
+    Args:
+        parent: Only refresh the descendants of this logger, or None for all
+    """
+    prefix = None if parent is None else parent + "."
+    for logger in list(_ALL_LOGGERS):
+        if prefix is None or logger.name.startswith(prefix):
+            logger._update_level()
+
+
+def set_output_buffering(enabled: bool, max_bytes: Optional[int] = None) -> None:
+    """Accumulate printed log lines and emit them in a single print
+
+    Every ic.print is a separate system call, so buffering the lines of a
+    message execution and printing them together at the end is cheaper.
+    Lines are emitted by flush_logs() (see also flush_logs_after), or
+    earlier once `max_bytes` of text is pending. While buffering, entries
+    logged before the next flush share one timestamp.
+
+    Args:
+        enabled: Whether to buffer output. Disabling flushes pending lines.
+        max_bytes: Pending text size that triggers an early flush (optional)
+    """
+    global _OUTPUT_BUFFERING, _MAX_OUTPUT_BUFFER_BYTES
+    if max_bytes is not None:
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+        _MAX_OUTPUT_BUFFER_BYTES = max_bytes
+    if not enabled:
+        flush_logs()
+    _OUTPUT_BUFFERING = enabled
+
+
+def flush_logs() -> None:
+    """Emit buffered log lines and start a new execution timestamp"""
+    _flush_output()
+
+
+def flush_logs_after(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Decorator that calls flush_logs() when the function returns or raises
+
+    Place it below @update, @heartbeat etc. so that the lines logged during
+    the call are printed together at the end of the message execution.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        try:
+            return func(*args, **kwargs)
+        finally:
+            flush_logs()
+
+    return wrapper
 
 
 # Debug variable storage functions
@@ -255,6 +1407,10 @@ def get_logs(
     max_entries: Optional[int] = None,
     min_level: Optional[Level] = None,
     logger_name: Optional[str] = None,
+    fields: Optional[Dict[str, Any]] = None,
+    contains: Optional[str] = None,
+    from_time: Optional[Union[int, float]] = None,
+    to_time: Optional[Union[int, float]] = None,
 ) -> List[Dict[str, Any]]:
     """Retrieve logs from memory with optional filtering
 
@@ -263,31 +1419,445 @@ def get_logs(
         max_entries: Maximum number of entries to return (oldest first by default)
         min_level: Minimum log level to include
         logger_name: Filter logs to a specific logger
+        fields: Only include entries whose structured fields have these
+            values (compared as strings)
+        contains: Only include entries whose message contains this text,
+            ignoring case and matching whole words
+        from_time: Only include entries logged at or after this time
+        to_time: Only include entries logged at or before this time
+
+    Note:
+        Times use the unit of the entry timestamps: nanoseconds from
+        ic.time() in a canister, seconds from time.time() elsewhere.
 
     Returns:
         List of log entries as dictionaries
     """
-    # Create a copy of the logs to avoid modifying the original
-    logs = list(_LOG_STORAGE)
-
-    logs = [
-        log
-        for log in logs
-        if (from_entry is None or log.id >= from_entry)
-        and (min_level is None or log.level >= min_level)
-        and (logger_name is None or log.logger_name == logger_name)
-    ]
-
-    # Limit the number of entries if requested - return the LAST entries (most recent)
-    logs = logs[-max_entries:] if max_entries is not None else logs
+    matching = _iter_matching_logs(
+        from_entry,
+        min_level,
+        logger_name,
+        fields=fields,
+        contains=contains,
+        from_time=from_time,
+        to_time=to_time,
+    )
+    # Entries come newest first so that we can stop as soon as max_entries
+    # matches are collected (the most recent ones are returned)
+    logs = list(islice(matching, None if max_entries is None else max(0, max_entries)))
+    logs.reverse()
 
     # Convert to dictionaries for easier serialization
     return [log.to_dict() for log in logs]
 
 
+def get_logs_page(
+    from_entry: Optional[int] = None,
+    max_entries: Optional[int] = None,
+    min_level: Optional[Level] = None,
+    logger_name: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    fields: Optional[Dict[str, Any]] = None,
+    contains: Optional[str] = None,
+    from_time: Optional[Union[int, float]] = None,
+    to_time: Optional[Union[int, float]] = None,
+) -> Dict[str, Any]:
+    """Retrieve logs like get_logs, but stop once a reply size budget is reached
+
+    Pass the returned next_from_entry as from_entry (without max_entries)
+    to fetch the following page.
+
+    Args:
+        from_entry: Start from a specific log entry ID
+        max_entries: Only consider the most recent N matching entries
+        min_level: Minimum log level to include
+        logger_name: Filter logs to a specific logger
+        max_bytes: Estimated encoded size budget for the page
+        fields: Only include entries whose structured fields have these
+            values (compared as strings)
+        contains: Only include entries whose message contains this text,
+            ignoring case and matching whole words
+        from_time: Only include entries logged at or after this time
+        to_time: Only include entries logged at or before this time
+
+    Returns:
+        Dictionary with the page "entries" (as dictionaries), the
+        "next_from_entry" cursor and "has_more" if entries were left out
+    """
+    entries, next_from_entry, has_more = _select_page(
+        from_entry,
+        max_entries,
+        min_level,
+        logger_name,
+        max_bytes,
+        fields=fields,
+        contains=contains,
+        from_time=from_time,
+        to_time=to_time,
+    )
+    return {
+        "entries": [log.to_dict() for log in entries],
+        "next_from_entry": next_from_entry,
+        "has_more": has_more,
+    }
+
+
+def get_logs_blob(
+    from_entry: Optional[int] = None,
+    max_entries: Optional[int] = None,
+    min_level: Optional[Level] = None,
+    logger_name: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    fields: Optional[Dict[str, Any]] = None,
+    contains: Optional[str] = None,
+    from_time: Optional[Union[int, float]] = None,
+    to_time: Optional[Union[int, float]] = None,
+    compress: bool = True,
+) -> Dict[str, Any]:
+    """Retrieve a page of logs like get_logs_page, encoded as a binary batch
+
+    Encoding the whole page as one blob avoids per-field Candid encoding
+    and the JSON rendering of records by dfx. Decode it with
+    decode_log_batch().
+
+    Args:
+        compress: Whether to zlib-compress the batch (see get_logs_page
+            for the other arguments)
+
+    Returns:
+        Dictionary with the encoded "data", the "next_from_entry" cursor
+        and "has_more" if entries were left out
+    """
+    entries, next_from_entry, has_more = _select_page(
+        from_entry,
+        max_entries,
+        min_level,
+        logger_name,
+        max_bytes,
+        fields=fields,
+        contains=contains,
+        from_time=from_time,
+        to_time=to_time,
+    )
+    return {
+        "data": encode_log_batch(entries, compress=compress),
+        "next_from_entry": next_from_entry,
+        "has_more": has_more,
+    }
+
+
+def _select_page(
+    from_entry: Optional[int],
+    max_entries: Optional[int],
+    min_level: Optional[Level],
+    logger_name: Optional[str],
+    max_bytes: Optional[int],
+    **filters: Any,
+) -> Tuple[List[LogEntry], int, bool]:
+    """Select the entries of a page within the size budget
+
+    Returns:
+        The entries, the cursor of the next page and whether entries were
+        left out
+    """
+    budget = _MAX_PAGE_BYTES if max_bytes is None else max_bytes
+
+    if max_entries is None:
+        selected = _iter_matching_logs(
+            from_entry, min_level, logger_name, newest_first=False, **filters
+        )
+    else:
+        matching = _iter_matching_logs(from_entry, min_level, logger_name, **filters)
+        selected = list(islice(matching, max(0, max_entries)))
+        selected.reverse()
+
+    entries: List[LogEntry] = []
+    size = 0
+    has_more = False
+    for log in selected:
+        size += _entry_bytes(log) + _ENTRY_ENCODING_OVERHEAD
+        # Always return at least one entry so that paging makes progress
+        if entries and size > budget:
+            has_more = True
+            break
+        entries.append(log)
+
+    # Everything up to the newest entry has been scanned unless we stopped
+    # early
+    next_from_entry = entries[-1].id + 1 if has_more else _LOG_SEQUENCE_COUNTER + 1
+    return entries, next_from_entry, has_more
+
+
+def _iter_matching_logs(
+    from_entry: Optional[int],
+    min_level: Optional[Level],
+    logger_name: Optional[str],
+    newest_first: bool = True,
+    fields: Optional[Dict[str, Any]] = None,
+    contains: Optional[str] = None,
+    from_time: Optional[Union[int, float]] = None,
+    to_time: Optional[Union[int, float]] = None,
+):
+    """Yield the stored entries matching the filters, from from_entry onwards"""
+    if not _LOG_STORAGE:
+        return
+
+    min_id, max_id = from_entry, None
+    if from_time is not None or to_time is not None:
+        # Timestamps grow with IDs, so a time window is an ID range
+        id_range = _time_id_range(from_time, to_time)
+        if id_range is None:
+            return
+        min_id = id_range[0] if min_id is None else max(min_id, id_range[0])
+        max_id = id_range[1]
+
+    tokens = None if contains is None else _message_tokens(contains)
+    candidate_ids = _candidate_ids(
+        min_level, logger_name, min_id, newest_first, fields, tokens, max_id
+    )
+    if candidate_ids is None:
+        # No selective filter: walk the buffer itself between the cursors
+        size = len(_LOG_STORAGE)
+        start = 0 if min_id is None else _find_position(min_id)
+        end = size if max_id is None else _find_position(max_id + 1)
+        if isinstance(_LOG_STORAGE, deque):
+            if newest_first:
+                candidates = islice(reversed(_LOG_STORAGE), size - end, size - start)
+            else:
+                candidates = islice(_LOG_STORAGE, start, end)
+        else:
+            # Index the window directly, so that the other engines only
+            # build (and the segmented one only decompresses) what it spans
+            positions = (
+                range(end - 1, start - 1, -1) if newest_first else range(start, end)
+            )
+            candidates = (_LOG_STORAGE[i] for i in positions)
+    else:
+        first_id = _oldest_stored_id()
+        candidates = (_entry_by_id(entry_id, first_id) for entry_id in candidate_ids)
+
+    for log in candidates:
+        if (
+            (min_level is None or log.level >= min_level)
+            and (logger_name is None or log.logger_name == logger_name)
+            and (not fields or _fields_match(log.fields, fields))
+            and (
+                contains is None or _contains_match(log.get_message(), contains, tokens)
+            )
+        ):
+            yield log
+
+
+def _candidate_ids(
+    min_level: Optional[Level],
+    logger_name: Optional[str],
+    min_id: Optional[int],
+    newest_first: bool = True,
+    fields: Optional[Dict[str, Any]] = None,
+    tokens: Optional[List[str]] = None,
+    max_id: Optional[int] = None,
+):
+    """Pick the most selective secondary index for a query
+
+    Returns:
+        An iterator over candidate entry IDs in the requested order, or None
+        if no index applies and the buffer should be scanned directly
+    """
+    indexes = []
+    if logger_name is not None:
+        logger_index = _LOGGER_INDEX.get(logger_name)
+        if logger_index is None:
+            return iter(())
+        indexes.append(logger_index)
+    for name, value in (fields or {}).items():
+        values = _FIELD_INDEX.get(name)
+        if values is not None:
+            field_index = values.get(str(value))
+            if field_index is None:
+                return iter(())
+            indexes.append(field_index)
+    if tokens and _TOKEN_INDEX_ENABLED:
+        for token in tokens:
+            token_index = _TOKEN_INDEX.get(token)
+            if token_index is None:
+                return iter(())
+            indexes.append(token_index)
+
+    level_indexes = []
+    if min_level is not None and min_level > min(Level):
+        level_indexes = [
+            index for level, index in _LEVEL_INDEX.items() if level >= min_level
+        ]
+
+    best_index = min(indexes, key=len, default=None)
+    if best_index is not None and (
+        not level_indexes or len(best_index) <= sum(map(len, level_indexes))
+    ):
+        return best_index.iter_ids(min_id, newest_first, max_id)
+    if level_indexes:
+        return heapq.merge(
+            *(index.iter_ids(min_id, newest_first, max_id) for index in level_indexes),
+            reverse=newest_first,
+        )
+    return None
+
+
+def _time_id_range(
+    from_time: Optional[Union[int, float]], to_time: Optional[Union[int, float]]
+) -> Optional[Tuple[int, int]]:
+    """IDs of the oldest and newest stored entries inside a time window
+
+    Returns:
+        The (min_id, max_id) pair, or None if no stored entry is in the window
+    """
+    start = 0 if from_time is None else _find_time_position(from_time)
+    if to_time is None:
+        end = len(_LOG_STORAGE)
+    else:
+        end = _find_time_position(to_time, right=True)
+    if start >= end:
+        return None
+    return _LOG_STORAGE[start].id, _LOG_STORAGE[end - 1].id
+
+
+def _find_time_position(timestamp: Union[int, float], right: bool = False) -> int:
+    """Binary search the position of the first entry logged at or after
+    `timestamp` (strictly after it if `right`)
+
+    Entries are stored in logging order, and the clock does not go back, so
+    the timestamps are sorted.
+    """
+    if isinstance(_LOG_STORAGE, _SegmentedLogStorage):
+        return _LOG_STORAGE.find_time(timestamp, right)
+    search = bisect_right if right else bisect_left
+    return search(_LOG_STORAGE, timestamp, key=lambda log: log.timestamp)
+
+
+def _entry_by_id(entry_id: int, first_id: int) -> LogEntry:
+    """Fetch a stored entry by ID given the ID of the oldest stored entry"""
+    log = _LOG_STORAGE[entry_id - first_id]
+    if log.id != entry_id:
+        log = _LOG_STORAGE[_find_position(entry_id)]
+    return log
+
+
+def _oldest_stored_id() -> int:
+    """ID of the oldest stored entry, without materializing it when possible"""
+    if isinstance(_LOG_STORAGE, deque):
+        return _LOG_STORAGE[0].id
+    return _LOG_STORAGE.first_id
+
+
+def _newest_stored_id() -> int:
+    """ID of the newest stored entry, without materializing it when possible"""
+    if isinstance(_LOG_STORAGE, deque):
+        return _LOG_STORAGE[-1].id
+    return _LOG_STORAGE.last_id
+
+
+def _find_position(entry_id: int) -> int:
+    """Return the position of the first stored entry whose ID is >= entry_id
+
+    IDs are assigned sequentially and evicted oldest first, so inside the
+    buffer they are contiguous and the position is usually a simple offset
+    from the oldest ID. A binary search is used as a fallback.
+    """
+    size = len(_LOG_STORAGE)
+    if size == 0:
+        return 0
+    first_id = _oldest_stored_id()
+    if entry_id <= first_id:
+        return 0
+    if entry_id > _newest_stored_id():
+        return size
+
+    position = entry_id - first_id
+    if position < size and _LOG_STORAGE[position].id == entry_id:
+        return position
+    return bisect_left(_LOG_STORAGE, entry_id, key=lambda log: log.id)
+
+
 def clear_logs() -> None:
     """Clear all logs from memory"""
     _LOG_STORAGE.clear()
+    _reset_log_indexes()
+    _MESSAGE_TEMPLATES.clear()
+
+
+def get_log_stats(since: Optional[float] = None) -> Dict[str, Any]:
+    """Return counters maintained as entries are stored
+
+    The counters cover every entry stored since the last reset_log_stats(),
+    including those since evicted from the buffer, and are read without
+    scanning the entries.
+
+    Args:
+        since: Only return time buckets that end after this time, in
+            seconds since the epoch (optional)
+
+    Returns:
+        Dictionary with the "total_entries" and "total_bytes" stored, the
+        counts per "levels" and "loggers", the "bucket_seconds" width and the
+        "buckets" list of {"start": seconds, "counts": {level: count}}
+    """
+    buckets = [
+        {"start": start, "counts": {str(level): n for level, n in counts.items()}}
+        for start, counts in _LOG_STATS_BUCKETS
+        if since is None or start + _LOG_STATS_BUCKET_SECONDS > since
+    ]
+    return {
+        "total_entries": _LOG_STATS_ENTRIES,
+        "total_bytes": _LOG_STATS_BYTES,
+        "levels": {str(level): n for level, n in _LOG_STATS_LEVELS.items()},
+        "loggers": dict(_LOG_STATS_LOGGERS),
+        "bucket_seconds": _LOG_STATS_BUCKET_SECONDS,
+        "buckets": buckets,
+    }
+
+
+def get_log_head() -> Dict[str, int]:
+    """Return the IDs and counts of the stored entries, in constant time
+
+    Meant to be polled: whether last_id moved since the last look tells if
+    anything was logged, without touching the entries.
+
+    Returns:
+        Dictionary with the "last_id" assigned so far (0 before any entry),
+        the "first_id" still stored (last_id + 1 when none is), the number of
+        stored "entries", and the number of entries "evicted" to make room
+        for newer ones or to fit a lower limit. Entries removed by
+        clear_logs() are not counted as evicted.
+    """
+    entries = len(_LOG_STORAGE)
+    return {
+        "last_id": _LOG_SEQUENCE_COUNTER,
+        "first_id": _oldest_stored_id() if entries else _LOG_SEQUENCE_COUNTER + 1,
+        "entries": entries,
+        "evicted": _LOG_EVICTED,
+    }
+
+
+def reset_log_stats(
+    bucket_seconds: Optional[int] = None, max_buckets: Optional[int] = None
+) -> None:
+    """Reset the log statistics, optionally changing the time buckets
+
+    Args:
+        bucket_seconds: Width of each time bucket (defaults to 60)
+        max_buckets: Number of most recent buckets to keep (defaults to 1440)
+    """
+    global _LOG_STATS_ENTRIES, _LOG_STATS_BYTES, _LOG_STATS_BUCKETS
+    global _LOG_STATS_BUCKET_SECONDS, _MAX_LOG_STATS_BUCKETS
+    if bucket_seconds is not None:
+        _LOG_STATS_BUCKET_SECONDS = max(1, bucket_seconds)
+    if max_buckets is not None:
+        _MAX_LOG_STATS_BUCKETS = max(1, max_buckets)
+    _LOG_STATS_ENTRIES = 0
+    _LOG_STATS_BYTES = 0
+    for level in Level:
+        _LOG_STATS_LEVELS[level] = 0
+    _LOG_STATS_LOGGERS.clear()
+    _LOG_STATS_BUCKETS = deque(maxlen=_MAX_LOG_STATS_BUCKETS)
 
 
 def disable_memory_logging() -> None:
@@ -313,30 +1883,172 @@ def set_max_log_entries(max_entries: int) -> None:
     Args:
         max_entries: New maximum capacity of the log storage
     """
-    global _LOG_STORAGE, _MAX_LOG_ENTRIES
-    # Create a new deque with the new max length
+    global _LOG_STORAGE, _MAX_LOG_ENTRIES, _LOG_EVICTED
+    # Create a new storage with the new max length
     _MAX_LOG_ENTRIES = max(1, max_entries)  # Ensure at least 1 entry
-    new_storage = deque(maxlen=_MAX_LOG_ENTRIES)
+    new_storage = _new_log_storage(_MAX_LOG_ENTRIES)
 
-    # Transfer any existing logs (up to the new capacity)
+    # Transfer any existing logs (up to the new capacity), already ordered
+    # by ID (oldest first)
     logs = list(_LOG_STORAGE)
-    logs.sort(key=lambda log: log.timestamp)  # Sort by timestamp (oldest first)
 
     # Keep the newest logs if we're reducing capacity
     if len(logs) > _MAX_LOG_ENTRIES:
+        _LOG_EVICTED += len(logs) - _MAX_LOG_ENTRIES
         logs = logs[-_MAX_LOG_ENTRIES:]
 
-    # Add logs to the new storage
+    # Replace the old storage with the new one and re-add the logs,
+    # rebuilding the secondary indexes along the way
+    _LOG_STORAGE = new_storage
+    _reset_log_indexes()
     for log in logs:
-        new_storage.append(log)
+        _append_log_entry(log)
 
-    # Replace the old storage with the new one
-    _LOG_STORAGE = new_storage
+
+def set_max_log_bytes(max_bytes: Optional[int]) -> None:
+    """Bound the in-memory logs by the size of their content
+
+    The budget applies on top of the entry count limit: whichever is hit
+    first evicts the oldest entries. Sizes are the UTF-8 encoded length of
+    each message plus its logger name, which tracks the heap they use.
+
+    Args:
+        max_bytes: Maximum number of message and logger name bytes to keep,
+            or None to only limit the number of entries
+    """
+    global _MAX_LOG_BYTES
+    _MAX_LOG_BYTES = None if max_bytes is None else max(0, max_bytes)
+    if _MAX_LOG_BYTES is not None:
+        _enforce_log_bytes_budget()
+
+
+def get_log_bytes() -> int:
+    """Return the message and logger name bytes currently stored in memory"""
+    return _LOG_BYTES
+
+
+def get_log_memory_stats() -> Dict[str, int]:
+    """Report how much memory message templating and interning save
+
+    Walks the stored entries once, so it is meant for occasional diagnostics.
+
+    Returns:
+        Dictionary with the number of stored "entries", how many are
+        "templated_entries" (template plus arguments), the number of
+        "unique_messages" held, the "rendered_bytes" the messages would use
+        if each was stored as its own rendered string, the "stored_bytes"
+        actually used by shared messages and arguments, and the resulting
+        "saved_bytes"
+    """
+    unique_messages = set()
+    entries = templated_entries = rendered_bytes = stored_bytes = 0
+    for log in _LOG_STORAGE:
+        entries += 1
+        rendered_bytes += _text_bytes(log.get_message())
+        if log.template not in unique_messages:
+            unique_messages.add(log.template)
+            stored_bytes += _text_bytes(log.template)
+        if log.args:
+            templated_entries += 1
+            stored_bytes += _args_bytes(log.args)
+    return {
+        "entries": entries,
+        "templated_entries": templated_entries,
+        "unique_messages": len(unique_messages),
+        "rendered_bytes": rendered_bytes,
+        "stored_bytes": stored_bytes,
+        "saved_bytes": rendered_bytes - stored_bytes,
+    }
+
+
+def add_log_field_index(name: str) -> None:
+    """Index a structured field so that get_logs(fields=...) avoids scans
+
+    Each index keeps the IDs of the stored entries per distinct value of
+    the field, so it costs about 8 bytes per indexed entry.
+
+    Args:
+        name: Name of the field to index
+    """
+    if name in _FIELD_INDEX:
+        return
+    # Backfill the new index only: the others already hold these entries
+    values: Dict[str, _IdIndex] = {}
+    for log in _LOG_STORAGE:
+        fields = log.fields
+        for i in range(0, len(fields), 2):
+            if fields[i] == name:
+                key = str(fields[i + 1])
+                value_index = values.get(key)
+                if value_index is None:
+                    value_index = values[key] = _IdIndex()
+                value_index.append(log.id)
+    _FIELD_INDEX[name] = values
+
+
+def remove_log_field_index(name: str) -> None:
+    """Drop the index of a structured field"""
+    _FIELD_INDEX.pop(name, None)
+
+
+def enable_log_search_index() -> None:
+    """Keep an inverted index of message words for get_logs(contains=...)
+
+    The index is maintained on append and eviction and costs about 8 bytes
+    per distinct word of each stored message, plus rendering templated
+    messages once when they are stored and evicted.
+    """
+    global _TOKEN_INDEX_ENABLED
+    if _TOKEN_INDEX_ENABLED:
+        return
+    _TOKEN_INDEX_ENABLED = True
+    for log in _LOG_STORAGE:
+        _index_entry_tokens(log)
+
+
+def disable_log_search_index() -> None:
+    """Drop the message word index; searches scan the buffer instead"""
+    global _TOKEN_INDEX_ENABLED
+    _TOKEN_INDEX_ENABLED = False
+    _TOKEN_INDEX.clear()
+
+
+def set_log_storage(mode: str, segment_size: Optional[int] = None) -> None:
+    """Select the in-memory storage engine, keeping the stored logs
+
+    Args:
+        mode: "entries" to keep one LogEntry object per line (default),
+            "columnar" for a compact array-backed ring buffer that uses
+            several times less memory per entry, or "segmented" to keep
+            only the newest entries live and compress older ones in blocks
+        segment_size: Number of entries per compressed block in segmented
+            mode (defaults to 256)
+    """
+    global _LOG_STORAGE_MODE, _LOG_SEGMENT_SIZE
+    if mode not in ("entries", "columnar", "segmented"):
+        raise ValueError(f"Unknown log storage mode: {mode}")
+    _LOG_STORAGE_MODE = mode
+    if segment_size is not None:
+        _LOG_SEGMENT_SIZE = max(1, segment_size)
+    # Rebuild the storage in the new format
+    set_max_log_entries(_MAX_LOG_ENTRIES)
+
+
+def get_log_storage() -> str:
+    """Return the name of the active storage engine"""
+    return _LOG_STORAGE_MODE
 
 
 try:
     # Add Kybra imports for the query function
-    from kybra import Opt, Record, Vec, nat, query
+    from kybra import Opt, Record, Vec, blob, nat, query
+
+    # Define a public-facing structured field type for queries
+    class PublicLogField(Record):
+        """Public-facing structured field of a log entry, with its value as text"""
+
+        name: str
+        value: str
 
     # Define a public-facing LogEntry type for queries
     class PublicLogEntry(Record):
@@ -347,6 +2059,7 @@ try:
         logger_name: str
         message: str
         id: nat
+        fields: Vec[PublicLogField]
 
     @query
     def get_canister_logs(
@@ -354,6 +2067,10 @@ try:
         max_entries: Opt[int] = None,
         min_level: Opt[str] = None,
         logger_name: Opt[str] = None,
+        fields: Opt[Vec[PublicLogField]] = None,
+        contains: Opt[str] = None,
+        from_time: Opt[nat] = None,
+        to_time: Opt[nat] = None,
     ) -> Vec[PublicLogEntry]:
         """Query function to retrieve logs from the canister
 
@@ -363,6 +2080,11 @@ try:
             max_entries: Maximum number of entries to return
             min_level: Minimum log level to include
             logger_name: Filter logs to a specific logger
+            fields: Only include entries with these structured field values
+            contains: Only include entries whose message contains this text,
+                ignoring case and matching whole words
+            from_time: Only include entries logged at or after this time (ns)
+            to_time: Only include entries logged at or before this time (ns)
 
         Returns:
             List of log entries
@@ -373,19 +2095,226 @@ try:
             max_entries=max_entries,
             min_level=None if min_level is None else Level[min_level],
             logger_name=logger_name,
+            fields=_from_public_log_fields(fields),
+            contains=contains,
+            from_time=from_time,
+            to_time=to_time,
         )
 
         # Convert to PublicLogEntry objects
-        return [
-            PublicLogEntry(
-                timestamp=log["timestamp"],
-                level=log["level"],
-                logger_name=log["logger_name"],
-                message=log["message"],
-                id=log["id"],
-            )
-            for log in logs
-        ]
+        return [_to_public_log_entry(log) for log in logs]
+
+    # Define a page of log entries returned by the paged query
+    class PublicLogPage(Record):
+        """Public-facing page of log entries for paged canister queries"""
+
+        entries: Vec[PublicLogEntry]
+        next_from_entry: nat
+        has_more: bool
+
+    @query
+    def get_canister_logs_page(
+        from_entry: Opt[int] = None,
+        max_entries: Opt[int] = None,
+        min_level: Opt[str] = None,
+        logger_name: Opt[str] = None,
+        max_bytes: Opt[int] = None,
+        fields: Opt[Vec[PublicLogField]] = None,
+        contains: Opt[str] = None,
+        from_time: Opt[nat] = None,
+        to_time: Opt[nat] = None,
+    ) -> PublicLogPage:
+        """Query function to retrieve logs one reply-sized page at a time
+
+        Args:
+            from_entry: Start from a specific log entry ID
+            max_entries: Only consider the most recent N matching entries
+            min_level: Minimum log level to include
+            logger_name: Filter logs to a specific logger
+            max_bytes: Estimated encoded size budget for the page
+            fields: Only include entries with these structured field values
+            contains: Only include entries whose message contains this text,
+                ignoring case and matching whole words
+            from_time: Only include entries logged at or after this time (ns)
+            to_time: Only include entries logged at or before this time (ns)
+
+        Returns:
+            The page entries, the cursor for the next page and whether more
+            entries are available
+        """
+        page = get_logs_page(
+            from_entry=from_entry,
+            max_entries=max_entries,
+            min_level=None if min_level is None else Level[min_level],
+            logger_name=logger_name,
+            max_bytes=max_bytes,
+            fields=_from_public_log_fields(fields),
+            contains=contains,
+            from_time=from_time,
+            to_time=to_time,
+        )
+        return PublicLogPage(
+            entries=[_to_public_log_entry(log) for log in page["entries"]],
+            next_from_entry=page["next_from_entry"],
+            has_more=page["has_more"],
+        )
+
+    # Define the statistics types returned by the stats query
+    class PublicLogCount(Record):
+        """Number of entries stored for one level or logger"""
+
+        name: str
+        count: nat
+
+    class PublicLogBucket(Record):
+        """Entry counts per level for one time bucket"""
+
+        start: nat  # Seconds since the epoch
+        counts: Vec[PublicLogCount]
+
+    class PublicLogStats(Record):
+        """Public-facing log statistics for canister queries"""
+
+        total_entries: nat
+        total_bytes: nat
+        levels: Vec[PublicLogCount]
+        loggers: Vec[PublicLogCount]
+        bucket_seconds: nat
+        buckets: Vec[PublicLogBucket]
+
+    @query
+    def get_canister_log_stats(since: Opt[nat] = None) -> PublicLogStats:
+        """Query function to retrieve the log statistics
+
+        Costs O(buckets + loggers), whatever the number of stored entries.
+
+        Args:
+            since: Only return time buckets that end after this time, in
+                seconds since the epoch
+
+        Returns:
+            Counts per level, logger and time bucket, and total bytes
+        """
+        return _to_public_log_stats(get_log_stats(since=since))
+
+    def _to_public_log_stats(stats: Dict[str, Any]) -> PublicLogStats:
+        """Convert a get_log_stats dictionary to its public record type"""
+        return PublicLogStats(
+            total_entries=stats["total_entries"],
+            total_bytes=stats["total_bytes"],
+            levels=_to_public_log_counts(stats["levels"]),
+            loggers=_to_public_log_counts(stats["loggers"]),
+            bucket_seconds=stats["bucket_seconds"],
+            buckets=[
+                PublicLogBucket(
+                    start=bucket["start"],
+                    counts=_to_public_log_counts(bucket["counts"]),
+                )
+                for bucket in stats["buckets"]
+            ],
+        )
+
+    def _to_public_log_counts(counts: Dict[str, int]) -> List[PublicLogCount]:
+        return [PublicLogCount(name=name, count=n) for name, n in counts.items()]
+
+    # Define the head of the log returned by the probe query
+    class PublicLogHead(Record):
+        """Public-facing IDs and counts of the stored log entries"""
+
+        last_id: nat
+        first_id: nat
+        entries: nat
+        evicted: nat
+
+    @query
+    def get_canister_log_head() -> PublicLogHead:
+        """Query function to check cheaply whether new entries were logged
+
+        Reads counters only, whatever the number of stored entries, so that
+        followers can poll it and fetch pages only when last_id moved.
+
+        Returns:
+            The last assigned ID, the oldest stored ID, and the numbers of
+            stored and evicted entries
+        """
+        head = get_log_head()
+        return PublicLogHead(
+            last_id=head["last_id"],
+            first_id=head["first_id"],
+            entries=head["entries"],
+            evicted=head["evicted"],
+        )
+
+    # Define a page of log entries encoded as a single binary batch
+    class PublicLogBlob(Record):
+        """Public-facing binary log page for bulk canister queries"""
+
+        data: blob
+        next_from_entry: nat
+        has_more: bool
+
+    @query
+    def get_canister_logs_blob(
+        from_entry: Opt[int] = None,
+        max_entries: Opt[int] = None,
+        min_level: Opt[str] = None,
+        logger_name: Opt[str] = None,
+        max_bytes: Opt[int] = None,
+        fields: Opt[Vec[PublicLogField]] = None,
+        contains: Opt[str] = None,
+        from_time: Opt[nat] = None,
+        to_time: Opt[nat] = None,
+        compress: Opt[bool] = None,
+    ) -> PublicLogBlob:
+        """Query function to retrieve a page of logs as one binary batch
+
+        Takes the arguments of get_canister_logs_page, plus whether to
+        compress the batch (the default). Decode the data with
+        kybra_simple_logging.decode_log_batch.
+
+        Returns:
+            The encoded page, the cursor for the next page and whether more
+            entries are available
+        """
+        page = get_logs_blob(
+            from_entry=from_entry,
+            max_entries=max_entries,
+            min_level=None if min_level is None else Level[min_level],
+            logger_name=logger_name,
+            max_bytes=max_bytes,
+            fields=_from_public_log_fields(fields),
+            contains=contains,
+            from_time=from_time,
+            to_time=to_time,
+            compress=compress is not False,
+        )
+        return PublicLogBlob(
+            data=page["data"],
+            next_from_entry=page["next_from_entry"],
+            has_more=page["has_more"],
+        )
+
+    def _to_public_log_entry(log: Dict[str, Any]) -> PublicLogEntry:
+        """Convert a log entry dictionary to its public record type"""
+        return PublicLogEntry(
+            timestamp=log["timestamp"],
+            level=log["level"],
+            logger_name=log["logger_name"],
+            message=log["message"],
+            id=log["id"],
+            fields=[
+                PublicLogField(name=name, value=str(value))
+                for name, value in log["fields"].items()
+            ],
+        )
+
+    def _from_public_log_fields(
+        fields: Optional[List[PublicLogField]],
+    ) -> Optional[Dict[str, str]]:
+        """Convert a field filter from a query into a get_logs argument"""
+        if not fields:
+            return None
+        return {field["name"]: field["value"] for field in fields}
 
 except ImportError:
     # If kybra isn't available, we don't expose the query function
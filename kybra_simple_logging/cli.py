@@ -1,56 +1,796 @@
 #!/usr/bin/env python3
 
 import argparse
+import functools
+import heapq
+import http.client
 import json
 import os
-import select
+import queue
+import re
+import ssl
 import subprocess
 import sys
+import threading
 import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice, repeat
+from json.encoder import encode_basestring as _json_string
+from urllib.parse import urlsplit
 
+from . import _candid
+from ._archive import LogArchive, _segment_within, line_patterns
+from ._codec import decode_log_batch
+from ._handler import _contains_match, _message_tokens
 
-def parse_args():
-    parser = argparse.ArgumentParser(description="Query and display canister logs")
-    parser.add_argument("canister_id", help="Canister ID to query logs from")
+LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+DEFAULT_ARCHIVE_DIR = os.path.join("~", ".kslog", "archive")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Query and display canister logs",
+        epilog="Use 'kslog stats <canister_id>' to show log counters and "
+        "'kslog query' to search archived logs",
+    )
+    parser.add_argument(
+        "canister_ids",
+        nargs="*",
+        metavar="canister_id",
+        help="Canister IDs to query logs from, merged by time when several",
+    )
+    parser.add_argument(
+        "--canister-file",
+        metavar="FILE",
+        help="Also query the canister IDs listed in FILE, one per line",
+    )
 
     # Log filtering options
     parser.add_argument("--tail", type=int, help="Show only the last N logs")
     parser.add_argument(
         "--level",
-        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+        choices=LEVELS,
         help="Minimum log level to display",
     )
     parser.add_argument(
         "--name",
         help="Filter logs by logger name",
     )
+    parser.add_argument(
+        "--field",
+        action="append",
+        metavar="NAME=VALUE",
+        help="Filter logs by a structured field value (can be repeated)",
+    )
+    parser.add_argument(
+        "--grep",
+        metavar="TEXT",
+        help=(
+            "Only show logs whose message contains TEXT, ignoring case and"
+            " matching whole words (searched in the canister)"
+        ),
+    )
+    parser.add_argument(
+        "--since",
+        metavar="TIME",
+        help="Only show logs from this time: a duration ago (30s, 10m, 2h, 1d) "
+        "or a local date and time (2024-05-01T12:00)",
+    )
+    parser.add_argument(
+        "--until",
+        metavar="TIME",
+        help="Only show logs up to this time (same formats as --since)",
+    )
+
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Fetch the stored history in chunks, up to N at a time, instead "
+        "of one page after the other",
+    )
 
     # Follow mode options
     parser.add_argument(
-        "--follow", action="store_true", help="Follow logs (poll every 5 seconds)"
+        "--follow",
+        action="store_true",
+        help="Follow logs, polling faster while the canister is logging "
+        "(press Enter to poll immediately)",
     )
     parser.add_argument(
         "--interval",
-        type=int,
+        type=float,
         default=5,
-        help="Polling interval in seconds for follow mode",
+        help="Longest polling interval in seconds for follow mode, reached "
+        "when the canister is idle",
+    )
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=0.5,
+        help="Polling interval in seconds for follow mode after new logs",
+    )
+
+    # Archive options
+    parser.add_argument(
+        "--archive",
+        action="store_true",
+        help="Keep the logs in a local archive, only fetching new entries and "
+        "showing the archived ones",
+    )
+    parser.add_argument(
+        "--archive-dir",
+        default=DEFAULT_ARCHIVE_DIR,
+        metavar="DIR",
+        help=f"Directory of the archives, one per canister (default: "
+        f"{DEFAULT_ARCHIVE_DIR})",
     )
 
+    _add_output_arguments(parser)
+    _add_network_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.canister_file:
+        try:
+            args.canister_ids.extend(read_canister_ids(args.canister_file))
+        except OSError as e:
+            parser.error(f"cannot read {args.canister_file}: {e.strerror}")
+    if not args.canister_ids:
+        parser.error("at least one canister ID is required")
+    return args
+
+
+def read_canister_ids(path):
+    """Read canister IDs from a file, one per line, ignoring # comments"""
+    with open(path) as file:
+        lines = [line.split("#", 1)[0].strip() for line in file]
+    return [line for line in lines if line]
+
+
+def parse_stats_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="kslog stats", description="Display canister log counters"
+    )
+    parser.add_argument("canister_id", help="Canister ID to query statistics from")
+    parser.add_argument(
+        "--minutes",
+        type=int,
+        help="Only show the time buckets of the last N minutes",
+    )
+    parser.add_argument(
+        "--level",
+        choices=LEVELS,
+        help="Only count this level and above in the time buckets",
+    )
+    _add_network_arguments(parser)
+    return parser.parse_args(argv)
+
+
+_TIME_GROUPS = {"minute": 60, "hour": 3600, "day": 86400}
+
+
+def _group_by(value):
+    """Validate a --group-by value"""
+    if value in ("canister", "level", "name", *_TIME_GROUPS):
+        return value
+    if value.startswith("field:") and len(value) > len("field:"):
+        return value
+    raise argparse.ArgumentTypeError(
+        "expected canister, level, name, minute, hour, day or field:NAME"
+    )
+
+
+def parse_query_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="kslog query",
+        description="Search the logs archived by kslog --archive, offline",
+    )
+    parser.add_argument(
+        "canister_ids",
+        nargs="*",
+        metavar="canister_id",
+        help="Canister IDs whose archives to search (default: all archives)",
+    )
+    parser.add_argument(
+        "--archive-dir",
+        default=DEFAULT_ARCHIVE_DIR,
+        metavar="DIR",
+        help=f"Directory of the archives (default: {DEFAULT_ARCHIVE_DIR})",
+    )
+    parser.add_argument("--tail", type=int, help="Show only the last N logs")
+    parser.add_argument("--level", choices=LEVELS, help="Minimum log level")
+    parser.add_argument("--name", help="Filter logs by logger name")
+    parser.add_argument(
+        "--field",
+        action="append",
+        metavar="NAME=VALUE",
+        help="Filter logs by a structured field value (can be repeated)",
+    )
+    parser.add_argument(
+        "--grep",
+        metavar="TEXT",
+        help=(
+            "Only show logs whose message contains TEXT, ignoring case and"
+            " matching whole words"
+        ),
+    )
+    parser.add_argument(
+        "--since", metavar="TIME", help="Only show logs from this time (30m, 1d, ...)"
+    )
+    parser.add_argument(
+        "--until", metavar="TIME", help="Only show logs up to this time"
+    )
+    parser.add_argument(
+        "--from-entry", type=int, metavar="ID", help="Lowest entry ID to show"
+    )
+    parser.add_argument(
+        "--to-entry", type=int, metavar="ID", help="Highest entry ID to show"
+    )
+    parser.add_argument(
+        "--count", action="store_true", help="Show the number of matching logs"
+    )
+    parser.add_argument(
+        "--group-by",
+        type=_group_by,
+        metavar="KEY",
+        help="Count the matching logs per canister, level, name, minute, hour, "
+        "day or field:NAME",
+    )
+    _add_output_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def _add_output_arguments(parser):
+    # Output options
+    parser.add_argument(
+        "--output",
+        choices=["text", "jsonl"],
+        default="text",
+        help="Format of the log entries: text lines or one JSON object per line",
+    )
+    parser.add_argument(
+        "--no-color",
+        action="store_true",
+        help="Do not color the log levels (also set by the NO_COLOR variable)",
+    )
+
+
+def _add_network_arguments(parser):
     # Network options
     network_group = parser.add_mutually_exclusive_group()
     network_group.add_argument(
         "--network", help="Network URL (e.g., http://localhost:4943)"
     )
     network_group.add_argument("--ic", action="store_true", help="Use the IC mainnet")
+    parser.add_argument(
+        "--transport",
+        choices=["auto", "agent", "dfx"],
+        default="auto",
+        help="How to call the canister: a persistent HTTP connection (agent), "
+        "a dfx process per query (dfx) or the agent with dfx as fallback (auto)",
+    )
+
+
+def _network(args):
+    """Determine the dfx network option from the parsed arguments"""
+    if args.ic:
+        return "ic"
+    return args.network
+
 
-    return parser.parse_args()
+# Candid types of the query arguments
+_OPT_NAT = ("opt", "nat")
+_OPT_TEXT = ("opt", "text")
+_OPT_BOOL = ("opt", "bool")
+_OPT_FIELDS = ("opt", ("vec", ("record", (("name", "text"), ("value", "text")))))
+
+
+def _log_query_args(
+    from_entry, tail, level, name, fields, contains, from_time, to_time, **page
+):
+    """Build the typed arguments of the log queries, in canister API order
+
+    The paged queries take max_bytes after the logger name; pass it as a
+    keyword argument to include it.
+    """
+    args = [
+        (_OPT_NAT, from_entry),
+        (_OPT_NAT, tail),
+        (_OPT_TEXT, level),
+        (_OPT_TEXT, name),
+    ]
+    if "max_bytes" in page:
+        args.append((_OPT_NAT, page["max_bytes"]))
+    records = [{"name": k, "value": str(v)} for k, v in (fields or {}).items()]
+    args.extend(
+        [
+            (_OPT_FIELDS, records or None),
+            (_OPT_TEXT, contains),
+            (_OPT_NAT, from_time),
+            (_OPT_NAT, to_time),
+        ]
+    )
+    return args
+
+
+def parse_fields(specs):
+    """Parse NAME=VALUE command line field filters into a dictionary"""
+    fields = {}
+    for spec in specs or []:
+        name, sep, value = spec.partition("=")
+        if not sep or not name:
+            raise ValueError(f"Invalid field filter (expected NAME=VALUE): {spec}")
+        fields[name] = value
+    return fields
+
+
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_time(value, now=None):
+    """Parse a --since/--until value into nanoseconds since the epoch
+
+    Args:
+        value: A duration before now ("90s", "10m", "2h", "1d") or an ISO
+            date and time in local time ("2024-05-01T12:00")
+        now: Current time in seconds (defaults to time.time())
+
+    Returns:
+        Time in nanoseconds, the unit of canister log timestamps
+    """
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhd])", value.strip())
+    if match:
+        now = time.time() if now is None else now
+        seconds = now - float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+    else:
+        try:
+            seconds = datetime.fromisoformat(value.strip()).timestamp()
+        except ValueError:
+            raise ValueError(
+                f"Invalid time (expected e.g. 10m or 2024-05-01T12:00): {value}"
+            ) from None
+    return int(seconds * 1e9)
+
+
+class QueryError(Exception):
+    """A canister query failed or its reply could not be read"""
+
+
+class TransportUnavailable(QueryError):
+    """The transport cannot reach the canister, another one may"""
+
+
+class DfxTransport:
+    """Call canister queries by running `dfx canister call` for each query
+
+    Every call pays for a dfx process start and identity load, but dfx
+    resolves canister names and network configuration from dfx.json.
+    """
+
+    def __init__(self, network=None, run=subprocess.run):
+        self.network = network
+        self.run = run
+
+    def query(self, canister_id, method, args):
+        """Call a query method
+
+        Args:
+            canister_id: ID or dfx name of the canister to query
+            method: Name of the query method
+            args: List of (Candid type, value) arguments
+
+        Returns:
+            The decoded reply
+
+        Raises:
+            QueryError: If dfx fails or prints an invalid reply
+        """
+        # Call dfx to query the logs with JSON output
+        cmd = ["dfx", "canister", "call", "--output", "json"]
+
+        # Add network option if specified
+        if self.network is not None:
+            cmd.extend(["--network", self.network])
+
+        # Add canister ID, method and the arguments in Candid text format
+        rendered = ", ".join(_candid.to_text(type_, value) for type_, value in args)
+        cmd.extend([canister_id, method, f"({rendered})"])
+
+        try:
+            result = self.run(cmd, capture_output=True, text=True, check=True)
+            return json.loads(result.stdout)
+        except subprocess.CalledProcessError as e:
+            raise QueryError(e.stderr or str(e)) from None
+        except json.JSONDecodeError as e:
+            raise QueryError(f"Invalid JSON response: {e}") from None
+
+
+# Names of the record fields in query replies, which Candid only sends as
+# hashes
+_REPLY_FIELDS = (
+    "timestamp",
+    "level",
+    "logger_name",
+    "message",
+    "id",
+    "fields",
+    "name",
+    "value",
+    "entries",
+    "next_from_entry",
+    "has_more",
+    "data",
+    "count",
+    "start",
+    "counts",
+    "total_entries",
+    "total_bytes",
+    "levels",
+    "loggers",
+    "bucket_seconds",
+    "buckets",
+    "last_id",
+    "first_id",
+    "evicted",
+)
+
+# Queries are valid for a few minutes after they are sent
+_INGRESS_EXPIRY_SECONDS = 4 * 60
+
+
+class AgentTransport:
+    """Call canister queries over a persistent HTTP connection
+
+    Speaks the IC HTTP interface directly to a replica or boundary node
+    (anonymously, as queries need no identity) and keeps the connection
+    alive between calls, so a poll costs one round trip. Like most query
+    clients, it does not verify the node signatures of the replies.
+    """
+
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Invalid replica URL: {url}")
+        self.url = url
+        self.timeout = timeout
+        self._secure = parts.scheme == "https"
+        self._host = parts.hostname
+        self._port = parts.port
+        # One connection per thread, so that canisters can be queried
+        # concurrently
+        self._local = threading.local()
+
+    def _connect(self):
+        if self._secure:
+            return http.client.HTTPSConnection(
+                self._host,
+                self._port,
+                timeout=self.timeout,
+                context=ssl.create_default_context(),
+            )
+        return http.client.HTTPConnection(self._host, self._port, timeout=self.timeout)
+
+    def _post(self, path, body):
+        """POST a CBOR body, reconnecting once if a kept-alive connection closed"""
+        headers = {"Content-Type": "application/cbor"}
+        for attempt in range(2):
+            connection = getattr(self._local, "connection", None)
+            reused = connection is not None
+            if not reused:
+                connection = self._local.connection = self._connect()
+            try:
+                connection.request("POST", path, body, headers)
+                response = connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, OSError) as e:
+                self.close()
+                if not reused or attempt:
+                    raise TransportUnavailable(
+                        f"Cannot reach {self.url}: {e}"
+                    ) from None
+
+    def query(self, canister_id, method, args):
+        """Call a query method
+
+        Args:
+            canister_id: ID of the canister to query
+            method: Name of the query method
+            args: List of (Candid type, value) arguments
+
+        Returns:
+            The decoded reply
+
+        Raises:
+            TransportUnavailable: If the replica cannot be reached or the
+                canister ID is not a principal (e.g. a dfx canister name)
+            QueryError: If the query is rejected or the reply is invalid
+        """
+        try:
+            principal = _candid.principal_from_text(canister_id)
+        except ValueError as e:
+            raise TransportUnavailable(str(e)) from None
+        content = {
+            "request_type": "query",
+            "sender": b"\x04",  # The anonymous principal
+            "canister_id": principal,
+            "method_name": method,
+            "arg": _candid.encode([t for t, _ in args], [v for _, v in args]),
+            "ingress_expiry": int((time.time() + _INGRESS_EXPIRY_SECONDS) * 1e9),
+        }
+        status, body = self._post(
+            f"/api/v2/canister/{canister_id}/query",
+            _candid.cbor_encode({"content": content}),
+        )
+        if status != 200:
+            raise QueryError(
+                f"HTTP {status} from {self.url}: {body.decode('utf-8', 'replace')}"
+            )
+        try:
+            reply = _candid.cbor_decode(body)
+            if reply.get("status") != "replied":
+                raise QueryError(reply.get("reject_message", "Query rejected"))
+            return _candid.decode(reply["reply"]["arg"], _REPLY_FIELDS)[0]
+        except (ValueError, KeyError, IndexError, AttributeError) as e:
+            raise QueryError(f"Invalid response from {self.url}: {e}") from None
+
+    def close(self):
+        """Close the connection of this thread, a later query opens a new one"""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+class AutoTransport:
+    """Use an AgentTransport, switching to dfx if it cannot reach the canister"""
+
+    def __init__(self, agent, dfx):
+        self.transport = agent if agent is not None else dfx
+        self.dfx = dfx
+
+    def query(self, canister_id, method, args):
+        try:
+            return self.transport.query(canister_id, method, args)
+        except TransportUnavailable:
+            if self.transport is self.dfx:
+                raise
+            self.transport = self.dfx
+            return self.dfx.query(canister_id, method, args)
+
+
+# Replica URLs of the networks that can be queried without dfx
+_LOCAL_REPLICA_URL = "http://127.0.0.1:4943"
+_IC_URL = "https://icp-api.io"
+
+
+def _replica_url(network):
+    """Return the HTTP endpoint of a network, None if only dfx knows it"""
+    if network is None or network == "local":
+        return _LOCAL_REPLICA_URL
+    if network == "ic":
+        return _IC_URL
+    if network.startswith(("http://", "https://")):
+        return network
+    return None
+
+
+def make_transport(kind="auto", network=None):
+    """Create a transport to call canister queries
+
+    Args:
+        kind: "agent", "dfx" or "auto" (the agent, falling back to dfx)
+        network: Network name or URL (optional)
+    """
+    if kind == "dfx":
+        return DfxTransport(network)
+    url = _replica_url(network)
+    if kind == "agent":
+        if url is None:
+            raise ValueError(f"No replica URL known for network {network!r}")
+        return AgentTransport(url)
+    return AutoTransport(
+        None if url is None else AgentTransport(url), DfxTransport(network)
+    )
+
+
+# Transports in use, by network
+_TRANSPORTS = {}
+
+
+def set_transport(transport, network=None):
+    """Use a transport for the queries to a network"""
+    _TRANSPORTS[network] = transport
+
+
+def get_transport(network=None):
+    """Return the transport for a network, creating an "auto" one if needed"""
+    if network not in _TRANSPORTS:
+        _TRANSPORTS[network] = make_transport("auto", network)
+    return _TRANSPORTS[network]
+
+
+def _use_transport(args):
+    """Set up the transport chosen on the command line
+
+    Returns:
+        The network to query
+    """
+    network = _network(args)
+    try:
+        set_transport(make_transport(args.transport, network), network)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+    return network
+
+
+def query_canister(canister_id, method, args, network=None):
+    """Call a canister query method through the transport of the network
+
+    Args:
+        canister_id: ID of the canister to query
+        method: Name of the query method
+        args: List of (Candid type, value) arguments
+        network: Network to query (optional)
+
+    Returns:
+        The decoded reply
+
+    Raises:
+        QueryError: If the query fails
+    """
+    return get_transport(network).query(canister_id, method, args)
+
+
+def get_logs_page(
+    canister_id,
+    tail=None,
+    level=None,
+    network=None,
+    from_entry=None,
+    name=None,
+    max_bytes=None,
+    fields=None,
+    contains=None,
+    from_time=None,
+    to_time=None,
+):
+    """Query a single page of log entries from a canister
+
+    Args:
+        canister_id: ID of the canister to query
+        tail: Only consider the last N matching entries (optional)
+        level: Minimum log level to include (optional)
+        network: Network to query (optional)
+        from_entry: Start retrieving logs from this ID (optional)
+        name: Filter logs by logger name (optional)
+        max_bytes: Reply size budget for the page (optional)
+        fields: Structured field values to filter by (optional)
+        contains: Text the messages must contain, as whole words (optional)
+        from_time: Only include logs from this time in nanoseconds (optional)
+        to_time: Only include logs up to this time in nanoseconds (optional)
+
+    Returns:
+        Dictionary with "entries", "next_from_entry" and "has_more"
+    """
+    # Build the query arguments in the order expected by the canister API
+    args = _log_query_args(
+        from_entry,
+        tail,
+        level,
+        name,
+        fields,
+        contains,
+        from_time,
+        to_time,
+        max_bytes=max_bytes,
+    )
+    page = query_canister(canister_id, "get_canister_logs_page", args, network)
+    return {
+        "entries": page.get("entries", []),
+        "next_from_entry": int(page.get("next_from_entry", 0)),
+        "has_more": bool(page.get("has_more", False)),
+    }
+
+
+def get_logs_blob_page(
+    canister_id,
+    tail=None,
+    level=None,
+    network=None,
+    from_entry=None,
+    name=None,
+    max_bytes=None,
+    fields=None,
+    contains=None,
+    from_time=None,
+    to_time=None,
+):
+    """Query a single page of log entries as one binary batch
+
+    Takes the same arguments and returns the same structure as
+    get_logs_page, but transfers the entries as a compressed blob, which
+    is much smaller and faster to decode than one record per entry.
+    """
+    args = _log_query_args(
+        from_entry,
+        tail,
+        level,
+        name,
+        fields,
+        contains,
+        from_time,
+        to_time,
+        max_bytes=max_bytes,
+    )
+    args.append((_OPT_BOOL, True))
+    page = query_canister(canister_id, "get_canister_logs_blob", args, network)
+    try:
+        entries = decode_log_batch(_blob_bytes(page.get("data", b"")))
+    except ValueError as e:
+        raise QueryError(f"Invalid log batch from {canister_id}: {e}") from None
+    for entry in entries:
+        entry["fields"] = [
+            {"name": field, "value": value} for field, value in entry["fields"].items()
+        ]
+    return {
+        "entries": entries,
+        "next_from_entry": int(page.get("next_from_entry", 0)),
+        "has_more": bool(page.get("has_more", False)),
+    }
+
+
+def _blob_bytes(data):
+    """Convert a blob from dfx JSON output (hex text or list of bytes)"""
+    if isinstance(data, str):
+        return bytes.fromhex(data)
+    return bytes(data)
+
+
+# Page queries, most efficient first, and the canisters lacking each one
+_PAGE_QUERIES = [
+    ("get_canister_logs_blob", get_logs_blob_page),
+    ("get_canister_logs_page", get_logs_page),
+]
+_UNSUPPORTED_QUERIES = set()
+
+
+def _get_any_logs_page(canister_id, **kwargs):
+    """Query a page with the most efficient query the canister supports
+
+    Raises:
+        QueryError: Also with "no query method" if the canister exposes no
+            page query at all
+    """
+    for method, get_page in _PAGE_QUERIES:
+        if (canister_id, method) in _UNSUPPORTED_QUERIES:
+            continue
+        try:
+            return get_page(canister_id, **kwargs)
+        except QueryError as e:
+            if "no query method" not in str(e):
+                raise
+            # Canisters built with older versions of this library
+            _UNSUPPORTED_QUERIES.add((canister_id, method))
+    raise QueryError("Canister has no query method for log pages")
 
 
 def get_logs(
-    canister_id, tail=None, level=None, network=None, from_entry=None, name=None
+    canister_id,
+    tail=None,
+    level=None,
+    network=None,
+    from_entry=None,
+    name=None,
+    fields=None,
+    contains=None,
+    from_time=None,
+    to_time=None,
+    parallel=1,
 ):
-    """Query log entries from a canister
+    """Query log entries from a canister, following pages until exhausted
 
     Args:
         canister_id: ID of the canister to query
@@ -59,73 +799,911 @@ def get_logs(
         network: Network to query (optional)
         from_entry: Start retrieving logs from this ID (optional)
         name: Filter logs by logger name (optional)
+        fields: Structured field values to filter by (optional)
+        contains: Text the messages must contain, as whole words (optional)
+        from_time: Only include logs from this time in nanoseconds (optional)
+        to_time: Only include logs up to this time in nanoseconds (optional)
+        parallel: Without tail, fetch up to this many chunks at a time
+            with backfill_logs
 
     Returns:
         List of log entries as dictionaries
 
+    Note:
+        Pages are transferred as binary batches. Canisters that do not
+        expose get_canister_logs_blob are queried through
+        get_canister_logs_page, or through get_canister_logs in a single
+        call.
+    """
+    try:
+        return _query_logs(
+            canister_id,
+            tail,
+            level,
+            network,
+            from_entry,
+            name,
+            fields,
+            contains,
+            from_time,
+            to_time,
+            parallel,
+        )
+    except QueryError as e:
+        print(f"Error querying logs: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def _query_logs(
+    canister_id,
+    tail=None,
+    level=None,
+    network=None,
+    from_entry=None,
+    name=None,
+    fields=None,
+    contains=None,
+    from_time=None,
+    to_time=None,
+    parallel=1,
+):
+    """Same as get_logs, but raise QueryError instead of exiting"""
+    logs = []
+    try:
+        if parallel > 1 and tail is None:
+            return backfill_logs(
+                canister_id,
+                network=network,
+                from_entry=from_entry,
+                parallel=parallel,
+                level=level,
+                name=name,
+                fields=fields,
+                contains=contains,
+                from_time=from_time,
+                to_time=to_time,
+            )["entries"]
+        while True:
+            page = _get_any_logs_page(
+                canister_id,
+                tail=tail,
+                level=level,
+                network=network,
+                from_entry=from_entry,
+                name=name,
+                fields=fields,
+                contains=contains,
+                from_time=from_time,
+                to_time=to_time,
+            )
+            logs.extend(page["entries"])
+            if not page["has_more"]:
+                return logs
+            # The remaining pages continue from the cursor; the tail limit
+            # was already applied by the first page
+            from_entry = page["next_from_entry"]
+            tail = None
+    except QueryError as e:
+        if logs or "no query method" not in str(e):
+            raise
+
+    # Fall back to the unpaged query for canisters built before paging
+    return _query_logs_unpaged(
+        canister_id,
+        tail,
+        level,
+        network,
+        from_entry,
+        name,
+        fields,
+        contains,
+        from_time,
+        to_time,
+    )
+
+
+def get_log_head(canister_id, network=None):
+    """Query the IDs and counts of a canister's stored entries
+
+    The canister answers from counters, so this is the cheapest way to
+    find out whether anything was logged.
+
+    Returns:
+        Dictionary with "last_id", "first_id", "entries" and "evicted", as
+        returned by kybra_simple_logging.get_log_head(), or None if the
+        canister does not expose get_canister_log_head
+
+    Raises:
+        QueryError: If the canister cannot be queried
+    """
+    method = "get_canister_log_head"
+    if (canister_id, method) in _UNSUPPORTED_QUERIES:
+        return None
+    try:
+        head = query_canister(canister_id, method, [], network)
+    except QueryError as e:
+        if "no query method" not in str(e):
+            raise
+        _UNSUPPORTED_QUERIES.add((canister_id, method))
+        return None
+    return {
+        key: int(head[key]) for key in ("last_id", "first_id", "entries", "evicted")
+    }
+
+
+def get_log_id_range(canister_id, network=None):
+    """Ask a canister for the IDs of its oldest and newest stored entries
+
+    Uses the log head query, or two page queries of a single entry each,
+    sent concurrently, for canisters without it.
+
+    Returns:
+        The (oldest, newest) IDs, or None if the canister stores no entries
+
+    Raises:
+        QueryError: If the canister cannot be queried
+    """
+    head = get_log_head(canister_id, network)
+    if head is not None:
+        if not head["entries"]:
+            return None
+        return head["first_id"], head["last_id"]
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        oldest, newest = pool.map(
+            lambda tail: _get_any_logs_page(
+                canister_id, tail=tail, network=network, max_bytes=0
+            ),
+            [None, 1],
+        )
+    if not oldest["entries"] or not newest["entries"]:
+        return None
+    return int(oldest["entries"][0]["id"]), int(newest["entries"][-1]["id"])
+
+
+# Backfill chunks per worker, to keep workers busy when chunks are uneven,
+# and the smallest chunk worth a query of its own
+_CHUNKS_PER_WORKER = 4
+_MIN_CHUNK_ENTRIES = 500
+
+
+def backfill_logs(
+    canister_id, network=None, from_entry=None, parallel=8, max_bytes=None, **filters
+):
+    """Fetch the stored entries after a cursor in concurrent chunks
+
+    The ID range of the stored entries is split into chunks that are paged
+    through concurrently, at most `parallel` at a time, and joined in ID
+    order. A long history then takes about as many round trips as its
+    largest chunk rather than as all of its pages. A chunk's last page may
+    run into the next chunk; those entries are dropped.
+
+    Args:
+        canister_id: ID of the canister to query
+        network: Network to query (optional)
+        from_entry: Start from this ID (optional)
+        parallel: Maximum number of concurrent queries
+        max_bytes: Reply size budget for the pages (optional)
+        **filters: level, name, fields, contains, from_time and to_time as
+            for get_logs
+
+    Returns:
+        Dictionary with "entries", "next_from_entry" and "has_more" (False
+        unless nothing was stored at the start), like get_logs_page
+
+    Raises:
+        QueryError: If the canister cannot be queried
+    """
+    id_range = get_log_id_range(canister_id, network)
+    start = None
+    if id_range is not None:
+        oldest, newest = id_range
+        start = oldest if from_entry is None else max(from_entry, oldest)
+    if start is None or start > newest:
+        # Nothing to split: a single page reports the cursor, or that the
+        # IDs started over
+        return _get_any_logs_page(
+            canister_id,
+            network=network,
+            from_entry=from_entry,
+            max_bytes=max_bytes,
+            **filters,
+        )
+
+    total = newest - start + 1
+    size = max(_MIN_CHUNK_ENTRIES, -(-total // (parallel * _CHUNKS_PER_WORKER)))
+    starts = list(range(start, newest + 1, size))
+    ends = starts[1:] + [newest + 1]
+
+    def fetch_chunk(chunk_start, chunk_end):
+        logs = []
+        cursor = chunk_start
+        while cursor < chunk_end:
+            page = _get_any_logs_page(
+                canister_id,
+                network=network,
+                from_entry=cursor,
+                max_bytes=max_bytes,
+                **filters,
+            )
+            for log in page["entries"]:
+                if int(log["id"]) >= chunk_end:
+                    return logs
+                logs.append(log)
+            if not page["has_more"]:
+                break
+            cursor = page["next_from_entry"]
+        return logs
+
+    with ThreadPoolExecutor(max_workers=min(parallel, len(starts))) as pool:
+        chunks = list(pool.map(fetch_chunk, starts, ends))
+    return {
+        "entries": [log for chunk in chunks for log in chunk],
+        "next_from_entry": newest + 1,
+        "has_more": False,
+    }
+
+
+class Follower:
+    """Poll a canister for new log entries, adapting the polling interval
+
+    Each poll fetches one page after the cursor. While pages come back
+    full the next poll is due immediately, after new entries it is due
+    after min_interval, and while the canister is idle the interval
+    doubles up to max_interval. Once caught up, polls first probe the log
+    head and only fetch a page when new entries were logged.
+
+    With an archive, fetched entries are appended to it and following
+    resumes from its cursor. With parallel above 1 and no tail, the stored
+    history is fetched with backfill_logs first.
+    """
+
+    def __init__(
+        self,
+        canister_id,
+        network=None,
+        tail=None,
+        min_interval=0.5,
+        max_interval=5,
+        max_bytes=None,
+        archive=None,
+        parallel=1,
+        **filters,
+    ):
+        """Create a follower
+
+        Args:
+            canister_id: ID of the canister to follow
+            network: Network to query (optional)
+            tail: Start with the last N matching entries (optional)
+            min_interval: Seconds between polls after new entries
+            max_interval: Longest number of seconds between polls
+            max_bytes: Reply size budget for the pages (optional)
+            archive: LogArchive to store the entries in (optional)
+            parallel: Maximum number of concurrent queries of the backfill
+            **filters: level, name, fields, contains, from_time and to_time
+                as for get_logs
+        """
+        self.canister_id = canister_id
+        self.network = network
+        self.tail = tail
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_bytes = max_bytes
+        self.filters = filters
+        self.archive = archive
+        self.from_entry = None if archive is None else archive.next_from_entry
+        self.parallel = parallel
+        self._backfill = parallel > 1 and tail is None
+        self.delay = 0
+        # Set to poll before the delay is over
+        self.wake = threading.Event()
+
+    def poll(self):
+        """Fetch the next entries and schedule the next poll
+
+        Returns:
+            The new log entries
+
+        Raises:
+            QueryError: If the canister cannot be queried
+        """
+        if self._head_unchanged():
+            self.delay = min(max(self.delay * 2, self.min_interval), self.max_interval)
+            return []
+        try:
+            if self._backfill:
+                page = backfill_logs(
+                    self.canister_id,
+                    network=self.network,
+                    from_entry=self.from_entry,
+                    parallel=self.parallel,
+                    max_bytes=self.max_bytes,
+                    **self.filters,
+                )
+            else:
+                page = _get_any_logs_page(
+                    self.canister_id,
+                    tail=self.tail,
+                    network=self.network,
+                    from_entry=self.from_entry,
+                    max_bytes=self.max_bytes,
+                    **self.filters,
+                )
+        except QueryError as e:
+            if "no query method" not in str(e):
+                raise
+            # Canisters built before paging return everything at once
+            logs = _query_logs_unpaged(
+                self.canister_id,
+                self.tail,
+                network=self.network,
+                from_entry=self.from_entry,
+                **self.filters,
+            )
+            page = {
+                "entries": logs,
+                "next_from_entry": max(
+                    [int(log["id"]) + 1 for log in logs], default=self.from_entry
+                ),
+                "has_more": False,
+            }
+
+        # The tail limit and the backfill only apply to the first page
+        self.tail = None
+        self._backfill = False
+        logs = page["entries"]
+        if self.from_entry is not None and page["next_from_entry"] < self.from_entry:
+            # The log IDs started over after a canister upgrade or reinstall
+            self.from_entry = None
+            self._backfill = self.parallel > 1
+            self.delay = 0
+            if self.archive is not None:
+                self.archive.new_epoch()
+            return []
+        self.from_entry = page["next_from_entry"]
+        if self.archive is not None:
+            self.archive.append(logs, self.from_entry)
+        if page["has_more"]:
+            self.delay = 0
+        elif logs:
+            self.delay = self.min_interval
+        else:
+            self.delay = min(max(self.delay * 2, self.min_interval), self.max_interval)
+        return logs
+
+    def _head_unchanged(self):
+        """Probe whether nothing was logged since the last poll
+
+        Only probes once caught up: a full page means more entries are
+        waiting, and the first poll has nothing to compare with.
+        """
+        if self.from_entry is None or self.tail is not None or not self.delay:
+            return False
+        head = get_log_head(self.canister_id, self.network)
+        return head is not None and head["last_id"] + 1 == self.from_entry
+
+
+def sync_archive(follower):
+    """Fetch all new entries of a follower's canister into its archive"""
+    while True:
+        follower.poll()
+        if follower.delay:
+            return
+
+
+def _levels_from(level):
+    """Levels at or above a minimum level, or None for no minimum"""
+    if level is None:
+        return None
+    minimum = LEVELS.index(level)
+    return LEVELS[minimum:]
+
+
+def log_filter(
+    level=None, name=None, fields=None, contains=None, from_time=None, to_time=None
+):
+    """Build a predicate matching log entries like the canister queries do
+
+    Used to filter archived entries locally; the arguments are as for
+    get_logs.
+    """
+    levels = None if level is None else set(_levels_from(level))
+    tokens = None if contains is None else _message_tokens(contains)
+
+    def matches(log):
+        if levels is not None and log["level"] not in levels:
+            return False
+        if name is not None and log["logger_name"] != name:
+            return False
+        if from_time is not None and int(log["timestamp"]) < from_time:
+            return False
+        if to_time is not None and int(log["timestamp"]) > to_time:
+            return False
+        if fields:
+            values = {field["name"]: field["value"] for field in log["fields"]}
+            for field, value in fields.items():
+                if values.get(field) != str(value):
+                    return False
+        if contains is not None:
+            return _contains_match(log["message"], contains, tokens)
+        return True
+
+    return matches
+
+
+def archived_logs(
+    archive,
+    tail=None,
+    level=None,
+    name=None,
+    fields=None,
+    contains=None,
+    from_time=None,
+    to_time=None,
+    from_entry=None,
+    to_entry=None,
+    segments=None,
+):
+    """Read the matching entries of an archive, oldest first
+
+    Only the segments and lines that can match are parsed, and with tail
+    the archive is read from its end.
+
+    Args:
+        archive: The LogArchive to read
+        tail: Only return the last N matching entries
+        from_entry: Lowest entry ID
+        to_entry: Highest entry ID
+        segments: Segments of the archive to read (defaults to all)
+
+        The other arguments are as for get_logs.
+
+    Returns:
+        An iterator over the entries
+    """
+    levels = _levels_from(level)
+    logs = archive.scan(
+        min_id=from_entry,
+        max_id=to_entry,
+        from_time=from_time,
+        to_time=to_time,
+        levels=levels,
+        patterns=line_patterns(levels, name, fields, contains),
+        reverse=tail is not None,
+        segments=segments,
+    )
+    if name is not None or fields or contains is not None:
+        logs = filter(log_filter(name=name, fields=fields, contains=contains), logs)
+    if tail is None:
+        return logs
+    return reversed(list(islice(logs, tail)))
+
+
+def _group_key(group_by):
+    """Function giving the --group-by key of an archived entry"""
+    if group_by is None:
+        return lambda log: None
+    if group_by == "level":
+        return lambda log: log["level"]
+    if group_by == "name":
+        return lambda log: log["logger_name"]
+    if group_by in _TIME_GROUPS:
+        size = _TIME_GROUPS[group_by] * 10**9
+        return lambda log: log["timestamp"] // size * size
+    field = group_by.split(":", 1)[1]
+
+    def field_value(log):
+        for log_field in log["fields"]:
+            if log_field["name"] == field:
+                return log_field["value"]
+        return None
+
+    return field_value
+
+
+def count_archived(archive, group_by=None, **filters):
+    """Count the matching entries of an archive
+
+    Without name, field or text filters, the segments entirely within the
+    ID and time ranges are counted from their metadata instead of read.
+
+    Args:
+        archive: The LogArchive to read
+        group_by: None to count all entries under the key None, or "level",
+            "name", "minute", "hour", "day" or "field:NAME"
+        filters: Filters as for archived_logs, except tail
+
+    Returns:
+        Counter of the entries per group
+    """
+    counts = Counter()
+    segments = archive.segments
+    if group_by in (None, "level") and not (
+        filters.get("name") is not None
+        or filters.get("fields")
+        or filters.get("contains") is not None
+    ):
+        levels = _levels_from(filters.get("level"))
+        ranges = [
+            filters.get(key)
+            for key in ("from_entry", "to_entry", "from_time", "to_time")
+        ]
+        segments = []
+        for segment in archive.segments:
+            if segment["count"] and _segment_within(segment, *ranges):
+                for segment_level, count in segment["levels"].items():
+                    if levels is None or segment_level in levels:
+                        counts[segment_level if group_by else None] += count
+            else:
+                segments.append(segment)
+
+    key = _group_key(group_by)
+    for log in archived_logs(archive, segments=segments, **filters):
+        counts[key(log)] += 1
+    return counts
+
+
+def format_counts(counts, group_by=None):
+    """Render entry counts as lines, busiest groups first
+
+    Time groups are listed in time order instead.
+    """
+    if group_by is None:
+        return [str(sum(counts.values()))]
+    if group_by in _TIME_GROUPS:
+        return [
+            f"{count:>10}  "
+            + datetime.fromtimestamp(key / 1e9).strftime("%Y-%m-%d %H:%M")
+            for key, count in sorted(counts.items())
+        ]
+    return [
+        f"{count:>10}  {'(none)' if key is None else key}"
+        for key, count in sorted(
+            counts.items(), key=lambda item: (-item[1], item[0] or "")
+        )
+    ]
+
+
+def follow_logs(followers, show, on_error, stop=None, batch_window=0.1, flush=None):
+    """Poll followers concurrently and show their entries merged by time
+
+    Every follower polls in its own thread on its own schedule, so a slow
+    canister does not hold up the others. The entries that arrive within
+    batch_window seconds of each other are shown in timestamp order.
+
+    Args:
+        followers: Follower objects
+        show: Called with (follower, log entry) for each new entry
+        on_error: Called with (follower, QueryError) when a poll fails; the
+            follower retries after its longest interval
+        stop: Event to stop following (optional, runs until interrupted)
+        batch_window: Seconds to wait for other entries before showing
+        flush: Called after each batch of entries is shown (optional)
+    """
+    stop = threading.Event() if stop is None else stop
+    batches = queue.Queue()
+
+    def run(follower):
+        while not stop.is_set():
+            try:
+                logs = follower.poll()
+            except QueryError as e:
+                batches.put((follower, e))
+                follower.delay = follower.max_interval
+            else:
+                if logs:
+                    batches.put((follower, logs))
+            if follower.delay:
+                follower.wake.wait(follower.delay)
+                follower.wake.clear()
+
+    for follower in followers:
+        threading.Thread(target=run, args=(follower,), daemon=True).start()
+    try:
+        while not stop.is_set():
+            try:
+                pending = [batches.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + batch_window
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(batches.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            entries = []
+            for follower, result in pending:
+                if isinstance(result, QueryError):
+                    on_error(follower, result)
+                else:
+                    entries.extend((follower, log) for log in result)
+            entries.sort(key=lambda item: int(item[1]["timestamp"]))
+            for follower, log in entries:
+                show(follower, log)
+            if flush is not None:
+                flush()
+    finally:
+        stop.set()
+        for follower in followers:
+            follower.wake.set()
+
+
+def _wake_on_enter(followers):
+    """Make the followers poll immediately whenever Enter is pressed"""
+
+    def run():
+        for _ in sys.stdin:
+            for follower in followers:
+                follower.wake.set()
+
+    if sys.stdin is not None:
+        threading.Thread(target=run, daemon=True).start()
+
+
+def get_logs_from_canisters(canister_ids, **kwargs):
+    """Query several canisters concurrently and merge their logs by time
+
+    A canister that cannot be queried is reported on stderr and left out,
+    as in follow mode; with a single canister, this exits instead.
+
+    Args:
+        canister_ids: IDs of the canisters to query
+        **kwargs: Arguments of get_logs
+
+    Returns:
+        List of (canister ID, log entry) in timestamp order
+    """
+
+    def query(canister_id):
+        try:
+            return _query_logs(canister_id, **kwargs)
+        except QueryError as e:
+            print(f"Error querying logs from {canister_id}: {e}", file=sys.stderr)
+            return None
+
+    with ThreadPoolExecutor(max_workers=min(len(canister_ids), 16)) as pool:
+        results = list(pool.map(query, canister_ids))
+    if len(canister_ids) == 1 and results[0] is None:
+        sys.exit(1)
+    sources = [
+        [(canister_id, log) for log in logs]
+        for canister_id, logs in zip(canister_ids, results)
+        if logs is not None
+    ]
+    return list(heapq.merge(*sources, key=lambda item: int(item[1]["timestamp"])))
+
+
+def get_logs_unpaged(
+    canister_id,
+    tail=None,
+    level=None,
+    network=None,
+    from_entry=None,
+    name=None,
+    fields=None,
+    contains=None,
+    from_time=None,
+    to_time=None,
+):
+    """Query log entries from a canister with a single get_canister_logs call
+
     Note:
         The parameters are passed to the canister in the following order:
         1. from_entry
         2. max_entries (tail)
         3. min_level (level)
         4. logger_name (name)
+        5. fields
+        6. contains
+        7. from_time
+        8. to_time
     """
-    # Build the query arguments in the correct order as expected by the canister API
-    args = []
+    try:
+        return _query_logs_unpaged(
+            canister_id,
+            tail,
+            level,
+            network,
+            from_entry,
+            name,
+            fields,
+            contains,
+            from_time,
+            to_time,
+        )
+    except QueryError as e:
+        print(f"Error querying logs: {e}", file=sys.stderr)
+        sys.exit(1)
 
-    # 1. from_entry parameter
-    if from_entry is not None:
-        args.append(f"(opt {from_entry})")
-    else:
-        args.append("null")
 
-    # 2. tail/max_entries parameter
-    if tail is not None:
-        args.append(f"(opt {tail})")
-    else:
-        args.append("null")
+def _query_logs_unpaged(
+    canister_id,
+    tail=None,
+    level=None,
+    network=None,
+    from_entry=None,
+    name=None,
+    fields=None,
+    contains=None,
+    from_time=None,
+    to_time=None,
+):
+    """Same as get_logs_unpaged, but raise QueryError instead of exiting"""
+    args = _log_query_args(
+        from_entry, tail, level, name, fields, contains, from_time, to_time
+    )
+    return query_canister(canister_id, "get_canister_logs", args, network)
 
-    # 3. level/min_level parameter
-    if level is not None:
-        args.append(f'(opt "{level}")')
-    else:
-        args.append("null")
 
-    # 4. logger_name parameter
-    if name is not None:
-        args.append(f'(opt "{name}")')
-    else:
-        args.append("null")
+def get_stats(canister_id, network=None, since=None):
+    """Query the log counters of a canister
 
-    query_args = ", ".join(args)
+    Args:
+        canister_id: ID of the canister to query
+        network: Network to query (optional)
+        since: Only return buckets ending after this time in seconds (optional)
+
+    Returns:
+        Dictionary shaped like kybra_simple_logging.get_log_stats()
+    """
+    try:
+        stats = query_canister(
+            canister_id,
+            "get_canister_log_stats",
+            [(_OPT_NAT, None if since is None else int(since))],
+            network,
+        )
+    except QueryError as e:
+        print(f"Error querying log statistics: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    def counts(items):
+        return {item["name"]: int(item["count"]) for item in items}
+
+    return {
+        "total_entries": int(stats["total_entries"]),
+        "total_bytes": int(stats["total_bytes"]),
+        "levels": counts(stats["levels"]),
+        "loggers": counts(stats["loggers"]),
+        "bucket_seconds": int(stats["bucket_seconds"]),
+        "buckets": [
+            {"start": int(bucket["start"]), "counts": counts(bucket["counts"])}
+            for bucket in stats["buckets"]
+        ],
+    }
+
+
+def format_stats(stats, level=None):
+    """Render log statistics as lines of text
+
+    Args:
+        stats: Statistics as returned by get_stats
+        level: Only count this level and above in the time buckets (optional)
+
+    Returns:
+        List of lines
+    """
+    lines = [
+        f"Entries: {stats['total_entries']} ({stats['total_bytes']} bytes)",
+        "Levels: "
+        + "  ".join(f"{name}={count}" for name, count in stats["levels"].items()),
+        "Loggers:",
+    ]
+    loggers = sorted(stats["loggers"].items(), key=lambda item: -item[1])
+    width = max((len(name) for name, _ in loggers), default=0)
+    lines.extend(f"  {name:<{width}}  {count}" for name, count in loggers)
+
+    minimum = 0 if level is None else LEVELS.index(level)
+    included = [name for i, name in enumerate(LEVELS) if i >= minimum]
+    lines.append(f"Per {stats['bucket_seconds']} seconds:")
+    for bucket in stats["buckets"]:
+        start = datetime.fromtimestamp(bucket["start"]).strftime("%Y-%m-%d %H:%M:%S")
+        counts = bucket["counts"]
+        if level is not None:
+            total = sum(counts.get(name, 0) for name in included)
+            lines.append(f"  {start}  {total}")
+        else:
+            breakdown = "  ".join(
+                f"{name}={counts[name]}" for name in included if counts.get(name)
+            )
+            lines.append(f"  {start}  {breakdown}")
+    return lines
 
-    # Call dfx to query the logs with JSON output
-    cmd = ["dfx", "canister", "call", "--output", "json"]
 
-    # Add network option if specified
-    if network is not None:
-        cmd.extend(["--network", network])
+def stats_main(argv):
+    """Entry point of `kslog stats`"""
+    args = parse_stats_args(argv)
+    network = _use_transport(args)
+    since = None if args.minutes is None else time.time() - args.minutes * 60
+    stats = get_stats(args.canister_id, network=network, since=since)
+    for line in format_stats(stats, level=args.level):
+        print(line)
 
-    # Add canister ID and method
-    cmd.extend([canister_id, "get_canister_logs", f"({query_args})"])
 
+def query_main(argv):
+    """Entry point of `kslog query`"""
+    args = parse_query_args(argv)
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        return json.loads(result.stdout)
-    except subprocess.CalledProcessError as e:
-        print(f"Error querying logs: {e.stderr}", file=sys.stderr)
-        sys.exit(1)
-    except json.JSONDecodeError as e:
-        print(f"Error parsing JSON response: {e}", file=sys.stderr)
-        sys.exit(1)
+        filters = dict(
+            level=args.level,
+            name=args.name,
+            fields=parse_fields(args.field),
+            contains=args.grep,
+            from_time=None if args.since is None else parse_time(args.since),
+            to_time=None if args.until is None else parse_time(args.until),
+            from_entry=args.from_entry,
+            to_entry=args.to_entry,
+        )
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    archive_dir = os.path.expanduser(args.archive_dir)
+    canister_ids = args.canister_ids
+    if not canister_ids and os.path.isdir(archive_dir):
+        canister_ids = sorted(
+            name
+            for name in os.listdir(archive_dir)
+            if os.path.isfile(os.path.join(archive_dir, name, "index.json"))
+        )
+    archives = {}
+    for canister_id in canister_ids:
+        try:
+            archives[canister_id] = LogArchive(
+                os.path.join(archive_dir, canister_id), read_only=True
+            )
+        except FileNotFoundError:
+            print(
+                f"Error: no archive of {canister_id} in {archive_dir}", file=sys.stderr
+            )
+            sys.exit(1)
+
+    if args.count or args.group_by:
+        counts = Counter()
+        for canister_id, archive in archives.items():
+            if args.group_by == "canister":
+                counts[canister_id] += sum(count_archived(archive, **filters).values())
+            else:
+                counts.update(count_archived(archive, args.group_by, **filters))
+        lines = format_counts(counts, args.group_by)
+        if args.count and args.group_by:
+            lines.append(f"{sum(counts.values()):>10}  total")
+        for line in lines:
+            print(line)
+        return
+
+    _show_archived(archives, args.tail, filters, _log_writer(args))
+
+
+# Terminal colors of the log levels
+_LEVEL_COLORS = {
+    "DEBUG": "\033[94m",  # Blue
+    "INFO": "\033[92m",  # Green
+    "WARNING": "\033[93m",  # Yellow
+    "ERROR": "\033[91m",  # Red
+    "CRITICAL": "\033[91m\033[1m",  # Bold Red
+}
+_RESET = "\033[0m"
+_COLORED_LEVELS = {
+    level: f"{color}[{level}]{_RESET}" for level, color in _LEVEL_COLORS.items()
+}
+
 
+@functools.lru_cache(maxsize=4096)
+def _format_second(second):
+    """Render a time in seconds; cached, as consecutive entries share seconds"""
+    return datetime.fromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S")
 
-def format_log(log_entry):
+
+def format_log(log_entry, source=None, color=True):
+    """Render a log entry as a line, prefixed with its source if given"""
     # Convert timestamp from nanoseconds to seconds and format as datetime
     try:
-        timestamp = datetime.fromtimestamp(int(log_entry["timestamp"]) / 1e9).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )
+        timestamp = _format_second(int(log_entry["timestamp"]) // 1_000_000_000)
     except (ValueError, KeyError):
         timestamp = "Unknown time"
 
@@ -133,95 +1711,238 @@ def format_log(log_entry):
     name = log_entry.get("logger_name", "unknown")
     message = log_entry.get("message", "")
     id = log_entry.get("id", "unknown")
+    fields = log_entry.get("fields") or []
+    if fields:
+        message = " ".join(
+            [message, *(f"{field['name']}={field['value']}" for field in fields)]
+        )
+
+    if not color:
+        level = f"[{level}]"
+    elif level in _COLORED_LEVELS:
+        level = _COLORED_LEVELS[level]
+    else:
+        level = f"[{level}]{_RESET}"
+
+    line = f"{timestamp} [{id}] {level} [{name}] {message}"
+    return line if source is None else f"[{source}] {line}"
 
-    # Add colors based on log level
-    level_colors = {
-        "DEBUG": "\033[94m",  # Blue
-        "INFO": "\033[92m",  # Green
-        "WARNING": "\033[93m",  # Yellow
-        "ERROR": "\033[91m",  # Red
-        "CRITICAL": "\033[91m\033[1m",  # Bold Red
-    }
-    reset = "\033[0m"
-    color = level_colors.get(level, "")
 
-    return f"{timestamp} [{id}] {color}[{level}]{reset} [{name}] {message}"
+def format_log_json(log_entry, source=None):
+    """Render a log entry as a JSON line, with its source as "canister"
+
+    The line is assembled from escaped strings, which is several times
+    faster than serializing a dictionary per entry.
+    """
+    fields = ",".join(
+        f"{_json_string(field['name'])}:{_json_string(str(field['value']))}"
+        for field in log_entry.get("fields") or []
+    )
+    prefix = "{" if source is None else f'{{"canister":{_json_string(source)},'
+    return (
+        f'{prefix}"id":{int(log_entry["id"])},'
+        f'"timestamp":{int(log_entry["timestamp"])},'
+        f'"level":{_json_string(log_entry["level"])},'
+        f'"logger_name":{_json_string(log_entry["logger_name"])},'
+        f'"message":{_json_string(log_entry["message"])},'
+        f'"fields":{{{fields}}}}}'
+    )
+
+
+class LogWriter:
+    """Write rendered log entries to a stream in batches
+
+    Lines are written and flushed together when flush() is called, such as
+    after each poll, or when batch_lines are pending, instead of one system
+    call per line.
+    """
+
+    def __init__(self, stream=None, output="text", color=True, batch_lines=4096):
+        """
+        Args:
+            stream: Text stream to write to (defaults to sys.stdout)
+            output: "text" for format_log lines, "jsonl" for format_log_json
+            color: Whether to color the log levels of text lines
+            batch_lines: Number of pending lines that triggers a flush
+        """
+        self.stream = sys.stdout if stream is None else stream
+        self.batch_lines = batch_lines
+        if output == "jsonl":
+            self._format = format_log_json
+        else:
+            self._format = functools.partial(format_log, color=color)
+        self._lines = []
+
+    def write(self, log_entry, source=None):
+        """Render a log entry, prefixed with its source if given"""
+        self._lines.append(self._format(log_entry, source))
+        if len(self._lines) >= self.batch_lines:
+            self.flush()
+
+    def flush(self):
+        """Write the pending lines and flush the stream"""
+        if self._lines:
+            self._lines.append("")
+            self.stream.write("\n".join(self._lines))
+            self._lines = []
+        self.stream.flush()
+
+
+def _log_writer(args):
+    """Create the LogWriter for the output options"""
+    color = not args.no_color and not os.environ.get("NO_COLOR")
+    return LogWriter(output=args.output, color=color)
 
 
 def main():
-    # Set stdout to line buffering mode to ensure timely output when piped
-    import io
+    try:
+        _run()
+    except BrokenPipeError:
+        # The output was piped into a program that exited, such as head;
+        # silence the error Python would report when flushing at exit
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        sys.exit(1)
+
 
-    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, line_buffering=True)
+def _run():
+    if sys.argv[1:2] == ["stats"]:
+        stats_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["query"]:
+        query_main(sys.argv[2:])
+        return
 
     args = parse_args()
 
     # Determine network option
-    network = None
-    if args.ic:
-        network = "ic"
-    elif args.network:
-        network = args.network
+    network = _use_transport(args)
+
+    try:
+        fields = parse_fields(args.field)
+        from_time = None if args.since is None else parse_time(args.since)
+        to_time = None if args.until is None else parse_time(args.until)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    # Prefix the entries with their canister when following several
+    several = len(args.canister_ids) > 1
+    writer = _log_writer(args)
+    filters = dict(
+        level=args.level,
+        name=args.name,
+        fields=fields,
+        contains=args.grep,
+        from_time=from_time,
+        to_time=to_time,
+    )
+
+    if args.archive:
+        _archive_main(args, network, filters, writer)
+        return
 
     if not args.follow:
         # One-time query
-        logs = get_logs(
-            args.canister_id,
+        logs = get_logs_from_canisters(
+            args.canister_ids,
             tail=args.tail,
-            level=args.level,
             network=network,
-            name=args.name,
+            parallel=args.parallel,
+            **filters,
         )
 
-        for log in logs:
-            print(format_log(log), flush=True)
+        for canister_id, log in logs:
+            writer.write(log, canister_id if several else None)
+        writer.flush()
         return
 
     # Follow mode
-    try:
-        last_poll_time = 0
-        last_log_id = 0
-        first_poll = True
+    followers = [
+        Follower(
+            canister_id,
+            network=network,
+            tail=args.tail,
+            min_interval=args.min_interval,
+            max_interval=args.interval,
+            parallel=args.parallel,
+            **filters,
+        )
+        for canister_id in args.canister_ids
+    ]
+    _follow(followers, writer)
 
-        while True:
-            current_time = time.time()
-            if (
-                first_poll
-                or current_time - last_poll_time >= args.interval
-                or select.select([sys.stdin], [], [], 0)[0]
-            ):
-                if select.select([sys.stdin], [], [], 0)[0]:
-                    input()
-
-                if first_poll:
-                    logs = get_logs(
-                        args.canister_id,
-                        tail=args.tail,
-                        level=args.level,
-                        network=network,
-                        name=args.name,
-                    )
-                    first_poll = False
-                else:
-                    logs = get_logs(
-                        args.canister_id,
-                        tail=None,
-                        level=args.level,
-                        network=network,
-                        from_entry=last_log_id + 1,
-                        name=args.name,
-                    )
 
-                last_poll_time = current_time
+def _archive_main(args, network, filters, writer):
+    """Update the archives of the canisters, then show and follow their logs"""
+    archive_dir = os.path.expanduser(args.archive_dir)
+    followers = [
+        Follower(
+            canister_id,
+            network=network,
+            min_interval=args.min_interval,
+            max_interval=args.interval,
+            archive=LogArchive(os.path.join(archive_dir, canister_id)),
+            parallel=args.parallel,
+        )
+        for canister_id in args.canister_ids
+    ]
 
-                for log in logs:
-                    print(format_log(log), flush=True)
+    def sync(follower):
+        try:
+            sync_archive(follower)
+        except QueryError as e:
+            print(
+                f"Error querying logs from {follower.canister_id}: {e}\n"
+                "Showing the archived logs only",
+                file=sys.stderr,
+            )
 
-                # Update the last log ID if we have logs
-                if logs:
-                    last_log_id = max(int(log.get("id", 0)) for log in logs)
+    with ThreadPoolExecutor(max_workers=min(len(followers), 16)) as pool:
+        list(pool.map(sync, followers))
+
+    # The archives hold every entry, the filters are applied locally
+    archives = {follower.canister_id: follower.archive for follower in followers}
+    _show_archived(archives, args.tail, filters, writer)
+
+    if args.follow:
+        _follow(followers, writer, log_filter(**filters))
+
+
+def _show_archived(archives, tail, filters, writer):
+    """Show the matching entries of archives, merged by time"""
+    several = len(archives) > 1
+    sources = [
+        zip(repeat(canister_id), archived_logs(archive, tail=tail, **filters))
+        for canister_id, archive in archives.items()
+    ]
+    logs = heapq.merge(*sources, key=lambda item: item[1]["timestamp"])
+    if tail is not None and several:
+        logs = deque(logs, maxlen=tail)
+    for canister_id, log in logs:
+        writer.write(log, canister_id if several else None)
+    writer.flush()
 
-            time.sleep(0.1)
+
+def _follow(followers, writer, matches=None):
+    """Follow canisters until interrupted, showing the matching entries"""
+    several = len(followers) > 1
+
+    def show(follower, log):
+        if matches is None or matches(log):
+            writer.write(log, follower.canister_id if several else None)
+
+    def on_error(follower, error):
+        print(
+            f"Error querying logs from {follower.canister_id}: {error}",
+            file=sys.stderr,
+        )
+        if not several:
+            sys.exit(1)
+
+    _wake_on_enter(followers)
+    try:
+        follow_logs(followers, show, on_error, flush=writer.flush)
     except KeyboardInterrupt:
         print("\nExiting log follower")
 
@@ -68,10 +68,24 @@ else
   exit_code=1
 fi
 
+# Run CLI tests
+echo -e "\n=== Running CLI Tests ==="
+PYTHONPATH=".:../.." python tests/test_cli.py
+result=$?
+
+if [ $result -eq 0 ]; then
+  echo -e "✓ CLI tests passed"
+  pass_count=$((pass_count + 1))
+else
+  echo -e "✗ CLI tests failed"
+  fail_count=$((fail_count + 1))
+  exit_code=1
+fi
+
 # Print summary
 echo -e "\n=== Test Summary ==="
-# Count all test suites: log tests + variable tests + memory tests
-total_tests=15  # 5 log tests + 5 variable tests + 5 memory tests
+# Count all test suites: log tests + variable tests + memory tests + CLI tests
+total_tests=42  # 5 log tests + 5 variable tests + 23 memory tests + 9 CLI tests
 echo -e "Tests run: ${total_tests}"
 echo -e "Passed: ${total_tests}"  # If we got here, all tests passed 
 echo -e "Failed: 0"
@@ -0,0 +1,857 @@
+#!/usr/bin/env python3
+"""Tests of the kslog transports against a stub replica and a fake dfx"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from kybra_simple_logging import (
+    Level,
+    _candid,
+    clear_logs,
+    cli,
+    get_log_head,
+    get_logger,
+    get_logs,
+    get_logs_blob,
+    get_logs_page,
+)
+from kybra_simple_logging._archive import LogArchive
+
+CANISTER_ID = "rrkah-fqaaa-aaaaa-aaaaq-cai"
+
+_FIELD = ("record", (("name", "text"), ("value", "text")))
+_ENTRY = (
+    "record",
+    (
+        ("timestamp", "nat"),
+        ("level", "text"),
+        ("logger_name", "text"),
+        ("message", "text"),
+        ("id", "nat"),
+        ("fields", ("vec", _FIELD)),
+    ),
+)
+_PAGE = (
+    "record",
+    (("entries", ("vec", _ENTRY)), ("next_from_entry", "nat"), ("has_more", "bool")),
+)
+_BLOB = (
+    "record",
+    (("data", ("vec", "nat8")), ("next_from_entry", "nat"), ("has_more", "bool")),
+)
+
+
+_HEAD = (
+    "record",
+    (
+        ("last_id", "nat"),
+        ("first_id", "nat"),
+        ("entries", "nat"),
+        ("evicted", "nat"),
+    ),
+)
+
+
+def _public_entry(log):
+    return {
+        "timestamp": int(log["timestamp"] * 1e9),
+        "level": log["level"],
+        "logger_name": log["logger_name"],
+        "message": log["message"],
+        "id": log["id"],
+        "fields": [{"name": k, "value": str(v)} for k, v in log["fields"].items()],
+    }
+
+
+def _call(method, args):
+    """Run a canister query of this library, returning (reply type, reply)"""
+    if method == "get_canister_log_head":
+        return _HEAD, get_log_head()
+    from_entry, max_entries, min_level, logger_name, *rest = args
+    filters = dict(
+        from_entry=from_entry,
+        max_entries=max_entries,
+        min_level=None if min_level is None else Level[min_level],
+        logger_name=logger_name,
+    )
+    if method != "get_canister_logs":
+        filters["max_bytes"] = rest.pop(0)
+    fields, contains, from_time, to_time, *compress = rest
+    filters.update(
+        fields={f["name"]: f["value"] for f in fields or []},
+        contains=contains,
+        from_time=None if from_time is None else from_time / 1e9,
+        to_time=None if to_time is None else to_time / 1e9,
+    )
+    if method == "get_canister_logs":
+        return ("vec", _ENTRY), [_public_entry(log) for log in get_logs(**filters)]
+    if method == "get_canister_logs_page":
+        page = get_logs_page(**filters)
+        page["entries"] = [_public_entry(log) for log in page["entries"]]
+        return _PAGE, page
+    return _BLOB, get_logs_blob(**filters, compress=compress != [False])
+
+
+class StubReplica:
+    """An HTTP server answering canister queries like a replica"""
+
+    def __init__(
+        self,
+        methods=(
+            "get_canister_logs_blob",
+            "get_canister_logs_page",
+            "get_canister_log_head",
+        ),
+    ):
+        self.methods = set(methods) | {"get_canister_logs"}
+        self.connections = 0
+        self.queries = []
+        self.drop_next_connection = False
+        replica = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                replica.connections += 1
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                content = _candid.cbor_decode(body)["content"]
+                method = content["method_name"]
+                replica.queries.append(method)
+                assert content["request_type"] == "query"
+                assert _candid.principal_to_text(content["canister_id"]) == CANISTER_ID
+                if method in replica.methods:
+                    args = _candid.decode(content["arg"], ["name", "value"])
+                    reply_type, reply = _call(method, args)
+                    response = {
+                        "status": "replied",
+                        "reply": {"arg": _candid.encode([reply_type], [reply])},
+                    }
+                else:
+                    response = {
+                        "status": "rejected",
+                        "reject_code": 3,
+                        "reject_message": f"Canister {CANISTER_ID} has no "
+                        f"query method '{method}'",
+                    }
+                data = _candid.cbor_encode(response)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/cbor")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                # Drop a kept-alive connection without telling the client
+                if replica.drop_next_connection:
+                    replica.drop_next_connection = False
+                    self.close_connection = True
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def fill_logs():
+    clear_logs()
+    cli_logger = get_logger("cli_test")
+    for i in range(40):
+        level = Level.ERROR if i % 4 == 0 else Level.INFO
+        cli_logger.log(level, 'Request %d "quoted" ünïcødé', i, user=f"u{i % 3}")
+
+
+def test_candid():
+    """Test the Candid and CBOR codecs used by the agent transport"""
+    print("\n=== Testing candid ===\n")
+    types = [cli._OPT_NAT, cli._OPT_TEXT, cli._OPT_FIELDS, cli._OPT_BOOL, "int"]
+    values = [2**70, None, [{"name": "a", "value": "é"}], False, -129]
+    assert _candid.decode(_candid.encode(types, values), ["name", "value"]) == values
+    rendered = [_candid.to_text(t, v) for t, v in zip(types, values)]
+    assert rendered == [
+        f"(opt {2**70})",
+        "null",
+        '(opt vec { record { name = "a"; value = "é" } })',
+        "(opt false)",
+        "-129",
+    ], rendered
+    text = _candid.to_text("text", 'say "hi"\n\tto C:\\ \x01')
+    assert text == '"say \\"hi\\"\\n\\tto C:\\\\ \\u{1}"', text
+
+    # Unknown field names are rendered by hash, like dfx does
+    record = ("record", (("zeta", "nat"), ("alpha", "text")))
+    data = _candid.encode([record], [{"zeta": 1, "alpha": "x"}])
+    assert _candid.decode(data, ["zeta"]) == [
+        {f"_{_candid.idl_hash('alpha')}": "x", "zeta": 1}
+    ]
+
+    principal = _candid.principal_from_text(CANISTER_ID)
+    assert principal == bytes([0, 0, 0, 0, 0, 0, 0, 1, 1, 1])
+    assert _candid.principal_to_text(principal) == CANISTER_ID
+    for invalid in ("my_canister", "rrkah-fqaaa-aaaaa-aaaaq-cab"):
+        try:
+            _candid.principal_from_text(invalid)
+        except ValueError:
+            pass
+        else:
+            assert False, f"accepted invalid principal {invalid}"
+
+    value = {"a": [0, 23, 24, 255, 65536, 2**40, -1, -1000], "b": b"\x00", "c": "é"}
+    assert _candid.cbor_decode(_candid.cbor_encode(value)) == value
+    for invalid in (b"DIDL\x01", _candid.encode(types, values)[:-2]):
+        try:
+            _candid.decode(invalid)
+        except ValueError:
+            pass
+        else:
+            assert False, f"decoded invalid Candid {invalid!r}"
+    return 0
+
+
+def test_agent_transport():
+    """Test kslog queries over a persistent connection to a stub replica"""
+    print("\n=== Testing agent_transport ===\n")
+    fill_logs()
+    replica = StubReplica()
+    cli._UNSUPPORTED_QUERIES.clear()
+    try:
+        cli.set_transport(cli.AgentTransport(replica.url))
+        for filters in (
+            {},
+            {"level": "ERROR"},
+            {"fields": {"user": "u1"}, "contains": 'request 4 "quoted"'},
+            {"tail": 5},
+        ):
+            logs = cli.get_logs(CANISTER_ID, **filters)
+            expected = get_logs(
+                min_level=Level.ERROR if "level" in filters else None,
+                max_entries=filters.get("tail"),
+                fields=filters.get("fields"),
+                contains=filters.get("contains"),
+            )
+            assert [log["id"] for log in logs] == [log["id"] for log in expected]
+            assert logs and logs[-1]["message"] == expected[-1]["message"], logs
+            assert logs[-1]["fields"][0]["value"] == expected[-1]["fields"]["user"]
+        assert set(replica.queries) == {"get_canister_logs_blob"}, replica.queries
+
+        # All queries shared one connection, which is reopened when the
+        # replica drops it
+        assert replica.connections == 1, replica.connections
+        replica.drop_next_connection = True
+        cli.get_logs(CANISTER_ID, tail=1)
+        assert len(cli.get_logs(CANISTER_ID, tail=1)) == 1
+        assert replica.connections == 2, replica.connections
+
+        # Threads query concurrently over their own connections
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(cli.get_logs, [CANISTER_ID] * 8))
+        assert all(len(logs) == len(get_logs()) for logs in results)
+        assert replica.connections <= 6, replica.connections
+
+        # Canisters built before the blob query are read with record pages
+        replica.methods.discard("get_canister_logs_blob")
+        cli._UNSUPPORTED_QUERIES.clear()
+        replica.queries.clear()
+        assert len(cli.get_logs(CANISTER_ID)) == len(get_logs())
+        assert replica.queries[:2] == [
+            "get_canister_logs_blob",
+            "get_canister_logs_page",
+        ], replica.queries
+        try:
+            cli.query_canister(CANISTER_ID, "missing", [])
+        except cli.QueryError as e:
+            assert "has no query method 'missing'" in str(e), e
+        else:
+            assert False, "missing method did not fail"
+    finally:
+        replica.close()
+        cli._TRANSPORTS.clear()
+        cli._UNSUPPORTED_QUERIES.clear()
+    return 0
+
+
+class LibraryCanister:
+    """A transport running this library's queries in process, with latency"""
+
+    def __init__(self, latency=0.0, methods=("get_canister_logs_blob",)):
+        self.latency = latency
+        self.methods = set(methods) | {"get_canister_logs"}
+        self.queries = self.active = self.peak = 0
+        self.lock = threading.Lock()
+
+    def query(self, canister_id, method, args):
+        if method not in self.methods:
+            raise cli.QueryError(f"Canister has no query method '{method}'")
+        with self.lock:
+            self.queries += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.latency)
+            return _call(method, [value for _, value in args])[1]
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def test_backfill():
+    """Test fetching the stored history in concurrent chunks"""
+    print("\n=== Testing backfill ===\n")
+    clear_logs()
+    backfill_logger = get_logger("backfill_test")
+    for i in range(3000):
+        level = Level.ERROR if i % 10 == 0 else Level.INFO
+        backfill_logger.log(level, "Backfill entry %d", i, user=f"u{i % 4}")
+    expected = [log["id"] for log in get_logs()]
+    canister = LibraryCanister(latency=0.005)
+    cli.set_transport(canister)
+    try:
+        assert cli.get_log_id_range(CANISTER_ID) == (expected[0], expected[-1])
+        logs = cli.get_logs(CANISTER_ID, parallel=4)
+        assert [log["id"] for log in logs] == expected
+        assert logs[-1]["message"] == "Backfill entry 2999", logs[-1]
+        assert 1 < canister.peak <= 4, canister.peak
+
+        # Pages running into the next chunk are cut at the chunk boundary
+        page = cli.backfill_logs(
+            CANISTER_ID,
+            parallel=3,
+            max_bytes=2_000,
+            level="ERROR",
+            fields={"user": "u2"},
+        )
+        assert [log["id"] for log in page["entries"]] == [
+            log["id"] for log in get_logs(min_level=Level.ERROR, fields={"user": "u2"})
+        ]
+        assert page["next_from_entry"] == expected[-1] + 1 and not page["has_more"]
+        page = cli.backfill_logs(CANISTER_ID, from_entry=expected[-10], max_bytes=300)
+        assert [log["id"] for log in page["entries"]] == expected[-10:]
+        page = cli.backfill_logs(CANISTER_ID, from_entry=expected[-1] + 1)
+        assert page["entries"] == [] and page["next_from_entry"] == expected[-1] + 1
+
+        # Followers backfill once, then poll page by page
+        follower = cli.Follower(CANISTER_ID, parallel=4, max_bytes=5_000)
+        assert [log["id"] for log in follower.poll()] == expected
+        backfill_logger.info("After the backfill")
+        canister.queries = 0
+        assert [log["message"] for log in follower.poll()] == ["After the backfill"]
+        assert canister.queries == 1, canister.queries
+
+        # Canisters with the log head query answer the range in one query
+        canister.methods.add("get_canister_log_head")
+        cli._UNSUPPORTED_QUERIES.clear()
+        canister.queries = 0
+        head = get_log_head()
+        assert cli.get_log_id_range(CANISTER_ID) == (head["first_id"], head["last_id"])
+        assert canister.queries == 1, canister.queries
+
+        clear_logs()
+        assert cli.get_log_id_range(CANISTER_ID) is None
+        assert cli.backfill_logs(CANISTER_ID)["entries"] == []
+
+        # Canisters without page queries are read at once
+        backfill_logger.info("Unpaged")
+        canister.methods = {"get_canister_logs"}
+        logs = cli.get_logs(CANISTER_ID, parallel=4)
+        assert [log["message"] for log in logs] == ["Unpaged"], logs
+    finally:
+        cli._TRANSPORTS.clear()
+        cli._UNSUPPORTED_QUERIES.clear()
+    return 0
+
+
+def test_follow_scheduling():
+    """Test that the follower catches up at once and backs off when idle"""
+    print("\n=== Testing follow_scheduling ===\n")
+    fill_logs()
+    replica = StubReplica()
+    try:
+        cli.set_transport(cli.AgentTransport(replica.url))
+        follower = cli.Follower(
+            CANISTER_ID, tail=30, min_interval=0.5, max_interval=3, max_bytes=1_000
+        )
+        ids, delays = [], []
+        for _ in range(9):
+            ids.extend(log["id"] for log in follower.poll())
+            delays.append(follower.delay)
+        # Full pages are followed immediately, then the follower backs off
+        assert ids == [log["id"] for log in get_logs(max_entries=30)], ids
+        pages = delays.index(0.5) + 1
+        assert pages >= 2 and set(delays[: pages - 1]) == {0}, delays
+        backoff = delays[pages:]
+        assert backoff[:4] == [1, 2, 3, 3], delays
+        # Idle polls only probe the log head
+        idle_start = len(replica.queries) - len(backoff)
+        assert set(replica.queries[idle_start:]) == {"get_canister_log_head"}
+
+        get_logger("cli_test").info("New entry", user="u1")
+        logs = follower.poll()
+        assert [log["message"] for log in logs] == ["New entry"], logs
+        assert follower.delay == 0.5
+
+        # Filtered followers only see matching entries
+        follower = cli.Follower(CANISTER_ID, level="ERROR", fields={"user": "u1"})
+        logs = follower.poll()
+        assert logs and {log["level"] for log in logs} == {"ERROR"}, logs
+        assert follower.poll() == [] and follower.delay == 1
+
+        # Canisters without page queries are followed with get_canister_logs
+        replica.methods = {"get_canister_logs"}
+        cli._UNSUPPORTED_QUERIES.clear()
+        follower = cli.Follower(CANISTER_ID, tail=2)
+        assert [log["id"] for log in follower.poll()] == [
+            log["id"] for log in get_logs(max_entries=2)
+        ]
+        assert follower.poll() == [] and follower.from_entry == get_logs()[-1]["id"] + 1
+    finally:
+        replica.close()
+        cli._TRANSPORTS.clear()
+        cli._UNSUPPORTED_QUERIES.clear()
+    return 0
+
+
+class FakeCanisters:
+    """A transport serving record pages of in-memory logs per canister"""
+
+    def __init__(self, logs, slow=()):
+        self.logs = logs
+        self.slow = slow
+
+    def query(self, canister_id, method, args):
+        if canister_id not in self.logs:
+            raise cli.QueryError(f"Canister {canister_id} not found")
+        if method != "get_canister_logs_page":
+            raise cli.QueryError(f"Canister has no query method '{method}'")
+        if canister_id in self.slow:
+            time.sleep(1)
+        from_entry = args[0][1] or 1
+        entries = [log for log in self.logs[canister_id] if log["id"] >= from_entry]
+        return {
+            "entries": entries,
+            "next_from_entry": len(self.logs[canister_id]) + 1,
+            "has_more": False,
+        }
+
+
+def _fake_log(log_id, timestamp):
+    return {
+        "id": log_id,
+        "timestamp": str(timestamp),
+        "level": "INFO",
+        "logger_name": "fake",
+        "message": f"entry {log_id}",
+    }
+
+
+def test_multi_canister():
+    """Test querying and following several canisters merged by time"""
+    print("\n=== Testing multi_canister ===\n")
+    fake = FakeCanisters(
+        {
+            "fast": [_fake_log(1, 10), _fake_log(2, 30)],
+            "slow": [_fake_log(1, 20), _fake_log(2, 40)],
+        },
+        slow={"slow"},
+    )
+    cli.set_transport(fake)
+    try:
+        merged = cli.get_logs_from_canisters(["fast", "slow"])
+        assert [(c, int(log["timestamp"])) for c, log in merged] == [
+            ("fast", 10),
+            ("slow", 20),
+            ("fast", 30),
+            ("slow", 40),
+        ], merged
+        line = cli.format_log(merged[0][1], "fast")
+        assert line.startswith("[fast] ") and "[1]" in line, line
+
+        # A canister that cannot be queried is reported and left out
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            merged = cli.get_logs_from_canisters(["fast", "missing"])
+        assert [c for c, _ in merged] == ["fast", "fast"], merged
+        assert "from missing: Canister missing not found" in stderr.getvalue()
+
+        # A corrupt batch is a query error, reported and retried like others
+        class CorruptBlob:
+            def query(self, canister_id, method, args):
+                return {"data": b"KSLB\x01garbage", "next_from_entry": 2}
+
+        cli.set_transport(CorruptBlob())
+        try:
+            cli.get_logs_blob_page("corrupt")
+            raise AssertionError("A corrupt batch should raise QueryError")
+        except cli.QueryError as e:
+            assert "Invalid log batch from corrupt" in str(e), e
+        cli.set_transport(fake)
+
+        # The slow canister does not hold up the others, and a failing one
+        # is reported without stopping them
+        followers = [
+            cli.Follower(canister_id, min_interval=0.05, max_interval=0.1)
+            for canister_id in ("fast", "slow", "missing")
+        ]
+        shown, errors = [], []
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=cli.follow_logs,
+            args=(
+                followers,
+                lambda f, log: shown.append((f.canister_id, log["id"])),
+                lambda f, e: errors.append(f.canister_id),
+                stop,
+            ),
+        )
+        thread.start()
+        try:
+            time.sleep(0.5)
+            assert shown == [("fast", 1), ("fast", 2)], shown
+            assert "missing" in errors, errors
+            fake.logs["fast"].append(_fake_log(3, 50))
+            followers[0].wake.set()
+            time.sleep(0.2)
+            assert ("fast", 3) in shown, shown
+            time.sleep(1)
+            assert ("slow", 1) in shown and ("slow", 2) in shown, shown
+            assert shown.count(("fast", 3)) == 1, shown
+        finally:
+            stop.set()
+            thread.join(timeout=5)
+        assert not thread.is_alive()
+    finally:
+        cli._TRANSPORTS.clear()
+        cli._UNSUPPORTED_QUERIES.clear()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as file:
+        file.write("# Production canisters\naaaaa-aa\n\n  bbbbb-bb  # backend\n")
+    try:
+        args = cli.parse_args(["ccccc-cc", "--canister-file", file.name])
+        assert args.canister_ids == ["ccccc-cc", "aaaaa-aa", "bbbbb-bb"], args
+    finally:
+        os.unlink(file.name)
+    return 0
+
+
+def test_archive():
+    """Test the local archive and resuming followers from it"""
+    print("\n=== Testing archive ===\n")
+    path = tempfile.mkdtemp()
+    try:
+        archive = LogArchive(path, segment_entries=3)
+        logs = [_fake_log(i, i * 10) for i in range(1, 8)]
+        assert archive.append(logs[:5]) == 5
+        # Entries fetched again are not stored twice
+        assert archive.append(logs[3:]) == 2
+        assert [e["id"] for e in archive.scan()] == list(range(1, 8))
+        assert [s["count"] for s in archive.segments] == [3, 3, 1], archive.segments
+        assert archive.segments[1]["min_time"] == 40
+        assert archive.segments[1]["levels"] == {"INFO": 3}
+        assert archive.next_from_entry == 8
+
+        # A line torn by an interrupted run is dropped, complete unindexed
+        # entries are recovered
+        with open(os.path.join(path, archive.segments[-1]["file"]), "a") as file:
+            entry = dict(_fake_log(8, 80), timestamp=80, fields=[])
+            file.write(json.dumps(entry) + "\n" + '{"id": 9, "tim')
+        archive = LogArchive(path, segment_entries=3)
+        assert [e["id"] for e in archive.scan()][-2:] == [7, 8]
+        assert archive.next_from_entry == 9 and archive.segments[-1]["count"] == 2
+
+        # Followers resume from the archive and only fetch new entries
+        fake = FakeCanisters({"c": [_fake_log(i, i * 10) for i in range(1, 11)]})
+        cli.set_transport(fake)
+        follower = cli.Follower("c", archive=archive)
+        assert follower.from_entry == 9
+        assert [log["id"] for log in follower.poll()] == [9, 10]
+        assert LogArchive(path).next_from_entry == 11
+
+        # IDs starting over after an upgrade begin a new epoch
+        fake.logs["c"] = [_fake_log(1, 200), _fake_log(2, 210)]
+        assert follower.poll() == [] and archive.epoch == 1
+        assert [log["id"] for log in follower.poll()] == [1, 2]
+        assert archive.segments[-1]["epoch"] == 1
+        assert archive.segments[-1]["min_id"] == 1
+        assert [e["timestamp"] for e in archive.scan()][-3:] == [100, 200, 210]
+
+        matches = cli.log_filter("INFO", None, None, "entry 1", 150, None)
+        assert [e["id"] for e in archive.scan() if matches(e)] == [1]
+    finally:
+        cli._TRANSPORTS.clear()
+        cli._UNSUPPORTED_QUERIES.clear()
+        shutil.rmtree(path)
+    return 0
+
+
+def _archived_log(log_id, timestamp, level, name, message, **fields):
+    return {
+        "id": log_id,
+        "timestamp": timestamp,
+        "level": level,
+        "logger_name": name,
+        "message": message,
+        "fields": [{"name": k, "value": v} for k, v in fields.items()],
+    }
+
+
+def test_archive_query():
+    """Test the offline queries against a plain scan of the archive"""
+    print("\n=== Testing archive_query ===\n")
+    path = tempfile.mkdtemp()
+    try:
+        archive = LogArchive(path, segment_entries=50)
+        logs = []
+        for i in range(1, 501):
+            level = "ERROR" if 200 < i <= 250 else ("DEBUG", "INFO")[i % 2]
+            name = ("api", "db", "api.auth")[i % 3]
+            message = f"Request {i} for user{i % 7} took {i % 13} ms"
+            if i == 333:
+                message = '\u212aelvin reading "quoted" value'
+            logs.append(
+                _archived_log(i, i * 10**9, level, name, message, user=f"u{i % 5}")
+            )
+        archive.append(logs)
+        archive = LogArchive(path, read_only=True)
+
+        cases = [
+            {},
+            {"level": "INFO"},
+            {"level": "ERROR"},
+            {"name": "db"},
+            {"fields": {"user": "u3"}},
+            {"contains": "user4 took"},
+            {"contains": "KELVIN"},
+            {"contains": 'quoted" value'},
+            {"from_time": 120 * 10**9, "to_time": 380 * 10**9},
+            {"from_entry": 45, "to_entry": 260, "level": "ERROR"},
+            {"name": "api.auth", "contains": "took 2", "from_time": 300 * 10**9},
+        ]
+        for filters in cases:
+            level, ranges = filters.get("level"), dict(filters)
+            ranges.pop("level", None)
+            matches = cli.log_filter(
+                level,
+                filters.get("name"),
+                filters.get("fields"),
+                filters.get("contains"),
+                filters.get("from_time"),
+                filters.get("to_time"),
+            )
+            expected = [
+                log["id"]
+                for log in logs
+                if matches(log)
+                and filters.get("from_entry", 0) <= log["id"]
+                and log["id"] <= filters.get("to_entry", 1000)
+            ]
+            found = [log["id"] for log in cli.archived_logs(archive, **filters)]
+            assert found == expected, (filters, found, expected)
+            tail = [log["id"] for log in cli.archived_logs(archive, 7, **filters)]
+            assert tail == expected[-7:], (filters, tail)
+            counts = cli.count_archived(archive, **filters)
+            assert counts == ({None: len(expected)} if expected else {}), counts
+            by_level = cli.count_archived(archive, "level", **filters)
+            assert sum(by_level.values()) == len(expected), by_level
+        assert cli.count_archived(archive, "field:user")["u3"] == 100
+        assert cli.count_archived(archive, "name", level="ERROR") == {
+            "api": 17,
+            "db": 17,
+            "api.auth": 16,
+        }
+        minutes = cli.count_archived(archive, "minute", to_time=150 * 10**9)
+        assert sorted(minutes.items()) == [(0, 59), (60 * 10**9, 60), (120 * 10**9, 31)]
+        assert cli.format_counts(Counter({"b": 1, "a": 2}), "name") == [
+            "         2  a",
+            "         1  b",
+        ]
+
+        # Segments ruled out by their metadata are not read
+        os.rename(os.path.join(path, "00000001.jsonl"), os.path.join(path, "moved"))
+        assert len(list(cli.archived_logs(archive, level="ERROR"))) == 50
+        assert len(list(cli.archived_logs(archive, tail=3))) == 3
+        assert cli.count_archived(archive, level="INFO") == {None: 275}
+        os.rename(os.path.join(path, "moved"), os.path.join(path, "00000001.jsonl"))
+
+        try:
+            LogArchive(os.path.join(path, "missing"), read_only=True)
+            assert False, "Missing archives are not created when reading"
+        except FileNotFoundError:
+            assert not os.path.exists(os.path.join(path, "missing"))
+    finally:
+        shutil.rmtree(path)
+    return 0
+
+
+def test_output():
+    """Test the text and JSON lines output and batched writing"""
+    print("\n=== Testing output ===\n")
+    log = _archived_log(7, 1_700_000_000_123_456_789, "ERROR", "api", "Failed", a="1")
+    when = datetime.fromtimestamp(1_700_000_000).strftime("%Y-%m-%d %H:%M:%S")
+    line = f"{when} [7] \033[91m[ERROR]\033[0m [api] Failed a=1"
+    assert cli.format_log(log) == line, cli.format_log(log)
+    assert cli.format_log(log, "c1") == "[c1] " + line
+    assert cli.format_log(log, color=False) == f"{when} [7] [ERROR] [api] Failed a=1"
+    assert "[NOTICE]\033[0m" in cli.format_log(dict(log, level="NOTICE"))
+    assert "Unknown time" in cli.format_log(dict(log, timestamp="soon"))
+    assert json.loads(
+        cli.format_log_json(dict(log, timestamp=str(log["timestamp"])))
+    ) == {
+        "id": 7,
+        "timestamp": 1_700_000_000_123_456_789,
+        "level": "ERROR",
+        "logger_name": "api",
+        "message": "Failed",
+        "fields": {"a": "1"},
+    }
+    assert json.loads(cli.format_log_json(log, "c1"))["canister"] == "c1"
+    message = 'Said "h\u00e9"\n\tbye \\o/'
+    assert json.loads(cli.format_log_json(dict(log, message=message))) == dict(
+        json.loads(cli.format_log_json(log)), message=message
+    )
+
+    stream = io.StringIO()
+    writer = cli.LogWriter(stream, output="jsonl", batch_lines=3)
+    for log_id in range(1, 5):
+        writer.write(dict(log, id=log_id))
+    # A full batch is written at once, the rest waits for flush()
+    assert [json.loads(line)["id"] for line in stream.getvalue().splitlines()] == [
+        1,
+        2,
+        3,
+    ]
+    writer.flush()
+    assert stream.getvalue().count("\n") == 4
+    stream = io.StringIO()
+    writer = cli.LogWriter(stream, color=False)
+    writer.write(log, "c1")
+    writer.flush()
+    assert stream.getvalue() == f"[c1] {when} [7] [ERROR] [api] Failed a=1\n"
+
+    args = cli.parse_query_args(["--output", "jsonl", "--no-color"])
+    assert args.output == "jsonl" and args.no_color
+
+    # Importing the library prints nothing on stdout, which is kept for logs
+    result = subprocess.run(
+        [sys.executable, "-c", "import kybra_simple_logging.cli"],
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+    )
+    assert result.returncode == 0 and result.stdout == "", result
+    return 0
+
+
+class FakeDfx:
+    """Stands in for subprocess.run, answering dfx canister calls"""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.commands = []
+
+    def __call__(self, cmd, **kwargs):
+        self.commands.append(cmd)
+        if isinstance(self.reply, Exception):
+            raise self.reply
+        return subprocess.CompletedProcess(cmd, 0, stdout=json.dumps(self.reply))
+
+
+def test_dfx_transport():
+    """Test the dfx transport and the fallback to it"""
+    print("\n=== Testing dfx_transport ===\n")
+    dfx = FakeDfx({"total_entries": "3"})
+    transport = cli.DfxTransport("ic", run=dfx)
+    reply = transport.query(
+        "my_canister", "method", [(cli._OPT_NAT, 5), (cli._OPT_TEXT, 'a "b"')]
+    )
+    assert reply == {"total_entries": "3"}, reply
+    assert dfx.commands == [
+        [
+            "dfx",
+            "canister",
+            "call",
+            "--output",
+            "json",
+            "--network",
+            "ic",
+            "my_canister",
+            "method",
+            '((opt 5), (opt "a \\"b\\""))',
+        ]
+    ], dfx.commands
+
+    dfx.reply = subprocess.CalledProcessError(1, "dfx", stderr="no query method")
+    try:
+        transport.query("my_canister", "method", [])
+    except cli.QueryError as e:
+        assert str(e) == "no query method", e
+    else:
+        assert False, "dfx failure did not raise"
+
+    # Canister names and unreachable replicas are left to dfx
+    dfx.reply = {"ok": True}
+    replica = StubReplica()
+    replica.close()
+    auto = cli.make_transport("auto", replica.url)
+    auto.dfx.run = dfx
+    assert auto.query(CANISTER_ID, "method", []) == {"ok": True}
+    assert auto.transport is auto.dfx
+    auto = cli.make_transport("auto")
+    auto.dfx.run = dfx
+    assert isinstance(auto.transport, cli.AgentTransport)
+    assert auto.query("my_canister", "method", []) == {"ok": True}
+    assert isinstance(cli.make_transport("auto", "staging").transport, cli.DfxTransport)
+    return 0
+
+
+def run_all_tests():
+    """Run all CLI tests"""
+    test_functions = [
+        test_candid,
+        test_agent_transport,
+        test_backfill,
+        test_follow_scheduling,
+        test_multi_canister,
+        test_archive,
+        test_archive_query,
+        test_output,
+        test_dfx_transport,
+    ]
+
+    failures = 0
+    for test_func in test_functions:
+        try:
+            result = test_func()
+            if result != 0:
+                print(f"Test {test_func.__name__} failed with code {result}")
+                failures += 1
+        except Exception as e:
+            print(f"Test {test_func.__name__} failed with exception: {e!r}")
+            failures += 1
+
+    print("\n=== CLI Tests Complete ===\n")
+    print(f"Ran {len(test_functions)} tests with {failures} failures")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
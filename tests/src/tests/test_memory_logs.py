@@ -1,18 +1,40 @@
 #!/usr/bin/env python3
 
+import json
+
 from kybra_simple_logging import (  # In-memory logging imports
     Level,
+    SimpleLogger,
+    add_log_field_index,
     clear_logs,
+    decode_log_batch,
+    disable_log_search_index,
     disable_logging,
     disable_memory_logging,
+    enable_log_search_index,
     enable_logging,
     enable_memory_logging,
+    encode_log_batch,
+    flush_logs,
+    flush_logs_after,
+    get_log_bytes,
+    get_log_head,
+    get_log_memory_stats,
+    get_log_stats,
+    get_log_storage,
     get_logger,
     get_logs,
+    get_logs_blob,
+    get_logs_page,
     is_memory_logging_enabled,
     logger,
+    remove_log_field_index,
+    reset_log_stats,
     set_log_level,
+    set_log_storage,
+    set_max_log_bytes,
     set_max_log_entries,
+    set_output_buffering,
 )
 
 
@@ -78,6 +100,168 @@ def run_tests():
         custom_print(f"✗ Log entry ID and ordering test FAILED: {e}")
         failures += 1
 
+    # Test 6: Deferred Message Arguments
+    total += 1
+    try:
+        test_lazy_message_args()
+        custom_print("✓ Deferred message arguments test passed!")
+    except AssertionError as e:
+        custom_print(f"✗ Deferred message arguments test FAILED: {e}")
+        failures += 1
+
+    # Test 7: Columnar Storage
+    total += 1
+    try:
+        test_columnar_storage()
+        custom_print("✓ Columnar storage test passed!")
+    except AssertionError as e:
+        custom_print(f"✗ Columnar storage test FAILED: {e}")
+        failures += 1
+
+    # Test 8: Cursor Lookup
+    total += 1
+    try:
+        test_cursor_lookup()
+        custom_print("✓ Cursor lookup test passed!")
+    except AssertionError as e:
+        custom_print(f"✗ Cursor lookup test FAILED: {e}")
+        failures += 1
+
+    # Test 9: Secondary Indexes
+    total += 1
+    try:
+        test_secondary_indexes()
+        custom_print("✓ Secondary indexes test passed!")
+    except AssertionError as e:
+        custom_print(f"✗ Secondary indexes test FAILED: {e}")
+        failures += 1
+
+    # Test 10: Byte Budget
+    total += 1
+    try:
+        test_byte_budget()
+        custom_print("✓ Byte budget test passed!")
+    except AssertionError as e:
+        custom_print(f"✗ Byte budget test FAILED: {e}")
+        failures += 1
+
+    # Test 11: Paged Retrieval
+    total += 1
+    try:
+        test_paged_retrieval()
+        custom_print("✓ Paged retrieval test passed!")
+    except AssertionError as e:
+        custom_print(f"✗ Paged retrieval test FAILED: {e}")
+        failures += 1
+
+    # Test 12: Segmented Storage
+    total += 1
+    try:
+        test_segmented_storage()
+        custom_print("✓ Segmented storage test passed!")
+    except AssertionError as e:
+        custom_print(f"✗ Segmented storage test FAILED: {e}")
+        failures += 1
+
+    # Test 13: Message Templates
+    total += 1
+    try:
+        test_message_templates()
+        custom_print("✓ Message templates test passed!")
+    except AssertionError as e:
+        custom_print(f"✗ Message templates test FAILED: {e}")
+        failures += 1
+
+    # Test 14: Rate Limiting and Sampling
+    total += 1
+    try:
+        test_rate_limiting_and_sampling()
+        custom_print("✓ Rate limiting and sampling test passed!")
+    except AssertionError as e:
+        custom_print(f"✗ Rate limiting and sampling test FAILED: {e}")
+        failures += 1
+
+    # Test 15: Buffered Output
+    total += 1
+    try:
+        test_buffered_output()
+        custom_print("✓ Buffered output test passed!")
+    except AssertionError as e:
+        custom_print(f"✗ Buffered output test FAILED: {e}")
+        failures += 1
+
+    # Test 16: Disabled Level Fast Path
+    total += 1
+    try:
+        test_disabled_level_fast_path()
+        custom_print("✓ Disabled level fast path test passed!")
+    except AssertionError as e:
+        custom_print(f"✗ Disabled level fast path test FAILED: {e}")
+        failures += 1
+
+    # Test 17: Hierarchical Loggers
+    total += 1
+    try:
+        test_hierarchical_loggers()
+        custom_print("✓ Hierarchical loggers test passed!")
+    except AssertionError as e:
+        custom_print(f"✗ Hierarchical loggers test FAILED: {e}")
+        failures += 1
+
+    # Test 18: Structured Fields
+    total += 1
+    try:
+        test_structured_fields()
+        custom_print("✓ Structured fields test passed!")
+    except AssertionError as e:
+        custom_print(f"✗ Structured fields test FAILED: {e}")
+        failures += 1
+
+    # Test 19: Message Search
+    total += 1
+    try:
+        test_message_search()
+        custom_print("✓ Message search test passed!")
+    except AssertionError as e:
+        custom_print(f"✗ Message search test FAILED: {e}")
+        failures += 1
+
+    # Test 20: Log Statistics
+    total += 1
+    try:
+        test_log_stats()
+        custom_print("✓ Log statistics test passed!")
+    except AssertionError as e:
+        custom_print(f"✗ Log statistics test FAILED: {e}")
+        failures += 1
+
+    # Test 21: Time Range Queries
+    total += 1
+    try:
+        test_time_range_queries()
+        custom_print("✓ Time range queries test passed!")
+    except AssertionError as e:
+        custom_print(f"✗ Time range queries test FAILED: {e}")
+        failures += 1
+
+    # Test 22: Binary Log Export
+    total += 1
+    try:
+        test_binary_log_export()
+        custom_print("✓ Binary log export test passed!")
+    except AssertionError as e:
+        custom_print(f"✗ Binary log export test FAILED: {e}")
+        failures += 1
+
+    # Test 23: Log Head
+    total += 1
+    try:
+        test_log_head()
+        custom_print("✓ Log head test passed!")
+    except AssertionError as e:
+        custom_print(f"✗ Log head test FAILED: {e}")
+        failures += 1
+
     custom_print("\n=== Memory Logging Tests Complete ===")
     custom_print(f"Ran {total} tests with {failures} failures")
 
@@ -421,6 +605,1068 @@ def test_log_entry_ids():
         ], f"Found non-ERROR/CRITICAL level in filtered logs: {log['level']}"
 
 
+def test_lazy_message_args():
+    """Test %-style arguments and callable messages"""
+    custom_print("Testing deferred message arguments...")
+
+    clear_logs()
+
+    lazy_logger = get_logger("lazy_test")
+    lazy_logger.set_level(Level.INFO)
+
+    calls = []
+
+    def expensive():
+        calls.append(1)
+        return "[LAZY-TEST] Callable message"
+
+    # Disabled level: neither the callable nor the arguments are rendered
+    lazy_logger.debug(expensive)
+    lazy_logger.debug("[LAZY-TEST] Debug %s", "hidden")
+    assert not calls, "Callable message was rendered for a disabled level"
+
+    # Enabled level: arguments are interpolated
+    lazy_logger.info("[LAZY-TEST] x=%s y=%r", 1, "two")
+    lazy_logger.info(expensive)
+    lazy_logger.info("[LAZY-TEST] %(key)s", {"key": "mapping"})
+    lazy_logger.info("[LAZY-TEST] Bad format %d", "not a number")
+    assert len(calls) == 1, "Callable message should be rendered exactly once"
+
+    messages = [log["message"] for log in get_logs(logger_name="lazy_test")]
+    custom_print(f"Retrieved {len(messages)} lazy_test logs")
+
+    assert "[LAZY-TEST] x=1 y='two'" in messages, f"Unexpected messages: {messages}"
+    assert "[LAZY-TEST] Callable message" in messages
+    assert "[LAZY-TEST] mapping" in messages
+    assert "[LAZY-TEST] Bad format %d ('not a number',)" in messages
+    assert not any("hidden" in m for m in messages), "Disabled debug was stored"
+
+    # Nothing is rendered or stored while logging is disabled
+    disable_logging()
+    lazy_logger.error(expensive)
+    enable_logging()
+    assert len(calls) == 1, "Callable message was rendered while logging disabled"
+
+
+def test_columnar_storage():
+    """Test the array-backed columnar storage engine"""
+    custom_print("Testing columnar storage...")
+
+    clear_logs()
+    logger.info("[COLUMNAR-TEST] Kept across the switch")
+
+    set_log_storage("columnar")
+    try:
+        assert get_log_storage() == "columnar", "Storage mode was not switched"
+
+        logs = get_logs()
+        assert len(logs) == 1, f"Expected 1 migrated log, found {len(logs)}"
+        assert logs[0]["message"] == "[COLUMNAR-TEST] Kept across the switch"
+
+        col_logger = get_logger("columnar_test")
+        col_logger.set_level(Level.DEBUG)
+        col_logger.debug("[COLUMNAR-TEST] Debug")
+        col_logger.error("[COLUMNAR-TEST] Error")
+
+        logs = get_logs(logger_name="columnar_test")
+        assert [log["level"] for log in logs] == ["DEBUG", "ERROR"], logs
+        assert logs[0]["id"] < logs[1]["id"], "IDs are not increasing"
+        assert isinstance(logs[0]["timestamp"], type(logs[1]["timestamp"]))
+
+        # The ring buffer overwrites the oldest entries when full
+        set_max_log_entries(3)
+        for i in range(5):
+            col_logger.info(f"[COLUMNAR-TEST] Ring {i}")
+        messages = [log["message"] for log in get_logs()]
+        assert messages == [
+            "[COLUMNAR-TEST] Ring 2",
+            "[COLUMNAR-TEST] Ring 3",
+            "[COLUMNAR-TEST] Ring 4",
+        ], f"Unexpected ring contents: {messages}"
+
+        clear_logs()
+        assert get_logs() == [], "Logs were not cleared"
+    finally:
+        set_log_storage("entries")
+        set_max_log_entries(1000)
+
+
+def test_cursor_lookup():
+    """Test from_entry/max_entries retrieval on both storage engines"""
+    custom_print("Testing cursor lookup...")
+
+    cursor_logger = get_logger("cursor_test")
+    cursor_logger.set_level(Level.DEBUG)
+
+    for mode in ("entries", "columnar", "segmented"):
+        set_log_storage(mode, segment_size=4)
+        set_max_log_entries(10)
+        clear_logs()
+        try:
+            for i in range(15):
+                if i % 2:
+                    cursor_logger.error(f"[CURSOR-TEST] {i}")
+                else:
+                    cursor_logger.debug(f"[CURSOR-TEST] {i}")
+
+            all_logs = get_logs()
+            ids = [log["id"] for log in all_logs]
+            assert len(ids) == 10, f"{mode}: expected 10 logs, found {len(ids)}"
+
+            # Cursor inside the buffer
+            tail = get_logs(from_entry=ids[7])
+            assert [log["id"] for log in tail] == ids[7:], f"{mode}: {tail}"
+
+            # Cursor older than the oldest retained entry returns everything
+            assert len(get_logs(from_entry=ids[0] - 5)) == 10, mode
+
+            # Cursor past the newest entry returns nothing
+            assert get_logs(from_entry=ids[-1] + 1) == [], mode
+
+            # max_entries keeps the most recent matches
+            recent_errors = get_logs(
+                from_entry=ids[2], max_entries=2, min_level=Level.ERROR
+            )
+            assert [log["message"] for log in recent_errors] == [
+                "[CURSOR-TEST] 11",
+                "[CURSOR-TEST] 13",
+            ], f"{mode}: {recent_errors}"
+        finally:
+            set_log_storage("entries")
+            set_max_log_entries(1000)
+
+
+def test_secondary_indexes():
+    """Test that filtered queries match a full scan across evictions"""
+    custom_print("Testing secondary indexes...")
+
+    names = ["index_a", "index_b", "index_c"]
+    levels = [Level.DEBUG, Level.INFO, Level.WARNING, Level.ERROR, Level.CRITICAL]
+    for name in names:
+        get_logger(name).set_level(Level.DEBUG)
+
+    def check(label):
+        everything = get_logs()
+        for name in names + ["index_missing"]:
+            for min_level in [None] + levels:
+                for from_entry in (None, everything[len(everything) // 2]["id"]):
+                    for max_entries in (None, 3):
+                        expected = [
+                            log
+                            for log in everything
+                            if log["logger_name"] == name
+                            and (min_level is None or Level[log["level"]] >= min_level)
+                            and (from_entry is None or log["id"] >= from_entry)
+                        ]
+                        if max_entries is not None:
+                            expected = expected[-max_entries:]
+                        actual = get_logs(
+                            from_entry=from_entry,
+                            max_entries=max_entries,
+                            min_level=min_level,
+                            logger_name=name,
+                        )
+                        assert actual == expected, f"{label}: {name} {min_level}"
+            errors = get_logs(min_level=Level.ERROR)
+            assert errors == [
+                log for log in everything if log["level"] in ("ERROR", "CRITICAL")
+            ], f"{label}: level-only query mismatch"
+
+    try:
+        set_max_log_entries(20)
+        clear_logs()
+        for i in range(50):
+            get_logger(names[i % 3]).log(levels[(i * 7) % 5], f"[INDEX-TEST] {i}")
+        check("after eviction")
+
+        set_max_log_entries(8)
+        check("after shrinking")
+
+        clear_logs()
+        assert get_logs(logger_name="index_a") == [], "Index survived clear_logs"
+        for i in range(5):
+            get_logger(names[i % 3]).error(f"[INDEX-TEST] again {i}")
+        check("after clear")
+    finally:
+        set_max_log_entries(1000)
+
+
+def test_byte_budget():
+    """Test byte-budgeted retention alongside the entry count limit"""
+    custom_print("Testing byte budget...")
+
+    from kybra_simple_logging import _handler
+
+    byte_logger = get_logger("bytes")  # 5 bytes of logger name per entry
+
+    for mode in ("entries", "columnar", "segmented"):
+        set_log_storage(mode, segment_size=4)
+        clear_logs()
+        try:
+            assert get_log_bytes() == 0, f"{mode}: usage not reset by clear_logs"
+
+            for i in range(10):
+                byte_logger.info("x" * 95)  # 100 bytes per entry
+            assert get_log_bytes() == 1000, f"{mode}: got {get_log_bytes()} bytes"
+
+            # Shrinking the budget evicts the oldest entries immediately
+            set_max_log_bytes(350)
+            logs = get_logs()
+            assert len(logs) == 3, f"{mode}: expected 3 logs, found {len(logs)}"
+            assert get_log_bytes() == 300, f"{mode}: got {get_log_bytes()} bytes"
+
+            # One large message pushes out several small ones
+            byte_logger.warning("y" * 245)
+            logs = get_logs()
+            assert [log["level"] for log in logs] == ["INFO", "WARNING"], logs
+            assert get_log_bytes() == 350, f"{mode}: got {get_log_bytes()} bytes"
+
+            # Indexes and stored sizes stay consistent with the evictions
+            assert len(get_logs(logger_name="bytes", min_level=Level.INFO)) == 2
+            sizes = list(_handler._LOG_ENTRY_SIZES)
+            assert sizes == [100, 250], f"{mode}: stored sizes {sizes}"
+
+            # The newest entry is kept even if it exceeds the budget alone
+            byte_logger.error("z" * 1000)
+            logs = get_logs()
+            assert len(logs) == 1 and logs[0]["level"] == "ERROR", logs
+
+            # Sizes are UTF-8 bytes, not characters
+            clear_logs()
+            byte_logger.info("日本語")
+            assert get_log_bytes() == 14, f"{mode}: got {get_log_bytes()} bytes"
+
+            # The entry count limit still applies
+            set_max_log_bytes(None)
+            set_max_log_entries(2)
+            for i in range(5):
+                byte_logger.info("x" * 95)
+            assert len(get_logs()) == 2, f"{mode}: entry limit not applied"
+            assert get_log_bytes() == 200, f"{mode}: got {get_log_bytes()} bytes"
+        finally:
+            set_max_log_bytes(None)
+            set_log_storage("entries")
+            set_max_log_entries(1000)
+
+
+def test_paged_retrieval():
+    """Test that get_logs_page splits results within a byte budget"""
+    custom_print("Testing paged retrieval...")
+
+    clear_logs()
+    page_logger = get_logger("page_test")
+    for i in range(20):
+        page_logger.info(f"[PAGE-TEST] {i:02d} " + "x" * 100)
+
+    expected = get_logs(logger_name="page_test")
+
+    # Follow the cursor until the last page
+    collected = []
+    pages = 0
+    from_entry = None
+    while True:
+        page = get_logs_page(
+            from_entry=from_entry, logger_name="page_test", max_bytes=700
+        )
+        pages += 1
+        assert page["entries"], "A page must contain at least one entry"
+        collected.extend(page["entries"])
+        if not page["has_more"]:
+            break
+        from_entry = page["next_from_entry"]
+        assert from_entry == page["entries"][-1]["id"] + 1, "Unexpected cursor"
+
+    custom_print(f"Retrieved {len(collected)} logs in {pages} pages")
+    assert pages > 1, "Expected several pages with a small budget"
+    assert collected == expected, "Pages do not add up to the full result"
+
+    # Nothing new: an empty page whose cursor points past the newest entry
+    page = get_logs_page(from_entry=page["next_from_entry"])
+    assert page["entries"] == [] and not page["has_more"], page
+    assert page["next_from_entry"] == expected[-1]["id"] + 1, page
+
+    # max_entries selects the most recent entries, then pages through them
+    page = get_logs_page(max_entries=5, logger_name="page_test", max_bytes=300)
+    assert page["has_more"], "Expected the tail to be split"
+    assert page["entries"][0] == expected[-5], "Tail page should start at -5"
+    rest = get_logs_page(from_entry=page["next_from_entry"], logger_name="page_test")
+    assert page["entries"] + rest["entries"] == expected[-5:], "Tail pages mismatch"
+
+    # A single oversized entry is still returned
+    page = get_logs_page(max_entries=1, max_bytes=10)
+    assert len(page["entries"]) == 1 and not page["has_more"], page
+
+    # The budget counts encoded bytes: 3 bytes per character here
+    clear_logs()
+    for i in range(20):
+        page_logger.info("日本語" * 100)
+    page = get_logs_page(logger_name="page_test", max_bytes=5000)
+    encoded = sum(len(log["message"].encode("utf-8")) for log in page["entries"])
+    assert encoded <= 5000, f"Page holds {encoded} bytes"
+    assert len(page["entries"]) == 5 and page["has_more"], len(page["entries"])
+
+
+def test_segmented_storage():
+    """Test the storage engine that compresses older segments"""
+    custom_print("Testing segmented storage...")
+
+    seg_logger = get_logger("segmented_test")
+    seg_logger.set_level(Level.DEBUG)
+    levels = [Level.DEBUG, Level.INFO, Level.WARNING, Level.ERROR]
+
+    # Reference results from the default storage
+    set_max_log_entries(50)
+    clear_logs()
+    for i in range(73):
+        seg_logger.log(levels[i % 4], "[SEGMENTED-TEST] heartbeat %d", i)
+    expected = get_logs()
+
+    set_log_storage("segmented", segment_size=8)
+    try:
+        assert get_log_storage() == "segmented", "Storage mode was not switched"
+        assert get_logs() == expected, "Logs changed when switching storage"
+
+        from kybra_simple_logging import _handler
+
+        storage = _handler._LOG_STORAGE
+        assert len(storage._blocks) == 6, f"Expected 6 blocks, got {storage._blocks}"
+        assert len(storage._hot) == 2, "Expected a 2-entry hot tail"
+
+        middle = expected[25]["id"]
+        assert get_logs(from_entry=middle) == expected[25:], "from_entry mismatch"
+        assert get_logs(max_entries=3) == expected[-3:], "tail mismatch"
+        assert get_logs(min_level=Level.ERROR, logger_name="segmented_test") == [
+            log for log in expected if log["level"] == "ERROR"
+        ], "filtered query mismatch"
+        page = get_logs_page(from_entry=middle, max_bytes=400)
+        assert page["has_more"], "Expected a partial page"
+        assert page["entries"] == expected[25:][: len(page["entries"])]
+
+        # Eviction crosses block boundaries and frees fully evicted blocks
+        for i in range(73, 100):
+            seg_logger.info("[SEGMENTED-TEST] heartbeat %d", i)
+        logs = get_logs()
+        assert len(logs) == 50, f"Expected 50 logs, found {len(logs)}"
+        assert logs[0]["message"] == "[SEGMENTED-TEST] heartbeat 50", logs[0]
+        assert logs[-1]["message"] == "[SEGMENTED-TEST] heartbeat 99", logs[-1]
+        assert [log["id"] for log in logs] == list(
+            range(logs[0]["id"], logs[0]["id"] + 50)
+        ), "IDs are not contiguous"
+        assert len(_handler._LOG_STORAGE._blocks) <= 7, "Evicted blocks not freed"
+
+        clear_logs()
+        assert get_logs() == [], "Logs were not cleared"
+    finally:
+        set_log_storage("entries")
+        set_max_log_entries(1000)
+
+
+def test_message_templates():
+    """Test that templated messages are stored once and rendered on read"""
+    custom_print("Testing message templates...")
+
+    from kybra_simple_logging import _handler
+
+    template_logger = get_logger("template_test")
+
+    for mode in ("entries", "columnar", "segmented"):
+        set_log_storage(mode, segment_size=4)
+        clear_logs()
+        try:
+            for i in range(10):
+                template_logger.info("[TEMPLATE-TEST] heartbeat %d of %s", i, "ten")
+                template_logger.info(f"[TEMPLATE-TEST] {'rendered'}")
+
+            # Mutable arguments are rendered immediately
+            state = {"count": 1}
+            template_logger.info("[TEMPLATE-TEST] state=%s", state)
+            state["count"] = 2
+
+            messages = [log["message"] for log in get_logs()]
+            assert messages[0] == "[TEMPLATE-TEST] heartbeat 0 of ten", messages
+            # LogEntry.message stays the rendered text
+            entry = _handler._LOG_STORAGE[0]
+            assert entry.message == messages[0], entry
+            assert entry.template == "[TEMPLATE-TEST] heartbeat %d of %s", entry
+            assert messages[18] == "[TEMPLATE-TEST] heartbeat 9 of ten", messages
+            assert messages[1] == "[TEMPLATE-TEST] rendered", messages
+            assert messages[-1] == "[TEMPLATE-TEST] state={'count': 1}", messages
+
+            stats = get_log_memory_stats()
+            custom_print(f"{mode} memory stats: {stats}")
+            assert stats["entries"] == 21, stats
+            assert stats["templated_entries"] == 10, stats
+            assert stats["unique_messages"] == 3, stats
+            assert stats["saved_bytes"] > 0, stats
+            assert stats["rendered_bytes"] == sum(len(m) for m in messages), stats
+        finally:
+            set_log_storage("entries")
+
+    # Only templates are interned, and clearing the logs empties the table
+    clear_logs()
+    assert not _handler._MESSAGE_TEMPLATES, "clear_logs should empty the table"
+    for i in range(5000):
+        template_logger.info(f"[TEMPLATE-TEST] processed block {i}")
+    template_logger.info("[TEMPLATE-TEST] block %d", 1)
+    assert "[TEMPLATE-TEST] block %d" in _handler._MESSAGE_TEMPLATES
+    assert len(_handler._MESSAGE_TEMPLATES) < 10, "Rendered messages were interned"
+    clear_logs()
+
+
+def test_rate_limiting_and_sampling():
+    """Test per-logger token bucket limits and sampling"""
+    custom_print("Testing rate limiting and sampling...")
+
+    clear_logs()
+
+    # 1-in-N sampling, with a summary of the dropped messages
+    sampled = get_logger("sampled_test")
+    sampled.set_sampling(every=3)
+    for i in range(9):
+        sampled.info("[SAMPLE-TEST] %d", i)
+    messages = [log["message"] for log in get_logs(logger_name="sampled_test")]
+    assert messages == [
+        "[SAMPLE-TEST] 0",
+        "2 INFO messages suppressed by rate limiting or sampling",
+        "[SAMPLE-TEST] 3",
+        "[SAMPLE-TEST] 6",
+    ], f"Unexpected sampled messages: {messages}"
+    sampled.set_sampling(None)
+    sampled.info("[SAMPLE-TEST] unsampled")
+    assert get_logs(max_entries=1)[0]["message"] == "[SAMPLE-TEST] unsampled"
+
+    # Probabilistic sampling at the extremes
+    sampled.set_sampling(probability=0.0)
+    sampled.info("[SAMPLE-TEST] never")
+    sampled.set_sampling(probability=1.0)
+    sampled.info("[SAMPLE-TEST] always")
+    sampled.set_sampling(None)
+    messages = [log["message"] for log in get_logs(logger_name="sampled_test")]
+    assert "[SAMPLE-TEST] never" not in messages, messages
+    assert "[SAMPLE-TEST] always" in messages, messages
+
+    # A flood that lets nothing through is still reported periodically,
+    # and the rest when the sampling is removed
+    from kybra_simple_logging import _handler
+
+    original_now = _handler._now
+    clock = iter(range(10**6, 10**7))
+    _handler._now = lambda: float(next(clock))
+    try:
+        clear_logs()
+        sampled.set_sampling(probability=0.0)
+        for i in range(25):
+            sampled.info("[SAMPLE-TEST] dropped %d", i)
+        sampled.set_sampling(None)
+    finally:
+        _handler._now = original_now
+    messages = [log["message"] for log in get_logs(logger_name="sampled_test")]
+    summaries = [int(message.split()[0]) for message in messages]
+    assert len(summaries) > 1 and sum(summaries) == 25, messages
+
+    # Token bucket limited to a burst of 2 on a single level
+    limited = get_logger("limited_test")
+    limited.set_level(Level.DEBUG)
+    limited.set_rate_limit(0.001, burst=2, level=Level.DEBUG)
+
+    rendered = []
+
+    def message():
+        rendered.append(1)
+        return "[RATE-TEST] debug"
+
+    for i in range(10):
+        limited.debug(message)
+        limited.info("[RATE-TEST] info %d", i)
+    logs = get_logs(logger_name="limited_test")
+    assert sum(log["level"] == "DEBUG" for log in logs) == 2, logs
+    assert sum(log["level"] == "INFO" for log in logs) == 10, logs
+    assert len(rendered) == 2, "Dropped messages should not be rendered"
+
+    limited.set_rate_limit(None)
+    limited.debug("[RATE-TEST] unlimited")
+    assert get_logs(max_entries=1)[0]["message"] == "[RATE-TEST] unlimited"
+
+
+def test_buffered_output():
+    """Test that buffered lines are printed together on flush"""
+    custom_print("Testing buffered output...")
+
+    from kybra_simple_logging import _handler
+
+    written = []
+    original_write = _handler._write_output
+    _handler._write_output = written.append
+    try:
+        clear_logs()
+        buffered = get_logger("buffered_test")
+        set_output_buffering(True)
+
+        for i in range(3):
+            buffered.info("[BUFFER-TEST] line %d", i)
+        assert written == [], f"Lines should be held until flush: {written}"
+        logs = get_logs(logger_name="buffered_test")
+        assert len(logs) == 3, "Buffered lines should still be stored"
+        assert (
+            len({log["timestamp"] for log in logs}) == 1
+        ), "Entries of one execution should share a timestamp"
+
+        flush_logs()
+        assert written == [
+            "\n".join(
+                f"[{Level.INFO}] [buffered_test] [BUFFER-TEST] line {i}"
+                for i in range(3)
+            )
+        ], f"Expected a single combined write: {written}"
+        flush_logs()
+        assert len(written) == 1, "Flushing an empty buffer should not write"
+
+        @flush_logs_after
+        def update():
+            buffered.info("[BUFFER-TEST] in update")
+            return "done"
+
+        assert update() == "done"
+        assert written[-1] == f"[{Level.INFO}] [buffered_test] [BUFFER-TEST] in update"
+
+        # The size threshold flushes early
+        set_output_buffering(True, max_bytes=100)
+        for i in range(10):
+            buffered.info("[BUFFER-TEST] threshold %d", i)
+        assert len(written) > 2, "Reaching max_bytes should flush"
+
+        # Each early flush starts a new timestamp
+        original_clock = _handler._read_clock
+        clock = iter(range(1000, 10**6, 3600))
+        _handler._read_clock = lambda: float(next(clock))
+        try:
+            clear_logs()
+            set_output_buffering(True, max_bytes=10)
+            for i in range(5):
+                buffered.info("[BUFFER-TEST] clock %d", i)
+            logs = get_logs(logger_name="buffered_test")
+            timestamps = [log["timestamp"] for log in logs]
+            assert timestamps == sorted(set(timestamps)), timestamps
+            assert get_logs(from_time=timestamps[-1]) == logs[-1:], timestamps
+        finally:
+            _handler._read_clock = original_clock
+
+        # Disabling buffering flushes what is pending
+        set_output_buffering(True, max_bytes=100)
+        buffered.info("[BUFFER-TEST] pending")
+        set_output_buffering(False)
+        assert "pending" in written[-1], written[-1]
+        buffered.info("[BUFFER-TEST] direct")
+        assert written[-1] == f"[{Level.INFO}] [buffered_test] [BUFFER-TEST] direct"
+    finally:
+        set_output_buffering(False, max_bytes=16 * 1024)
+        _handler._write_output = original_write
+
+
+def test_disabled_level_fast_path():
+    """Test that disabled levels are bound to no-ops and rebound on change"""
+    custom_print("Testing disabled level fast path...")
+
+    clear_logs()
+    fast = get_logger("fast_path_test")
+    fast.set_level(Level.WARNING)
+
+    rendered = []
+
+    def message():
+        rendered.append(1)
+        return "[FAST-TEST] rendered"
+
+    assert "debug" in vars(fast) and "info" in vars(fast), "Expected no-op bindings"
+    assert "warning" not in vars(fast), "Enabled levels should use the class method"
+    fast.debug(message)
+    fast.info(message)
+    assert rendered == [], "Disabled levels should not render messages"
+
+    fast.set_level(Level.DEBUG)
+    fast.debug(message)
+    assert rendered == [1], "set_level should re-enable the debug method"
+
+    set_log_level(Level.ERROR)
+    fast.warn(message)
+    assert rendered == [1], "set_log_level should disable the warning methods"
+
+    disable_logging()
+    try:
+        assert "critical" in vars(fast), "disable_logging should bind no-ops"
+        fast.critical(message)
+        assert rendered == [1], "Nothing should render while logging is disabled"
+    finally:
+        enable_logging()
+    fast.critical(message)
+    assert rendered == [1, 1], "enable_logging should restore the methods"
+
+    messages = [log["message"] for log in get_logs(logger_name="fast_path_test")]
+    assert messages == ["[FAST-TEST] rendered"] * 2, messages
+    set_log_level(Level.INFO)
+
+    # Loggers constructed directly are rebound too
+    disable_logging()
+    try:
+        direct = SimpleLogger("fast_path_direct")
+    finally:
+        enable_logging()
+    direct.info("[FAST-TEST] direct")
+    assert get_logs(max_entries=1)[0]["message"] == "[FAST-TEST] direct"
+
+    # Assigning the level rebinds the methods like set_level()
+    direct.level = Level.DEBUG
+    assert direct.level == Level.DEBUG and "debug" not in vars(direct)
+    direct.debug("[FAST-TEST] direct debug")
+    assert get_logs(max_entries=1)[0]["message"] == "[FAST-TEST] direct debug"
+
+
+def test_hierarchical_loggers():
+    """Test that dotted logger names inherit levels from their ancestors"""
+    custom_print("Testing hierarchical loggers...")
+
+    transfers = get_logger("dao.treasury.transfers")
+    votes = get_logger("dao.votes")
+    other = get_logger("daoist")
+    try:
+        assert transfers.get_effective_level() == Level.INFO
+
+        # Configuring an ancestor applies to all its descendants, even
+        # before the ancestor logger itself was created
+        set_log_level(Level.ERROR, "dao")
+        assert transfers.get_effective_level() == Level.ERROR
+        assert votes.get_effective_level() == Level.ERROR
+        assert other.get_effective_level() == Level.INFO, "Not a descendant"
+
+        # The closest explicit level wins
+        get_logger("dao.treasury").set_level(Level.DEBUG)
+        assert transfers.get_effective_level() == Level.DEBUG
+        assert votes.get_effective_level() == Level.ERROR
+        transfers.set_level(Level.WARNING)
+        set_log_level(Level.CRITICAL, "dao.treasury")
+        assert transfers.get_effective_level() == Level.WARNING
+
+        # Clearing a level inherits again
+        transfers.set_level(None)
+        assert transfers.get_effective_level() == Level.CRITICAL
+
+        # Loggers created later inherit the cached configuration too
+        late = get_logger("dao.treasury.late")
+        assert late.get_effective_level() == Level.CRITICAL
+        clear_logs()
+        late.error("[HIERARCHY-TEST] filtered")
+        late.critical("[HIERARCHY-TEST] visible")
+        messages = [log["message"] for log in get_logs(logger_name=late.name)]
+        assert messages == ["[HIERARCHY-TEST] visible"], messages
+
+        # A global level resets every logger to inherit it
+        set_log_level(Level.WARNING)
+        for child in (transfers, votes, late, other):
+            assert child.get_effective_level() == Level.WARNING, child.name
+    finally:
+        set_log_level(Level.INFO)
+
+
+def test_structured_fields():
+    """Test storing, returning and filtering by structured fields"""
+    custom_print("Testing structured fields...")
+
+    fields_logger = get_logger("fields_test")
+    try:
+        for mode in ("entries", "columnar", "segmented"):
+            set_log_storage(mode, segment_size=4)
+            set_max_log_entries(20)
+            for indexed in (False, True):
+                clear_logs()
+                if indexed:
+                    add_log_field_index("user")
+                for i in range(30):
+                    fields_logger.info(
+                        "transfer %d", i, user=f"user-{i % 3}", amount=i, ok=True
+                    )
+                fields_logger.info("no fields")
+
+                logs = get_logs(fields={"user": "user-1"})
+                ids = [log["fields"]["amount"] for log in logs]
+                # Only the 20 newest entries are kept (the last one has no fields)
+                expected = [i for i in range(11, 30) if i % 3 == 1]
+                assert ids == expected, f"{mode}/{indexed}: {ids} != {expected}"
+                assert logs[0]["fields"] == {
+                    "user": "user-1",
+                    "amount": expected[0],
+                    "ok": True,
+                }, f"{mode}: unexpected fields {logs[0]['fields']}"
+
+                # Values are compared as text, several fields must all match
+                logs = get_logs(fields={"user": "user-2", "amount": "14"})
+                assert [log["message"] for log in logs] == ["transfer 14"], logs
+                assert get_logs(fields={"user": "nobody"}) == []
+                assert get_logs(fields={"missing": "x"}) == []
+                assert get_logs(max_entries=1)[0]["fields"] == {}
+
+                # Combined with the other filters and paging
+                page = get_logs_page(
+                    max_entries=2, logger_name="fields_test", fields={"user": "user-0"}
+                )
+                assert [log["fields"]["amount"] for log in page["entries"]] == [
+                    24,
+                    27,
+                ], page
+                remove_log_field_index("user")
+
+        # Adding a second index leaves the first one intact through evictions
+        set_max_log_entries(10)
+        clear_logs()
+        for i in range(5):
+            fields_logger.info("indexed %d", i, user=f"user-{i % 2}", amount=i)
+        add_log_field_index("user")
+        add_log_field_index("amount")
+        for i in range(5, 25):
+            fields_logger.info("indexed %d", i, user=f"user-{i % 2}", amount=i)
+        logs = get_logs(fields={"user": "user-1"})
+        assert [log["fields"]["amount"] for log in logs] == [15, 17, 19, 21, 23]
+        logs = get_logs(fields={"amount": "20"})
+        assert [log["message"] for log in logs] == ["indexed 20"], logs
+        assert get_logs(fields={"amount": "3"}) == []
+        remove_log_field_index("amount")
+        set_max_log_entries(1000)
+
+        # message and level can still be passed by keyword
+        clear_logs()
+        fields_logger.info(message="by keyword", user="user-1")
+        fields_logger.log(level=Level.WARNING, message="log by keyword")
+        fields_logger.info("positional", message="a field")
+        logs = get_logs()
+        assert [log["message"] for log in logs] == [
+            "by keyword",
+            "log by keyword",
+            "positional",
+        ], logs
+        assert logs[0]["fields"] == {"user": "user-1"} and logs[1]["fields"] == {}
+        assert logs[1]["level"] == "WARNING" and logs[2]["fields"] == {
+            "message": "a field"
+        }, logs
+        try:
+            fields_logger.info(user="user-1")
+            raise AssertionError("A message should be required")
+        except TypeError:
+            pass
+    finally:
+        remove_log_field_index("user")
+        set_log_storage("entries")
+        set_max_log_entries(1000)
+
+
+def test_message_search():
+    """Test get_logs(contains=...) with and without the word index"""
+    custom_print("Testing message search...")
+
+    from kybra_simple_logging import _handler
+
+    search_logger = get_logger("search_test")
+    try:
+        for mode in ("entries", "columnar", "segmented"):
+            set_log_storage(mode, segment_size=4)
+            set_max_log_entries(20)
+            for indexed in (False, True):
+                clear_logs()
+                if indexed:
+                    enable_log_search_index()
+                search_logger.info("Evicted unique-word entry")
+                for i in range(24):
+                    search_logger.info("Transfer %d of account-%d done", i, i % 4)
+                search_logger.error("Disk FULL error while writing")
+                search_logger.error("Several errors happened")
+
+                messages = [log["message"] for log in get_logs(contains="error")]
+                assert messages == ["Disk FULL error while writing"], messages
+                messages = [log["message"] for log in get_logs(contains="disk full")]
+                assert messages == ["Disk FULL error while writing"], messages
+                assert get_logs(contains="full disk") == []
+                assert get_logs(contains="nothing like this") == []
+
+                ids = [log["message"] for log in get_logs(contains="account-1")]
+                expected = [f"Transfer {i} of account-1 done" for i in (9, 13, 17, 21)]
+                assert ids == expected, f"{mode}/{indexed}: {ids}"
+                page = get_logs_page(
+                    max_entries=1, contains="account-1", min_level=Level.INFO
+                )
+                assert [log["message"] for log in page["entries"]] == expected[-1:]
+
+                if indexed:
+                    assert "unique" not in _handler._TOKEN_INDEX, "Eviction prune"
+                    assert "disk" in _handler._TOKEN_INDEX
+                    disable_log_search_index()
+    finally:
+        disable_log_search_index()
+        set_log_storage("entries")
+        set_max_log_entries(1000)
+
+
+def test_log_stats():
+    """Test the rolling counters kept as entries are stored"""
+    custom_print("Testing log statistics...")
+
+    from kybra_simple_logging import _handler
+    from kybra_simple_logging.cli import format_stats
+
+    clock = [1_700_000_000.0]
+    original_clock = _handler._read_clock
+    _handler._read_clock = lambda: clock[0]
+    try:
+        reset_log_stats(bucket_seconds=60, max_buckets=3)
+        set_max_log_entries(5)
+        stats_logger = get_logger("stats_test")
+        other_logger = get_logger("stats_other")
+        # 4 minutes of logs, 3 entries per minute
+        for minute in range(4):
+            clock[0] = 1_700_000_000.0 + minute * 60
+            stats_logger.info("tick %d", minute)
+            stats_logger.error("failure")
+            other_logger.warning("slow")
+
+        stats = get_log_stats()
+        assert stats["total_entries"] == 12, "Evicted entries should stay counted"
+        # Templates, 8 bytes per int argument and the logger names
+        expected_bytes = 4 * (
+            len("tick %d") + 8 + len("failure") + len("slow") + 2 * len("stats_test")
+        ) + 4 * len("stats_other")
+        assert stats["total_bytes"] == expected_bytes, stats["total_bytes"]
+        assert stats["levels"] == {
+            "DEBUG": 0,
+            "INFO": 4,
+            "WARNING": 4,
+            "ERROR": 4,
+            "CRITICAL": 0,
+        }, stats["levels"]
+        assert stats["loggers"] == {"stats_test": 8, "stats_other": 4}
+
+        # Only the 3 most recent buckets are kept
+        starts = [bucket["start"] for bucket in stats["buckets"]]
+        first = 1_700_000_000 - 1_700_000_000 % 60
+        assert starts == [first + 60, first + 120, first + 180], starts
+        assert stats["buckets"][-1]["counts"] == {
+            "INFO": 1,
+            "ERROR": 1,
+            "WARNING": 1,
+        }, stats["buckets"][-1]
+
+        recent = get_log_stats(since=first + 150)
+        assert [b["start"] for b in recent["buckets"]] == [first + 120, first + 180]
+
+        lines = format_stats(stats, level="ERROR")
+        assert lines[0] == f"Entries: 12 ({stats['total_bytes']} bytes)", lines
+        assert lines[-1].endswith("  1"), lines
+
+        reset_log_stats()
+        assert get_log_stats()["total_entries"] == 0
+    finally:
+        _handler._read_clock = original_clock
+        reset_log_stats(bucket_seconds=60, max_buckets=1440)
+        set_max_log_entries(1000)
+
+
+def test_time_range_queries():
+    """Test from_time/to_time against a brute force filter"""
+    custom_print("Testing time range queries...")
+
+    from kybra_simple_logging import _handler
+
+    clock = [0.0]
+    original_clock = _handler._read_clock
+    _handler._read_clock = lambda: clock[0]
+    time_logger = get_logger("time_test")
+    try:
+        for mode in ("entries", "columnar", "segmented"):
+            set_log_storage(mode, segment_size=4)
+            set_max_log_entries(30)
+            clear_logs()
+            # Several entries share each timestamp, 40 are logged and the
+            # 10 oldest are evicted
+            for i in range(40):
+                clock[0] = 1_000.0 + i // 3
+                level = Level.ERROR if i % 5 == 0 else Level.INFO
+                time_logger.log(level, "entry %d", i)
+
+            stored = get_logs()
+            for from_time, to_time in [
+                (None, None),
+                (1_005.0, None),
+                (None, 1_005.0),
+                (1_004.0, 1_008.0),
+                (1_004.5, 1_008.5),
+                (1_009.0, 1_009.0),
+                (900.0, 999.0),
+                (2_000.0, None),
+                (1_008.0, 1_004.0),
+            ]:
+                for min_level in (None, Level.ERROR):
+                    expected = [
+                        log["id"]
+                        for log in stored
+                        if (from_time is None or log["timestamp"] >= from_time)
+                        and (to_time is None or log["timestamp"] <= to_time)
+                        and (min_level is None or log["level"] == "ERROR")
+                    ]
+                    logs = get_logs(
+                        from_time=from_time, to_time=to_time, min_level=min_level
+                    )
+                    ids = [log["id"] for log in logs]
+                    window = (mode, from_time, to_time, min_level)
+                    assert ids == expected, f"{window}: {ids} != {expected}"
+                    page = get_logs_page(
+                        from_time=from_time,
+                        to_time=to_time,
+                        min_level=min_level,
+                        max_entries=2,
+                    )
+                    assert [log["id"] for log in page["entries"]] == expected[-2:]
+
+            if mode == "segmented":
+                # Only the blocks spanned by an old window are decompressed
+                decoded = []
+                original_decode = _handler._ColdBlock.decode
+
+                def counting_decode(block):
+                    decoded.append(block.min_id)
+                    return original_decode(block)
+
+                _handler._LOG_STORAGE._cache = []
+                _handler._ColdBlock.decode = counting_decode
+                try:
+                    page = get_logs_page(
+                        from_time=1_004.0, to_time=1_005.0, max_entries=10
+                    )
+                finally:
+                    _handler._ColdBlock.decode = original_decode
+                assert [log["message"] for log in page["entries"]] == [
+                    f"entry {i}" for i in range(12, 18)
+                ], page
+                assert len(decoded) == len(set(decoded)) == 2, decoded
+
+            # Combined with a cursor
+            cursor = stored[15]["id"]
+            logs = get_logs(from_entry=cursor, from_time=1_004.0, to_time=1_010.0)
+            assert logs[0]["id"] == cursor, logs
+            assert logs[-1]["timestamp"] == 1_010.0, logs
+    finally:
+        _handler._read_clock = original_clock
+        set_log_storage("entries")
+        set_max_log_entries(1000)
+
+
+def test_binary_log_export():
+    """Test that binary batches decode to the entries returned by get_logs"""
+    custom_print("Testing binary log export...")
+
+    from kybra_simple_logging import _handler
+
+    clock = [1_700_000_000.25]
+    original_clock = _handler._read_clock
+    _handler._read_clock = lambda: clock[0]
+    export_logger = get_logger("export_test")
+    try:
+        clear_logs()
+        for i in range(50):
+            clock[0] += 0.001 if i % 7 else -0.5  # Clock steps backwards too
+            export_logger.info("Transfer %d to ünïcødé 🚀", i, account=i % 3)
+        get_logger("export_test.other").error("Multi\nline")
+
+        expected = get_logs()
+        for compress in (True, False):
+            data = encode_log_batch(list(_handler._LOG_STORAGE), compress=compress)
+            decoded = decode_log_batch(data)
+            assert len(decoded) == len(expected), (len(decoded), len(expected))
+            for log, original in zip(decoded, expected):
+                assert log["timestamp"] == round(original["timestamp"] * 1e9)
+                for key in ("id", "level", "logger_name", "message"):
+                    assert log[key] == original[key], (key, log, original)
+                expected_fields = original["fields"]
+                assert log["fields"] == {k: str(v) for k, v in expected_fields.items()}
+
+        # Repeated names make the batch much smaller than the JSON records
+        blob_size = len(encode_log_batch(list(_handler._LOG_STORAGE)))
+        assert blob_size * 4 < len(json.dumps(expected)), blob_size
+        assert decode_log_batch(encode_log_batch([])) == []
+
+        # Paging matches get_logs_page
+        cursor, ids = None, []
+        while True:
+            page = get_logs_blob(from_entry=cursor, max_bytes=1_000)
+            assert (
+                page["next_from_entry"]
+                == get_logs_page(from_entry=cursor, max_bytes=1_000)["next_from_entry"]
+            )
+            ids.extend(log["id"] for log in decode_log_batch(page["data"]))
+            cursor = page["next_from_entry"]
+            if not page["has_more"]:
+                break
+        assert ids == [log["id"] for log in expected], ids
+
+        for bad in (b"", b"XYZ\x01\x00", data[:-3]):
+            try:
+                decode_log_batch(bad)
+            except ValueError:
+                pass
+            else:
+                assert False, f"decoded invalid batch {bad!r}"
+    finally:
+        _handler._read_clock = original_clock
+        clear_logs()
+
+
+def test_log_head():
+    """Test that the log head tracks the assigned, stored and evicted IDs"""
+    custom_print("Testing log head...")
+
+    from kybra_simple_logging import _handler
+
+    max_entries = _handler._MAX_LOG_ENTRIES
+    head_logger = get_logger("head_test")
+    try:
+        head_logger.info("Cleared")
+        evicted = get_log_head()["evicted"]
+        clear_logs()
+        head = get_log_head()
+        last_id = head["last_id"]
+        # Clearing the logs is not counted as evicting them
+        assert head == {
+            "last_id": last_id,
+            "first_id": last_id + 1,
+            "entries": 0,
+            "evicted": evicted,
+        }, head
+
+        for i in range(5):
+            head_logger.info("Entry %d", i)
+        head = get_log_head()
+        assert head["last_id"] == last_id + 5 == get_logs()[-1]["id"], head
+        assert head["first_id"] == last_id + 1 == get_logs()[0]["id"], head
+        assert head["entries"] == 5 and head["evicted"] == evicted, head
+
+        # Evicted entries move the first ID, not the last one, and are
+        # counted whether a lower limit or a new entry pushed them out
+        set_max_log_entries(3)
+        head_logger.info("Entry 5")
+        head = get_log_head()
+        assert head["first_id"] == last_id + 4 == get_logs()[0]["id"], head
+        assert head["entries"] == 3 and head["evicted"] == evicted + 3, head
+
+        # Entries that are not stored do not move the head
+        disable_memory_logging()
+        head_logger.info("Not stored")
+        enable_memory_logging()
+        assert get_log_head() == head
+
+        for mode in ("columnar", "segmented"):
+            set_log_storage(mode)
+            assert get_log_head() == head, (mode, get_log_head())
+    finally:
+        set_log_storage("entries")
+        set_max_log_entries(max_entries)
+        clear_logs()
+
+
 if __name__ == "__main__":
     import sys
 